@@ -13,6 +13,7 @@ from PySide6.QtCore import *
 from MainWindow import Ui_MainWindow
 from Login_Dialog import Ui_Login_Dialog
 from db_config import POSTGRES_CONFIG
+from db_pool import get_connection, release_connection, close_pool
 
 from stylesheets import message_box_style
 
@@ -90,19 +91,13 @@ class Login(QDialog, Ui_Login_Dialog):
 
     def create_connection(self):
         try:
-            conn = psycopg2.connect(**POSTGRES_CONFIG)
-            conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
-            return conn
+            return get_connection()
         except psycopg2.Error as e:
             print(f"Error connecting to database: {str(e)}")
             return None
 
     def closeConnection(self, conn):
-        if conn:
-            try:
-                conn.close()
-            except:
-                pass  # Ignore close errors
+        release_connection(conn)
 
     def login(self):
         try:
@@ -145,6 +140,8 @@ class Login(QDialog, Ui_Login_Dialog):
             user = cursor.fetchone()
             
             if user:
+                # The credential check already proved the user exists
+                AuditLogger.user_cache.put(username, True)
                 box = QMessageBox(self)
                 box.setIcon(QMessageBox.Information)
                 box.setWindowTitle("Success")
@@ -845,8 +842,7 @@ class MainWindow(QMainWindow):
     def create_connection(self):
         try:
             if self.connection is None:
-                self.connection = psycopg2.connect(**POSTGRES_CONFIG)
-                self.connection.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                self.connection = get_connection()
             return self.connection
         except psycopg2.Error as e:
             print(f"Error connecting to database: {str(e)}")
@@ -854,10 +850,7 @@ class MainWindow(QMainWindow):
 
     def closeConnection(self):
         if self.connection:
-            try:
-                self.connection.close()
-            except:
-                pass  # Ignore close errors
+            release_connection(self.connection)
             self.connection = None
 
     # log current user
@@ -959,6 +952,10 @@ class MainWindow(QMainWindow):
                 conn.commit()
             finally:
                 self.closeConnection()
+
+            # Flush queued audit events before the process exits
+            AuditLogger.shutdown()
+            close_pool()
             
             # Clean up
             self.windows.clear()
@@ -8,7 +8,7 @@ a = Analysis(
         (os.path.join(os.getcwd(), '.venv', 'Lib', 'site-packages', 'pyzbar', 'libiconv.dll'), '.'),
         (os.path.join(os.getcwd(), '.venv', 'Lib', 'site-packages', 'pyzbar', 'libzbar-64.dll'), '.')  
     ],
-    datas=[('flask_server', 'flask_server'), ('forms', 'forms'), ('forms_img', 'forms_img'), ('icons', 'icons'), ('images', 'images'), ('.env', '.'), ('audit_log_viewer.py', '.'), ('audit_logger.py', '.'), ('auto_form.py', '.'), ('book_viewer.py', '.'), ('db_config.py', '.'), ('everify_form.py', '.'), ('everify_server.log', '.'), ('Login_Dialog.py', '.'), ('MainWindow.py', '.'), ('Manage_User_Widget.py', '.'), ('manage_users.py', '.'), ('pdfviewer.py', '.'), ('qr_scanner_window.py', '.'), ('releasing_docs.py', '.'), ('releasing_log_viewer.py', '.'), ('requirements.txt', '.'), ('Search_Birth_Window.py', '.'), ('Search_Death_Window.py', '.'), ('Search_Marriage_Window.py', '.'), ('search.py', '.'), ('stats.py', '.'), ('stylesheets.py', '.'), ('tagging_birth.py', '.'), ('tagging_death.py', '.'), ('tagging_main.py', '.'), ('tagging_marriage.py', '.'), ('verify.py', '.')],
+    datas=[('flask_server', 'flask_server'), ('forms', 'forms'), ('forms_img', 'forms_img'), ('icons', 'icons'), ('images', 'images'), ('.env', '.'), ('audit_archive.py', '.'), ('audit_export.py', '.'), ('audit_log_model.py', '.'), ('audit_log_viewer.py', '.'), ('audit_logger.py', '.'), ('auto_form.py', '.'), ('book_viewer.py', '.'), ('db_config.py', '.'), ('db_pool.py', '.'), ('everify_form.py', '.'), ('everify_server.log', '.'), ('filename_index.py', '.'), ('folder_model.py', '.'), ('Login_Dialog.py', '.'), ('MainWindow.py', '.'), ('Manage_User_Widget.py', '.'), ('manage_users.py', '.'), ('page_cache.py', '.'), ('pdfviewer.py', '.'), ('qr_scanner_window.py', '.'), ('record_search.py', '.'), ('releasing_docs.py', '.'), ('releasing_log_viewer.py', '.'), ('requirements.txt', '.'), ('Search_Birth_Window.py', '.'), ('Search_Death_Window.py', '.'), ('Search_Marriage_Window.py', '.'), ('search.py', '.'), ('stats.py', '.'), ('stylesheets.py', '.'), ('tagging_birth.py', '.'), ('tagging_death.py', '.'), ('tagging_main.py', '.'), ('tagging_marriage.py', '.'), ('verify.py', '.')],
     hiddenimports=['flask', 'requests', 'jwt', 'jwt.algorithms' 'opencv-python', 'pyzbar', 'numpy', 'PySide6.QtCore', 'PySide6.QtGui', 'PySide6.QtWidgets', 'sqlite3', 'matplotlib', 'matplotlib.backends.backend_qt5agg', 'reportlab', 'psycopg2', 'psycopg2._psycopg'],
     hookspath=[],
     hooksconfig={},
@@ -0,0 +1,190 @@
+"""
+Archival of old audit_log months: a monthly partition is written to a gzipped
+CSV and dropped, and can be restored later when the Audit Logbook needs it
+"""
+import gzip
+import os
+import re
+from datetime import date
+
+import psycopg2
+from PySide6.QtCore import QThread, Signal
+
+from db_pool import get_connection, release_connection
+
+ARCHIVE_DIR = "audit_archive"  # Point at a shared folder so every workstation can restore
+COLUMNS = "id, username, action, details, timestamp"
+
+
+def partition_name(month):
+    return f"audit_log_{month:%Y_%m}"
+
+
+def next_month(month):
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def online_months(cursor):
+    """Return the months that currently have a partition attached to audit_log"""
+    cursor.execute("""
+        SELECT c.relname FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'audit_log'::regclass
+    """)
+    months = []
+    for (name,) in cursor.fetchall():
+        match = re.fullmatch(r"audit_log_(\d{4})_(\d{2})", name)
+        if match:
+            months.append(date(int(match.group(1)), int(match.group(2)), 1))
+    return sorted(months)
+
+
+def archive_month(conn, month, archive_dir=ARCHIVE_DIR):
+    """Write one month's partition to <archive_dir>/audit_log_YYYY_MM.csv.gz, then drop it.
+
+    The file is complete before the partition is detached, and the detach,
+    drop and audit_log_archive entry are committed together, so a failure at
+    any point leaves the month either still online or safely archived.
+    """
+    name = partition_name(month)
+    file_path = os.path.abspath(os.path.join(archive_dir, f"{name}.csv.gz"))
+    os.makedirs(archive_dir, exist_ok=True)
+
+    cursor = conn.cursor()
+    temp_path = f"{file_path}.tmp"
+    try:
+        with gzip.open(temp_path, "wb") as f:
+            cursor.copy_expert(f"COPY {name} ({COLUMNS}) TO STDOUT WITH (FORMAT CSV, HEADER)", f)
+        row_count = cursor.rowcount
+        os.replace(temp_path, file_path)
+    except Exception:
+        conn.rollback()
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    try:
+        cursor.execute(f"ALTER TABLE audit_log DETACH PARTITION {name}")
+        cursor.execute(f"DROP TABLE {name}")
+        cursor.execute("""
+            INSERT INTO audit_log_archive (month, file_path, row_count)
+            VALUES (%s, %s, %s)
+            ON CONFLICT (month) DO UPDATE SET
+                file_path = EXCLUDED.file_path,
+                row_count = EXCLUDED.row_count,
+                archived_at = CURRENT_TIMESTAMP,
+                restored = FALSE
+        """, (month, file_path, row_count))
+        conn.commit()
+    except psycopg2.Error:
+        conn.rollback()
+        raise
+    return file_path, row_count
+
+
+def archive_old_months(conn, keep_months, archive_dir=ARCHIVE_DIR):
+    """Archive every partition more than keep_months months before the current month"""
+    cutoff = date.today().replace(day=1)
+    for _ in range(keep_months):
+        cutoff = date(cutoff.year - (cutoff.month == 1), (cutoff.month - 2) % 12 + 1, 1)
+
+    archived = []
+    for month in online_months(conn.cursor()):
+        if month < cutoff:
+            archived.append((month,) + archive_month(conn, month, archive_dir))
+    return archived
+
+
+def archived_months(cursor, start_date, end_date):
+    """Return the archived (not restored) months overlapping a date range"""
+    cursor.execute("""
+        SELECT month FROM audit_log_archive
+        WHERE NOT restored AND month <= %s AND month + interval '1 month' > %s
+        ORDER BY month
+    """, (end_date, start_date))
+    return [row[0] for row in cursor.fetchall()]
+
+
+def restore_month(conn, month):
+    """Load an archived month back into a partition of audit_log.
+
+    The month stays online until the next archive run drops it again; its
+    archive file is left in place.
+    """
+    name = partition_name(month)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT file_path FROM audit_log_archive WHERE month = %s AND NOT restored", (month,))
+        row = cursor.fetchone()
+        if row is None:
+            conn.rollback()
+            return 0
+
+        cursor.execute(f"CREATE TABLE {name} (LIKE audit_log INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+        # Load as text first: months archived before details became JSONB hold Python reprs
+        cursor.execute(f"""
+            CREATE TEMP TABLE audit_log_restore
+            (LIKE {name}) ON COMMIT DROP
+        """)
+        cursor.execute("ALTER TABLE audit_log_restore ALTER COLUMN details TYPE TEXT")
+        with gzip.open(row[0], "rb") as f:
+            cursor.copy_expert(f"COPY audit_log_restore ({COLUMNS}) FROM STDIN WITH (FORMAT CSV, HEADER)", f)
+        cursor.execute(f"""
+            INSERT INTO {name} ({COLUMNS})
+            SELECT id, username, action, audit_details_to_jsonb(details), timestamp
+            FROM audit_log_restore
+        """)
+        row_count = cursor.rowcount
+        bounds = (month.isoformat(), next_month(month).isoformat())  # Plain literals; bounds predate expressions
+        cursor.execute(
+            "SELECT 1 FROM audit_log_default WHERE timestamp >= %s AND timestamp < %s LIMIT 1", bounds
+        )
+        if cursor.fetchone():
+            # Entries logged for this month since it was archived would fail the
+            # ATTACH's check on the default partition; move them in with the rest
+            cursor.execute("ALTER TABLE audit_log DETACH PARTITION audit_log_default")
+            cursor.execute(f"ALTER TABLE audit_log ATTACH PARTITION {name} FOR VALUES FROM (%s) TO (%s)", bounds)
+            cursor.execute(f"""
+                WITH moved AS (
+                    DELETE FROM audit_log_default WHERE timestamp >= %s AND timestamp < %s
+                    RETURNING {COLUMNS}
+                )
+                INSERT INTO {name} ({COLUMNS}) SELECT {COLUMNS} FROM moved
+            """, bounds)
+            cursor.execute("ALTER TABLE audit_log ATTACH PARTITION audit_log_default DEFAULT")
+        else:
+            cursor.execute(f"ALTER TABLE audit_log ATTACH PARTITION {name} FOR VALUES FROM (%s) TO (%s)", bounds)
+        cursor.execute("UPDATE audit_log_archive SET restored = TRUE WHERE month = %s", (month,))
+        conn.commit()
+        return row_count
+    except Exception:
+        conn.rollback()
+        raise
+
+
+class ArchiveRestoreWorker(QThread):
+    restored = Signal(int)  # rows restored
+    failed = Signal(str)  # error message
+
+    def __init__(self, months, parent=None):
+        super().__init__(parent)
+        self.months = months
+
+    def run(self):
+        conn = None
+        rows = 0
+        try:
+            conn = get_connection()
+            conn.autocommit = False  # Each month is restored in its own transaction
+            for month in self.months:
+                if self.isInterruptionRequested():
+                    break
+                rows += restore_month(conn, month)
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        finally:
+            if conn is not None and not conn.closed:
+                conn.autocommit = True
+            release_connection(conn)
+        self.restored.emit(rows)
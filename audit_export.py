@@ -0,0 +1,198 @@
+"""
+Audit log export that streams rows from PostgreSQL straight into the output
+file on a background thread, so any date range can be exported without first
+loading it into the Audit Logbook's table
+"""
+import os
+
+import psycopg2
+from PySide6.QtCore import QThread, Signal
+from reportlab.lib.pagesizes import landscape
+from reportlab.lib.units import inch
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfgen import canvas
+
+from audit_log_model import AuditLogModel, format_value
+from db_pool import get_connection, release_connection
+
+folio = (8.5 * inch, 13 * inch)
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+def draw_wrapped_text(canvas, text, x, y, max_width, line_height=10, font_name="Helvetica", font_size=8):
+    words = text.split()
+    line = ""
+    lines = []
+
+    for word in words:
+        test_line = line + word + " "
+        if pdfmetrics.stringWidth(test_line, font_name, font_size) <= max_width:
+            line = test_line
+        else:
+            lines.append(line.strip())
+            line = word + " "
+    if line:
+        lines.append(line.strip())
+
+    for line in lines:
+        canvas.drawString(x, y, line)
+        y -= line_height
+
+    return y
+
+
+class CopyProgress:
+    """File wrapper handed to COPY ... TO STDOUT: counts rows and cancels the COPY on interruption"""
+
+    def __init__(self, file, worker, connection):
+        self.file = file
+        self.worker = worker
+        self.connection = connection
+        self.rows = 0
+        self.cancelled = False
+
+    def write(self, data):
+        self.file.write(data)
+        self.rows += 1  # psycopg2 writes one row per call
+        if self.rows % AuditExportWorker.PROGRESS_INTERVAL == 0:
+            self.worker.progress.emit(self.rows)
+            if self.worker.isInterruptionRequested() and not self.cancelled:
+                self.cancelled = True
+                self.connection.cancel()  # The COPY fails with QueryCanceledError
+
+
+class AuditExportWorker(QThread):
+    progress = Signal(int)  # rows written so far
+    exported = Signal(str, int)  # file path, rows written
+    failed = Signal(str, str)  # file path, error message
+    cancelled = Signal(str)  # file path
+
+    CHUNK_SIZE = 2000  # rows per keyset page drawn into the PDF
+    PROGRESS_INTERVAL = 500
+
+    def __init__(self, query, file_path, file_format, parent=None):
+        super().__init__(parent)
+        self.query = query
+        self.file_path = file_path
+        self.file_format = file_format  # "pdf" or "csv"
+
+    def run(self):
+        conn = None
+        try:
+            conn = get_connection()
+            if self.file_format == "csv":
+                rows = self.export_csv(conn)
+            else:
+                rows = self.export_pdf(conn)
+        except ExportCancelled:
+            self.remove_partial_file()
+            self.cancelled.emit(self.file_path)
+            return
+        except Exception as e:
+            self.remove_partial_file()
+            self.failed.emit(self.file_path, str(e))
+            return
+        finally:
+            release_connection(conn)
+        self.exported.emit(self.file_path, rows)
+
+    def remove_partial_file(self):
+        try:
+            os.remove(self.file_path)
+        except OSError:
+            pass
+
+    def export_csv(self, conn):
+        """Let the server format the CSV and stream it to the file with COPY"""
+        export_query, export_params = self.query.export_query()
+        cursor = conn.cursor()
+        encoding = psycopg2.extensions.encodings[conn.encoding]
+        copy_query = cursor.mogrify(export_query, export_params).decode(encoding)
+        # Binary mode: psycopg2 hands the wrapper raw bytes in the client encoding
+        with open(self.file_path, "wb") as f:
+            writer = CopyProgress(f, self, conn)
+            try:
+                cursor.copy_expert(f"COPY ({copy_query}) TO STDOUT WITH (FORMAT CSV, HEADER)", writer)
+            except psycopg2.extensions.QueryCanceledError:
+                if not writer.cancelled:
+                    raise
+        if writer.cancelled:
+            # A cancel request that arrives late could hit the next query run on
+            # this connection, so it is closed rather than returned to the pool
+            conn.close()
+            raise ExportCancelled()
+        return max(writer.rows - 1, 0)  # Not counting the header
+
+    def export_pdf(self, conn):
+        """Draw the report a keyset page at a time; no more than CHUNK_SIZE rows are held at once"""
+        c = canvas.Canvas(self.file_path, pagesize=landscape(folio))
+        width, height = landscape(folio)
+        c.setFont("Helvetica", 10)
+        margin = 40
+        y = height - margin
+
+        c.drawString(margin, y, "Audit Log Report")
+        y -= 20
+
+        headers = AuditLogModel.HEADERS
+        col_offsets = []
+        col_widths = []
+
+        # Define custom widths: 2nd and 5th columns are wider
+        for i in range(len(headers)):
+            if i == 2 or i == 3:
+                col_widths.append(180)
+            else:
+                col_widths.append(75)
+
+        x = margin
+        for width in col_widths:
+            col_offsets.append(x)
+            x += width
+
+        c.setFont("Helvetica-Bold", 9)
+        for i, header in enumerate(headers):
+            c.drawString(col_offsets[i], y, header)
+        y -= 15
+
+        c.setFont("Helvetica", 8)
+        cursor = conn.cursor()
+        rows_written = 0
+        after = None
+        while True:
+            if self.isInterruptionRequested():
+                raise ExportCancelled()
+            page_query, page_params = self.query.page_query(after, self.CHUNK_SIZE)
+            cursor.execute(page_query, page_params)
+            rows = cursor.fetchall()
+
+            for row in rows:
+                max_lines_used = 1
+                line_y = y
+
+                for col, value in enumerate(row):
+                    text = format_value(value)
+                    if col == 2 or col == 3:  # 2nd and 5th columns
+                        new_y = draw_wrapped_text(c, text, col_offsets[col], line_y, col_widths[col])
+                        lines_used = int((line_y - new_y) / 10)
+                        max_lines_used = max(max_lines_used, lines_used)
+                    else:
+                        c.drawString(col_offsets[col], line_y, text)
+
+                y -= 10 * max_lines_used
+                if y < 50:
+                    c.showPage()
+                    y = height - margin
+                    c.setFont("Helvetica", 8)
+
+            rows_written += len(rows)
+            self.progress.emit(rows_written)
+            if len(rows) < self.CHUNK_SIZE:
+                break
+            after = (rows[-1][4], rows[-1][0])  # (timestamp, id)
+
+        c.save()
+        return rows_written
@@ -0,0 +1,292 @@
+"""
+Audit log query builder and a table model that pages audit_log in on demand,
+so the Audit Logbook never holds more than a few pages of rows in memory
+"""
+import json
+from collections import OrderedDict
+from datetime import datetime
+
+import psycopg2
+from psycopg2.extras import Json
+from PySide6.QtCore import QAbstractTableModel, QModelIndex, Qt, Signal
+from PySide6.QtGui import QColor
+
+from db_pool import get_connection, release_connection
+from record_search import escape_like
+
+
+class AuditLogQuery:
+    """The Audit Logbook's filters over audit_log, newest entries first.
+
+    Rows are ordered by (timestamp, id) descending, so the last row of a page
+    is a keyset cursor: the next page is the rows that sort after it, found
+    through the timestamp index however deep into the log the page is.
+    """
+
+    COLUMNS = ["id", "username", "action", "details", "timestamp"]
+
+    # Keys inside details the Audit Logbook filters on. "contains" keys match a
+    # substring through their trigram indexes; "exact" keys use the jsonb GIN
+    # index (see dbase_scripts/convert_audit_details_to_jsonb.py).
+    DETAIL_FILTERS = {
+        "file": "contains",
+        "query": "contains",
+        "form_type": "exact",
+    }
+
+    def __init__(self, username="", action="", start_date=None, end_date=None, detail_key="", detail_value=""):
+        conditions = ["timestamp BETWEEN %(start_date)s AND %(end_date)s"]
+        self.params = {"start_date": start_date, "end_date": end_date}
+        self.filter_details = {}
+
+        if username:
+            conditions.append("username ILIKE %(username)s")
+            self.params["username"] = f"%{username}%"
+            self.filter_details["username"] = username
+
+        if action:
+            conditions.append("action = %(action)s")
+            self.params["action"] = action
+            self.filter_details["action"] = action
+
+        match = self.DETAIL_FILTERS.get(detail_key)
+        if match and detail_value:
+            if match == "contains":
+                # The key is inlined from DETAIL_FILTERS so the expression matches its index
+                conditions.append(f"details ->> '{detail_key}' ILIKE %(detail_pattern)s")
+                self.params["detail_pattern"] = f"%{escape_like(detail_value)}%"
+            else:
+                conditions.append("details @> %(detail)s")
+                self.params["detail"] = Json({detail_key: detail_value})
+            self.filter_details[detail_key] = detail_value
+
+        self.filter_details.update({
+            "start_date": start_date.isoformat(),
+            "end_date": end_date.isoformat()
+        })
+        self.where = " AND ".join(conditions)
+
+    def page_query(self, after=None, limit=500, until=None):
+        """Return (sql, params) for the page after a (timestamp, id) cursor.
+
+        until is a (timestamp, id) snapshot from newest_key_query(); entries
+        logged after it are left out, so pages fetched again keep their rows.
+        """
+        params = dict(self.params, limit=limit)
+        where = self.where
+        if until is not None:
+            params["until_timestamp"], params["until_id"] = until
+            where += " AND timestamp <= %(until_timestamp)s AND id <= %(until_id)s"
+        if after is not None:
+            params["after_timestamp"], params["after_id"] = after
+            where += " AND (timestamp, id) < (%(after_timestamp)s, %(after_id)s)"
+
+        return f"""
+            SELECT {', '.join(self.COLUMNS)} FROM audit_log
+            WHERE {where}
+            ORDER BY timestamp DESC, id DESC
+            LIMIT %(limit)s
+        """, params
+
+    @staticmethod
+    def newest_key_query():
+        """Return the sql for the newest timestamp and highest id in audit_log.
+
+        The id bound matters as well as the timestamp: events are stamped by
+        each workstation's clock and may be inserted after newer ones.
+        """
+        return "SELECT max(timestamp), max(id) FROM audit_log"
+
+    def export_query(self):
+        """Return (sql, params) for every matching row, formatted as the table shows it"""
+        columns = self.COLUMNS[:-1] + ["to_char(timestamp, 'YYYY-MM-DD HH24:MI:SS') AS timestamp"]
+        return f"""
+            SELECT {', '.join(columns)} FROM audit_log
+            WHERE {self.where}
+            ORDER BY audit_log.timestamp DESC, id DESC
+        """, self.params
+
+    def count_estimate_query(self):
+        """Return (sql, params) for the planner's row estimate; far cheaper than COUNT(*)"""
+        return f"EXPLAIN (FORMAT JSON) SELECT 1 FROM audit_log WHERE {self.where}", self.params
+
+
+def format_value(value):
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)  # JSONB details
+    return str(value)
+
+
+class AuditLogModel(QAbstractTableModel):
+    """Read-only view of an AuditLogQuery that fetches rows as the table scrolls.
+
+    Rows are discovered a page at a time through canFetchMore/fetchMore. Only
+    the cursor where each page starts is kept for good; the rows themselves
+    live in an LRU of MAX_CACHED_PAGES pages and an evicted page is fetched
+    again by its cursor when it scrolls back into view. Memory therefore stays
+    flat no matter how far through the log the user scrolls. Every page is
+    bounded by a snapshot taken in set_query, so entries logged meanwhile
+    never shift rows between pages; they appear on the next refresh.
+    """
+
+    load_failed = Signal(str)  # error message
+
+    HEADERS = ["ID", "Username", "Action", "Details", "Timestamp"]
+    PAGE_SIZE = 500
+    MAX_CACHED_PAGES = 20
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.query = None
+        self.until = None  # (timestamp, id) snapshot taken by set_query; bounds every page
+        self.page_starts = []  # Cursor each discovered page starts after; None for the first
+        self.pages = OrderedDict()
+        self.row_count = 0
+        self.exhausted = True
+        self.estimate = None
+
+    def set_query(self, query):
+        """Show a new query, loading its first page and the planner's count estimate.
+
+        The database is queried before the reset starts, so a failure never
+        leaves the model half reset.
+        """
+        until = self.fetch_newest_key()
+        estimate = self.estimate_count(query)
+
+        self.beginResetModel()
+        self.query = query
+        self.until = until
+        self.page_starts = [None]
+        self.pages.clear()
+        self.row_count = 0
+        # Nothing to page through when the snapshot failed or audit_log is empty
+        self.exhausted = until is None
+        self.estimate = estimate
+        self.endResetModel()
+        self.fetchMore()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.row_count
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def flags(self, index):
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable  # Read-only
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role not in (Qt.DisplayRole, Qt.ForegroundRole):
+            return None
+
+        rows = self.page_rows(index.row() // self.PAGE_SIZE)
+        offset = index.row() % self.PAGE_SIZE
+        if rows is None or offset >= len(rows):
+            return None  # The entry was removed since the page was first seen
+        value = rows[offset][index.column()]
+
+        if role == Qt.DisplayRole:
+            return value
+        # Color-code certain actions
+        if index.column() == 2:  # Action column
+            if "ERROR" in value or "FAILED" in value:
+                return QColor("#dc3545")  # Red for errors
+            elif "SUCCESS" in value:
+                return QColor("#28a745")  # Green for success
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.query is not None and not self.exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if not self.canFetchMore(parent):
+            return
+        rows = self.page_rows(len(self.page_starts) - 1)
+        if not rows:
+            return
+        self.beginInsertRows(QModelIndex(), self.row_count, self.row_count + len(rows) - 1)
+        self.row_count += len(rows)
+        self.endInsertRows()
+
+    def page_rows(self, page):
+        """Return the display values of one page, from the LRU or the database"""
+        rows = self.pages.get(page)
+        if rows is not None:
+            self.pages.move_to_end(page)
+            return rows
+
+        raw_rows = self.fetch_page(self.page_starts[page])
+        if raw_rows is None:
+            self.exhausted = True  # Stop fetchMore retrying a failing query on every scroll
+            return None
+
+        if page == len(self.page_starts) - 1 and not self.exhausted:
+            if len(raw_rows) == self.PAGE_SIZE:
+                last = raw_rows[-1]
+                self.page_starts.append((last[4], last[0]))  # (timestamp, id)
+            else:
+                self.exhausted = True
+
+        rows = [tuple(format_value(value) for value in row) for row in raw_rows]
+        self.pages[page] = rows
+        while len(self.pages) > self.MAX_CACHED_PAGES:
+            self.pages.popitem(last=False)
+        return rows
+
+    def fetch_newest_key(self):
+        """Return the (timestamp, id) snapshot that bounds every page, or None"""
+        conn = None
+        try:
+            conn = get_connection()
+            cursor = conn.cursor()
+            cursor.execute(AuditLogQuery.newest_key_query())
+            newest = cursor.fetchone()
+            return None if newest[1] is None else tuple(newest)
+        except psycopg2.Error as e:
+            print(f"Error loading audit log snapshot: {str(e)}")
+            self.load_failed.emit(str(e))
+            return None
+        finally:
+            release_connection(conn)
+
+    def fetch_page(self, after):
+        conn = None
+        try:
+            conn = get_connection()
+            cursor = conn.cursor()
+            page_query, page_params = self.query.page_query(after, self.PAGE_SIZE, self.until)
+            cursor.execute(page_query, page_params)
+            return cursor.fetchall()
+        except psycopg2.Error as e:
+            print(f"Error loading audit log page: {str(e)}")
+            self.load_failed.emit(str(e))
+            return None
+        finally:
+            release_connection(conn)
+
+    def estimate_count(self, query):
+        """Planner estimate of the total matches, shown until every page has been loaded"""
+        conn = None
+        try:
+            conn = get_connection()
+            cursor = conn.cursor()
+            estimate_query, estimate_params = query.count_estimate_query()
+            cursor.execute(estimate_query, estimate_params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return int(plan[0]["Plan"]["Plan Rows"])
+        except (psycopg2.Error, LookupError, ValueError) as e:
+            print(f"Could not estimate audit log count: {str(e)}")
+            return None
+        finally:
+            release_connection(conn)
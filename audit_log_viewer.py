@@ -1,21 +1,19 @@
 from PySide6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
-                            QTableWidget, QTableWidgetItem, QLabel, QLineEdit, 
-                            QPushButton, QDateTimeEdit, QComboBox, QFileDialog, QMessageBox)
+                            QTableView, QLabel, QLineEdit, 
+                            QPushButton, QDateTimeEdit, QComboBox, QFileDialog, QMessageBox,
+                            QProgressDialog)
 from PySide6.QtCore import Qt, QDateTime
-from PySide6.QtGui import QFont, QColor, QIcon
+from PySide6.QtGui import QFont, QIcon
 import psycopg2
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import landscape
-from reportlab.lib.units import inch
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.pdfmetrics import stringWidth
 from db_config import POSTGRES_CONFIG
+from db_pool import get_connection, release_connection
 from datetime import datetime, timedelta
 from audit_logger import AuditLogger
+from audit_log_model import AuditLogModel, AuditLogQuery
+from audit_export import AuditExportWorker
+from audit_archive import ArchiveRestoreWorker, archived_months
 from stylesheets import message_box_style, table_style, date_picker_style, combo_box_style
 
-folio = (8.5 * inch, 13 * inch)
-
 class AuditLogViewer(QMainWindow):
     def __init__(self, username, parent=None):
         super().__init__(parent)
@@ -105,6 +103,22 @@ class AuditLogViewer(QMainWindow):
         action_layout.addWidget(self.action_filter)
         action_layout.addStretch()  # Add spacer
         filter_layout.addLayout(action_layout)
+
+        # Filter on a key inside the details, e.g. the file a record was tagged from
+        detail_layout = QHBoxLayout()
+        detail_layout.setSpacing(3)
+        detail_layout.setContentsMargins(0, 0, 0, 0)
+        self.detail_key_filter = QComboBox()
+        self.detail_key_filter.addItems(list(AuditLogQuery.DETAIL_FILTERS))
+        self.detail_key_filter.setFixedWidth(100)
+        self.detail_key_filter.setStyleSheet(combo_box_style)
+        self.detail_value_filter = QLineEdit()
+        self.detail_value_filter.setPlaceholderText("Details value")
+        self.detail_value_filter.setFixedWidth(197)
+        detail_layout.addWidget(self.detail_key_filter)
+        detail_layout.addWidget(self.detail_value_filter)
+        detail_layout.addStretch()  # Add spacer
+        filter_layout.addLayout(detail_layout)
         
         # Date range filter with horizontal layout and spacer
         date_range_layout = QHBoxLayout()
@@ -159,6 +173,19 @@ class AuditLogViewer(QMainWindow):
         self.export_pdf_button.setObjectName("filter")  # Use same style as filter button
         self.export_pdf_button.clicked.connect(self.export_pdf)
         button_layout.addWidget(self.export_pdf_button)
+
+        # Export CSV button
+        self.export_csv_button = QPushButton("Export CSV")
+        self.export_csv_button.setObjectName("filter")  # Use same style as filter button
+        self.export_csv_button.clicked.connect(self.export_csv)
+        button_layout.addWidget(self.export_csv_button)
+
+        # Restore button, shown when the date range reaches into archived months
+        self.restore_button = QPushButton("Restore Archived")
+        self.restore_button.setObjectName("filter")  # Use same style as filter button
+        self.restore_button.clicked.connect(self.restore_archived)
+        self.restore_button.hide()
+        button_layout.addWidget(self.restore_button)
         
         button_layout.addStretch()  # Add spacer
         
@@ -168,44 +195,53 @@ class AuditLogViewer(QMainWindow):
         # Add minimal spacing before the table
         layout.addSpacing(3)
         
-        # Create table
-        self.table = QTableWidget()
-        self.table.setColumnCount(5)
-        self.table.setHorizontalHeaderLabels(["ID", "Username", "Action", "Details", "Timestamp"])
+        self.export_worker = None
+        self.export_progress = None
+        self.archived = []  # Archived months in the loaded date range
+        self.restore_worker = None
+
+        # Create table; rows are paged in from the database as it scrolls
+        self.model = AuditLogModel(self)
+        self.model.rowsInserted.connect(self.update_status)
+        self.model.load_failed.connect(self.log_load_error)
+        self.table = QTableView()
+        self.table.setModel(self.model)
         self.table.horizontalHeader().setStretchLastSection(True)
-        self.table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.table.setSelectionBehavior(QTableView.SelectRows)
         self.table.setAlternatingRowColors(True)
         self.table.setStyleSheet(table_style)
         layout.addWidget(self.table)
+
+        self.status_label = QLabel()
+        layout.addWidget(self.status_label)
         
         # Load initial data
         self.load_action_types()
         self.load_data()
         
     def create_connection(self):
-        """Create a new PostgreSQL database connection"""
+        """Check out a PostgreSQL connection from the shared pool"""
         try:
-            conn = psycopg2.connect(**POSTGRES_CONFIG)
-            conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
-            return conn
+            return get_connection()
         except psycopg2.Error as e:
             print(f"Error creating connection: {str(e)}")
             return None
 
     def closeConnection(self, conn=None):
-        """Safely close the database connection"""
-        if conn:
-            try:
-                conn.close()
-            except Exception as e:
-                print(f"Error closing connection: {str(e)}")
+        """Return the database connection to the shared pool"""
+        release_connection(conn)
         
     def load_action_types(self):
         """Load unique action types for the action filter dropdown"""
         conn = self.create_connection()
         try:
             cursor = conn.cursor()
-            cursor.execute("SELECT DISTINCT action FROM audit_log ORDER BY action")
+            try:
+                # Maintained by the audit writer; a few rows however large the log grows
+                cursor.execute("SELECT action FROM audit_action_types ORDER BY action")
+            except psycopg2.errors.UndefinedTable:
+                # dbase_scripts/add_filter_lookup_tables.py has not been run yet
+                cursor.execute("SELECT DISTINCT action FROM audit_log ORDER BY action")
             actions = [row[0] for row in cursor.fetchall()]
             self.action_filter.addItems(actions)
             
@@ -223,88 +259,119 @@ class AuditLogViewer(QMainWindow):
     
     def load_data(self):
         """Load audit log data with current filters"""
+        query = AuditLogQuery(
+            self.username_filter.text(),
+            self.action_filter.currentText(),
+            self.start_date.dateTime().toPython(),
+            self.end_date.dateTime().toPython(),
+            self.detail_key_filter.currentText(),
+            self.detail_value_filter.text()
+        )
+        self.model.set_query(query)
+        self.archived = self.find_archived_months(query)
+        self.restore_button.setVisible(bool(self.archived))
+        self.update_status()
+
+        # Size columns to the first page only; sizing to every row would fetch them all
+        self.table.resizeColumnsToContents()
+
         conn = self.create_connection()
         try:
-            cursor = conn.cursor()
-            
-            # Build query with filters
-            query = "SELECT id, username, action, details, timestamp FROM audit_log WHERE 1=1"
-            params = []
-            filter_details = {}
-            
-            # Username filter
-            if self.username_filter.text():
-                query += " AND username ILIKE %s"
-                params.append(f"%{self.username_filter.text()}%")
-                filter_details["username"] = self.username_filter.text()
-            
-            # Action filter
-            if self.action_filter.currentText():
-                query += " AND action = %s"
-                params.append(self.action_filter.currentText())
-                filter_details["action"] = self.action_filter.currentText()
-            
-            # Date range filter
-            query += " AND timestamp BETWEEN %s AND %s"
-            start_date = self.start_date.dateTime().toPython()
-            end_date = self.end_date.dateTime().toPython()
-            params.extend([start_date, end_date])
-            filter_details.update({
-                "start_date": start_date.isoformat(),
-                "end_date": end_date.isoformat()
-            })
-            
-            # Order by timestamp desc
-            query += " ORDER BY timestamp DESC"
-            
-            cursor.execute(query, params)
-            rows = cursor.fetchall()
-            
             # Log the data load
             AuditLogger.log_action(
                 conn,
                 self.current_user,
                 "AUDIT_LOGS_LOADED",
                 {
-                    "filters": filter_details,
-                    "rows_returned": len(rows)
+                    "filters": query.filter_details,
+                    "rows_returned": self.model.rowCount(),
+                    "estimated_rows": self.model.estimate
                 }
             )
             conn.commit()
-            
-            # Update table
-            self.table.setRowCount(len(rows))
-            for i, row in enumerate(rows):
-                for j, value in enumerate(row):
-                    if isinstance(value, datetime):
-                        value = value.strftime("%Y-%m-%d %H:%M:%S")
-                    item = QTableWidgetItem(str(value))
-                    item.setFlags(item.flags() & ~Qt.ItemIsEditable)  # Make cell read-only
-                    
-                    # Color-code certain actions
-                    if j == 2:  # Action column
-                        if "ERROR" in str(value) or "FAILED" in str(value):
-                            item.setForeground(QColor("#dc3545"))  # Red for errors
-                        elif "SUCCESS" in str(value):
-                            item.setForeground(QColor("#28a745"))  # Green for success
-                    
-                    self.table.setItem(i, j, item)
-            
-            # Adjust column widths
-            self.table.resizeColumnsToContents()
-            
+        finally:
+            self.closeConnection(conn)
+
+    def log_load_error(self, error):
+        conn = self.create_connection()
+        try:
+            AuditLogger.log_action(
+                conn,
+                self.current_user,
+                "AUDIT_LOGS_LOAD_ERROR",
+                {"error": error}
+            )
+            conn.commit()
+        finally:
+            self.closeConnection(conn)
+
+    def update_status(self):
+        loaded = self.model.rowCount()
+        if self.model.exhausted:
+            status = f"{loaded} entries"
+        elif self.model.estimate:
+            status = f"Showing {loaded} of about {max(self.model.estimate, loaded + 1)} entries"
+        else:
+            status = f"Showing first {loaded} entries"
+        if self.archived:
+            months = ", ".join(month.strftime("%b %Y") for month in self.archived)
+            status += f" (not including archived months: {months})"
+        self.status_label.setText(status)
+
+    def find_archived_months(self, query):
+        conn = self.create_connection()
+        try:
+            return archived_months(conn.cursor(), query.params["start_date"], query.params["end_date"])
         except psycopg2.Error as e:
-            print(f"Error loading data: {str(e)}")
-            if conn:
-                AuditLogger.log_action(
-                    conn,
-                    self.current_user,
-                    "AUDIT_LOGS_LOAD_ERROR",
-                    {"error": str(e)}
-                )
-                conn.commit()
+            # No audit_log_archive table until dbase_scripts/partition_audit_log.py has run
+            print(f"Error checking archived audit months: {str(e)}")
+            return []
         finally:
             self.closeConnection(conn)
+
+    def restore_archived(self):
+        """Load the archived months in the date range back into audit_log"""
+        if self.restore_worker is not None or not self.archived:
+            return
+        self.restore_worker = ArchiveRestoreWorker(list(self.archived), self)
+        self.restore_worker.restored.connect(self.archive_restored)
+        self.restore_worker.failed.connect(self.archive_restore_failed)
+        self.restore_worker.finished.connect(self.restore_worker_finished)
+        self.restore_button.setEnabled(False)
+        self.restore_button.setText("Restoring...")
+        self.restore_worker.start()
+
+    def archive_restored(self, rows):
+        conn = self.create_connection()
+        try:
+            AuditLogger.log_action(
+                conn,
+                self.current_user,
+                "AUDIT_ARCHIVE_RESTORED",
+                {
+                    "months": [month.isoformat() for month in self.archived],
+                    "rows": rows
+                }
+            )
+            conn.commit()
+        finally:
+            self.closeConnection(conn)
+        self.load_data()
+
+    def archive_restore_failed(self, error):
+        box = QMessageBox()
+        box.setIcon(QMessageBox.Critical)
+        box.setText(f"Could not restore archived entries:\n{error}")
+        box.setWindowTitle("Restore Failed")
+        box.setStandardButtons(QMessageBox.Ok)
+        box.setStyleSheet(message_box_style)
+        box.exec()
+
+    def restore_worker_finished(self):
+        self.sender().deleteLater()
+        self.restore_worker = None
+        self.restore_button.setEnabled(True)
+        self.restore_button.setText("Restore Archived")
     
     def apply_filters(self):
         """Apply the current filters and reload data"""
@@ -317,6 +384,7 @@ class AuditLogViewer(QMainWindow):
                 {
                     "username_filter": self.username_filter.text(),
                     "action_filter": self.action_filter.currentText(),
+                    "detail_filter": {self.detail_key_filter.currentText(): self.detail_value_filter.text()},
                     "start_date": self.start_date.dateTime().toPython().isoformat(),
                     "end_date": self.end_date.dateTime().toPython().isoformat()
                 }
@@ -343,105 +411,101 @@ class AuditLogViewer(QMainWindow):
             
         self.username_filter.clear()
         self.action_filter.setCurrentIndex(-1)
+        self.detail_key_filter.setCurrentIndex(0)
+        self.detail_value_filter.clear()
         self.start_date.setDateTime(QDateTime.currentDateTime().addDays(-7))
         self.end_date.setDateTime(QDateTime.currentDateTime())
         self.load_data()
 
-    def draw_wrapped_text(self, canvas, text, x, y, max_width, line_height=10, font_name="Helvetica", font_size=8):
-        words = text.split()
-        line = ""
-        lines = []
+    def export_pdf(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Save PDF", "AuditLogbook.pdf", "PDF files (*.pdf)")
+        if path:
+            self.start_export(path, "pdf")
+
+    def export_csv(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Save CSV", "AuditLogbook.csv", "CSV files (*.csv)")
+        if path:
+            self.start_export(path, "csv")
 
-        for word in words:
-            test_line = line + word + " "
-            if pdfmetrics.stringWidth(test_line, font_name, font_size) <= max_width:
-                line = test_line
-            else:
-                lines.append(line.strip())
-                line = word + " "
-        if line:
-            lines.append(line.strip())
+    def start_export(self, path, file_format):
+        """Export every entry matching the loaded filters on a background thread"""
+        if self.export_worker is not None or self.model.query is None:
+            return
 
-        for line in lines:
-            canvas.drawString(x, y, line)
-            y -= line_height
+        self.export_progress = QProgressDialog("Exporting audit log...", "Cancel", 0, self.model.estimate or 0, self)
+        self.export_progress.setWindowTitle("Export")
+        self.export_progress.setWindowModality(Qt.WindowModal)
+        self.export_progress.setMinimumDuration(0)
+        self.export_progress.setAutoClose(False)
+        self.export_progress.setAutoReset(False)
 
-        return y
+        self.export_worker = AuditExportWorker(self.model.query, path, file_format, self)
+        self.export_worker.progress.connect(self.update_export_progress)
+        self.export_worker.exported.connect(self.export_finished)
+        self.export_worker.failed.connect(self.export_failed)
+        self.export_worker.cancelled.connect(self.export_cancelled)
+        self.export_worker.finished.connect(self.export_worker_finished)
+        self.export_progress.canceled.connect(self.export_worker.requestInterruption)
+        self.export_pdf_button.setEnabled(False)
+        self.export_csv_button.setEnabled(False)
+        self.export_worker.start()
 
-    def export_pdf(self):
-        path, _ = QFileDialog.getSaveFileName(self, "Save PDF", "AuditLogbook.pdf", "PDF files (*.pdf)")
-        if not path:
+    def update_export_progress(self, rows):
+        if self.export_progress is None:
             return
+        # The estimate can be low; grow the bar rather than pinning it at 100%
+        if self.export_progress.maximum() and rows >= self.export_progress.maximum():
+            self.export_progress.setMaximum(rows + 1)
+        self.export_progress.setValue(rows)
+        self.export_progress.setLabelText(f"Exporting audit log... {rows} entries written")
 
+    def export_finished(self, path, rows):
+        self.close_export_progress()
+        conn = self.create_connection()
         try:
-            c = canvas.Canvas(path, pagesize=landscape(folio))
-            width, height = landscape(folio) 
-            c.setFont("Helvetica", 10)
-            margin = 40
-            y = height - margin
-
-            c.drawString(margin, y, "Audit Log Report")
-            y -= 20
-
-            headers = [self.table.horizontalHeaderItem(i).text() for i in range(self.table.columnCount())]
-            col_offsets = []
-            col_widths = []
-
-            # Define custom widths: 2nd and 5th columns are wider
-            for i in range(self.table.columnCount()):
-                if i == 2 or i == 3:
-                    col_widths.append(180)
-                else:
-                    col_widths.append(75)
-
-            x = margin
-            for width in col_widths:
-                col_offsets.append(x)
-                x += width
-
-            c.setFont("Helvetica-Bold", 9)
-            for i, header in enumerate(headers):
-                c.drawString(col_offsets[i], y, header)
-            y -= 15
-
-            c.setFont("Helvetica", 8)
-            for row in range(self.table.rowCount()):
-                min_y = y  # Track min y for multi-line rows
-                max_lines_used = 1
-                line_y = y
-
-                for col in range(self.table.columnCount()):
-                    text = self.table.item(row, col).text() if self.table.item(row, col) else ""
-                    if col == 2 or col == 3:  # 2nd and 5th columns
-                        new_y = self.draw_wrapped_text(c, text, col_offsets[col], line_y, col_widths[col])
-                        lines_used = int((line_y - new_y) / 10)
-                        max_lines_used = max(max_lines_used, lines_used)
-                    else:
-                        c.drawString(col_offsets[col], line_y, text)
-
-                y -= 10 * max_lines_used
-                if y < 50:
-                    c.showPage()
-                    y = height - margin
-                    c.setFont("Helvetica", 8)
-
-            c.save()
-            box = QMessageBox()
-            box.setIcon(QMessageBox.Information)
-            box.setText(f"PDF saved to:\n{path}")
-            box.setWindowTitle("Export Successful")
-            box.setStandardButtons(QMessageBox.Ok)
-            box.setStyleSheet(message_box_style)
-            box.exec()
-
-        except Exception as e:
-            box = QMessageBox()
-            box.setIcon(QMessageBox.Critical)
-            box.setText(f"An error occurred:\n{str(e)}")
-            box.setWindowTitle("Export Failed")
-            box.setStandardButtons(QMessageBox.Ok)
-            box.setStyleSheet(message_box_style)
-            box.exec()
+            AuditLogger.log_action(
+                conn,
+                self.current_user,
+                "AUDIT_LOGS_EXPORTED",
+                {"file_path": path, "rows": rows}
+            )
+            conn.commit()
+        finally:
+            self.closeConnection(conn)
+
+        box = QMessageBox()
+        box.setIcon(QMessageBox.Information)
+        box.setText(f"{rows} entries saved to:\n{path}")
+        box.setWindowTitle("Export Successful")
+        box.setStandardButtons(QMessageBox.Ok)
+        box.setStyleSheet(message_box_style)
+        box.exec()
+
+    def export_failed(self, path, error):
+        self.close_export_progress()
+        box = QMessageBox()
+        box.setIcon(QMessageBox.Critical)
+        box.setText(f"An error occurred:\n{error}")
+        box.setWindowTitle("Export Failed")
+        box.setStandardButtons(QMessageBox.Ok)
+        box.setStyleSheet(message_box_style)
+        box.exec()
+
+    def export_cancelled(self, path):
+        self.close_export_progress()
+
+    def close_export_progress(self):
+        if self.export_progress is not None:
+            self.export_progress.close()
+            self.export_progress.deleteLater()
+            self.export_progress = None
+
+    def export_worker_finished(self):
+        self.sender().deleteLater()
+        self.export_worker = None
+        self.close_export_progress()
+        self.export_pdf_button.setEnabled(True)
+        self.export_csv_button.setEnabled(True)
 
     def closeEvent(self, event):
         """Handle window close event"""
@@ -1,26 +1,317 @@
 import psycopg2
+from psycopg2.extras import execute_values
 from datetime import datetime
+import json
+import queue
+import threading
 import time
 from db_config import POSTGRES_CONFIG
+from db_pool import get_connection, release_connection
+
+
+class UserCache:
+    """In-process cache of username -> exists lookups against users_list"""
+
+    def __init__(self, ttl, negative_ttl):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, username):
+        """Return True/False for a fresh entry, or None when the username must be looked up"""
+        with self.lock:
+            entry = self.entries.get(username)
+            if entry is not None and entry[1] > time.monotonic():
+                self.hits += 1
+                return entry[0]
+            self.entries.pop(username, None)
+            self.misses += 1
+            return None
+
+    def put(self, username, exists):
+        ttl = self.ttl if exists else self.negative_ttl
+        with self.lock:
+            self.entries[username] = (exists, time.monotonic() + ttl)
+
+    def invalidate(self, username=None):
+        """Forget one username, or every cached entry when no username is given"""
+        with self.lock:
+            if username is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(username, None)
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "cache_hits": self.hits,
+                "cache_misses": self.misses,
+                "cache_hit_rate": self.hits / lookups if lookups else 0.0,
+                "cache_size": len(self.entries),
+            }
+
+
+class AuditWriter(threading.Thread):
+    """Background thread that flushes queued audit events to audit_log in batches"""
+
+    def __init__(self, user_cache, max_queue_size, batch_size, flush_interval, max_retries, retry_delay,
+                 partition_months_ahead):
+        super().__init__(name="AuditWriter", daemon=True)
+        self.user_cache = user_cache
+        self.queue = queue.Queue(maxsize=max_queue_size)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.partition_months_ahead = partition_months_ahead
+
+        self.connection = None
+        self.partitions_month = None  # Month whose partitions were last ensured
+        self.known_actions = set()  # Actions already in audit_action_types
+        self.stop_event = threading.Event()
+        self.stats_lock = threading.Lock()
+        self.queued = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.rejected = 0
+
+    def enqueue(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            with self.stats_lock:
+                self.dropped += 1
+            print(f"Audit queue full - dropped event '{event[1]}' for user '{event[0]}'")
+            return False
+        with self.stats_lock:
+            self.queued += 1
+        return True
+
+    def stats(self):
+        with self.stats_lock:
+            return {
+                "queued": self.queued,
+                "flushed": self.flushed,
+                "dropped": self.dropped,
+                "rejected": self.rejected,
+                "pending": self.queue.qsize(),
+            }
+
+    def run(self):
+        while not (self.stop_event.is_set() and self.queue.empty()):
+            batch = self.next_batch()
+            if batch:
+                try:
+                    self.write_batch(batch)
+                except Exception as e:
+                    # Keep the writer alive; the batch failed before it was committed
+                    print(f"Unexpected error flushing {len(batch)} audit events: {str(e)}")
+                    self.close_connection()
+                    with self.stats_lock:
+                        self.dropped += len(batch)
+        self.close_connection()
+
+    def next_batch(self):
+        """Block for the first event, then drain whatever else is ready up to batch_size"""
+        try:
+            batch = [self.queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def get_connection(self):
+        if self.connection is None or self.connection.closed:
+            self.connection = psycopg2.connect(**POSTGRES_CONFIG)
+        return self.connection
+
+    def close_connection(self):
+        if self.connection:
+            try:
+                self.connection.close()
+            except:
+                pass  # Ignore connection close errors
+            self.connection = None
+
+    def write_batch(self, batch):
+        rows = self.insert_batch(batch)
+        if rows is None:
+            print(f"Failed to flush {len(batch)} audit events after {self.max_retries} attempts")
+            with self.stats_lock:
+                self.dropped += len(batch)
+            return
+
+        with self.stats_lock:
+            self.flushed += len(rows)
+            self.rejected += len(batch) - len(rows)
+        # Outside the retries: a failure from here on must never insert the batch again
+        self.record_actions(self.connection, rows)
+
+    def insert_batch(self, batch):
+        """Insert the batch's valid events and commit, retrying on database errors.
+
+        Returns the rows written, or None when every attempt failed.
+        """
+        retries = 0
+        while retries < self.max_retries:
+            try:
+                conn = self.get_connection()
+                self.ensure_partitions(conn)
+                rows = self.filter_valid_users(conn, batch)
+                if rows:
+                    with conn.cursor() as cursor:
+                        execute_values(
+                            cursor,
+                            "INSERT INTO audit_log (username, action, details, timestamp) VALUES %s",
+                            rows,
+                            page_size=self.batch_size
+                        )
+                conn.commit()
+                return rows
+            except psycopg2.Error as e:
+                print(f"Error flushing audit batch (attempt {retries + 1}/{self.max_retries}): {str(e)}")
+                # Drop the connection so the next attempt reconnects
+                self.close_connection()
+                retries += 1
+                if retries < self.max_retries:
+                    time.sleep(self.retry_delay * retries)  # Exponential backoff
+        return None
+
+    def ensure_partitions(self, conn):
+        """Create audit_log partitions for this month and the next few, once a month.
+
+        Events outside every partition still land in audit_log_default, so a
+        failure here (or a database without dbase_scripts/partition_audit_log.py
+        applied) is reported and not retried until next month.
+        """
+        month = datetime.now().strftime("%Y-%m")
+        if self.partitions_month == month:
+            return
+        self.partitions_month = month
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    """
+                    SELECT create_audit_log_partitions(
+                        date_trunc('month', now())::date,
+                        (date_trunc('month', now()) + %s * interval '1 month')::date
+                    )
+                    """,
+                    (self.partition_months_ahead,)
+                )
+            conn.commit()
+        except psycopg2.Error as e:
+            conn.rollback()
+            print(f"Could not create audit_log partitions: {str(e)}")
+
+    def record_actions(self, conn, rows):
+        """Add actions not seen before to audit_action_types, the Audit Logbook's filter list.
+
+        Runs after the batch is committed, so a missing table (before
+        dbase_scripts/add_filter_lookup_tables.py) never costs audit events.
+        """
+        new_actions = {row[1] for row in rows} - self.known_actions
+        if not new_actions or conn is None:
+            return
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    """
+                    INSERT INTO audit_action_types (action)
+                    SELECT unnest(%s::varchar[])
+                    ON CONFLICT DO NOTHING
+                    """,
+                    (sorted(new_actions),)
+                )
+            conn.commit()
+        except Exception as e:
+            print(f"Could not record audit action types: {str(e)}")
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                self.close_connection()  # Reconnect for the next batch
+            return  # Retried with the next batch that uses these actions
+        self.known_actions.update(new_actions)
+
+    def filter_valid_users(self, conn, batch):
+        """Drop events whose username is not in users_list, looking up only uncached names"""
+        known = {"SYSTEM"}
+        unknown = set()
+        for username in {event[0] for event in batch if event[0] != "SYSTEM"}:
+            exists = self.user_cache.get(username)
+            if exists is None:
+                unknown.add(username)
+            elif exists:
+                known.add(username)
+
+        if unknown:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    "SELECT username FROM users_list WHERE username = ANY(%s)",
+                    (list(unknown),)
+                )
+                found = {row[0] for row in cursor.fetchall()}
+            for username in unknown:
+                self.user_cache.put(username, username in found)
+            known.update(found)
+
+        rows = []
+        for event in batch:
+            if event[0] in known:
+                rows.append(event)
+            else:
+                print(f"Invalid username '{event[0]}' - not found in database")
+        return rows
+
+    def stop(self, timeout):
+        self.stop_event.set()
+        self.join(timeout)
+
 
 class AuditLogger:
     MAX_RETRIES = 3
     RETRY_DELAY = 0.1  # 100ms delay between retries
+    MAX_QUEUE_SIZE = 10000
+    BATCH_SIZE = 200
+    FLUSH_INTERVAL = 0.5  # seconds the writer waits for new events
+    SHUTDOWN_TIMEOUT = 5.0
+    USER_CACHE_TTL = 300  # seconds a known username stays cached
+    USER_CACHE_NEGATIVE_TTL = 30  # seconds an unknown username stays cached
+    PARTITION_MONTHS_AHEAD = 3  # future audit_log partitions kept ready
+
+    user_cache = UserCache(USER_CACHE_TTL, USER_CACHE_NEGATIVE_TTL)
+    _writer = None
+    _writer_lock = threading.Lock()
 
     @staticmethod
     def validate_username(username):
         """Validate username exists in PostgreSQL users_list table"""
         if username == "SYSTEM":
             return True
-            
+
+        exists = AuditLogger.user_cache.get(username)
+        if exists is not None:
+            return exists
+
+        conn = None
+        cursor = None
         try:
-            conn = psycopg2.connect(**POSTGRES_CONFIG)
-            conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            conn = get_connection()
             cursor = conn.cursor()
-            
+
             cursor.execute("SELECT username FROM users_list WHERE username = %s", (username,))
-            return cursor.fetchone() is not None
-            
+            exists = cursor.fetchone() is not None
+            AuditLogger.user_cache.put(username, exists)
+            return exists
+
         except psycopg2.Error as e:
             print(f"Error validating username in PostgreSQL: {str(e)}")
             return False
@@ -30,66 +321,67 @@ class AuditLogger:
                     cursor.close()
                 except:
                     pass  # Ignore cursor close errors
-            if conn:
-                try:
-                    conn.close()
-                except:
-                    pass  # Ignore connection close errors
+            release_connection(conn)
+
+    @staticmethod
+    def invalidate_user(username=None):
+        """Drop cached validation for a username after users_list changes"""
+        AuditLogger.user_cache.invalidate(username)
+
+    @staticmethod
+    def get_writer():
+        """Return the process-wide audit writer, starting it on first use"""
+        with AuditLogger._writer_lock:
+            if AuditLogger._writer is None or not AuditLogger._writer.is_alive():
+                AuditLogger._writer = AuditWriter(
+                    AuditLogger.user_cache,
+                    AuditLogger.MAX_QUEUE_SIZE,
+                    AuditLogger.BATCH_SIZE,
+                    AuditLogger.FLUSH_INTERVAL,
+                    AuditLogger.MAX_RETRIES,
+                    AuditLogger.RETRY_DELAY,
+                    AuditLogger.PARTITION_MONTHS_AHEAD
+                )
+                AuditLogger._writer.start()
+            return AuditLogger._writer
 
     @staticmethod
     def log_action(connection, username, action, details=None):
+        """Queue an audit event; the background writer validates and inserts it.
+
+        The connection argument is kept for compatibility with existing callers
+        and is not used.
+        """
         if username is None:  # Handle cases where user isn't logged in
             username = "SYSTEM"
-        
-        # Validate username exists in database
-        if not AuditLogger.validate_username(username):
-            error_msg = f"Invalid username '{username}' - not found in database"
-            print(error_msg)
-            raise ValueError(error_msg)
-
-        # Use PostgreSQL for audit logging
-        audit_conn = None
-        cursor = None
-        retries = 0
-        last_error = None
 
-        while retries < AuditLogger.MAX_RETRIES:
-            try:
-                audit_conn = psycopg2.connect(**POSTGRES_CONFIG)
-                cursor = audit_conn.cursor()
-                
-                cursor.execute('''
-                INSERT INTO audit_log (username, action, details)
-                VALUES (%s, %s, %s)
-                ''', (username, action, str(details) if details else None))
-                
-                audit_conn.commit()
-                return  # Success - exit the retry loop
-                
-            except psycopg2.Error as e:
-                last_error = e
-                print(f"Error logging audit trail (attempt {retries + 1}/{AuditLogger.MAX_RETRIES}): {str(e)}")
-                if audit_conn:
-                    try:
-                        audit_conn.rollback()
-                    except:
-                        pass  # Ignore rollback errors
-                retries += 1
-                if retries < AuditLogger.MAX_RETRIES:
-                    time.sleep(AuditLogger.RETRY_DELAY * retries)  # Exponential backoff
-            finally:
-                if cursor:
-                    try:
-                        cursor.close()
-                    except:
-                        pass  # Ignore cursor close errors
-                if audit_conn:
-                    try:
-                        audit_conn.close()
-                    except:
-                        pass  # Ignore connection close errors
-
-        # If we get here, all retries failed
-        print(f"Failed to log audit trail after {AuditLogger.MAX_RETRIES} attempts")
-        if last_error:
-            raise last_error  # Re-raise the last error to be handled by the caller
+        # Stored as JSONB so the Audit Logbook can filter on keys inside details
+        event = (username, action, json.dumps(details, default=str) if details else None, datetime.now())
+        AuditLogger.get_writer().enqueue(event)
+
+    @staticmethod
+    def stats():
+        """Return audit writer counters and username cache hit rate"""
+        with AuditLogger._writer_lock:
+            writer = AuditLogger._writer
+        if writer is None:
+            stats = {"queued": 0, "flushed": 0, "dropped": 0, "rejected": 0, "pending": 0}
+        else:
+            stats = writer.stats()
+        stats.update(AuditLogger.user_cache.stats())
+        return stats
+
+    @staticmethod
+    def shutdown(timeout=None):
+        """Flush pending events and stop the writer; called when the app exits"""
+        with AuditLogger._writer_lock:
+            writer = AuditLogger._writer
+            AuditLogger._writer = None
+        if writer is None:
+            return
+        writer.stop(AuditLogger.SHUTDOWN_TIMEOUT if timeout is None else timeout)
+        stats = writer.stats()
+        stats.update(AuditLogger.user_cache.stats())
+        if stats["pending"]:
+            print(f"Audit writer stopped with {stats['pending']} events still pending")
+        print(f"Audit writer stats: {stats}")
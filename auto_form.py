@@ -13,39 +13,58 @@ from PySide6.QtPrintSupport import QPrinter, QPrintDialog, QPrintPreviewDialog
 
 from audit_logger import AuditLogger
 from db_config import POSTGRES_CONFIG
+from db_pool import get_connection, release_connection
 
 from stylesheets import search_button_style, everify_button_style, button_style, message_box_style
 
 
+_tables_with_normalized_path = set()
+
+
+def path_match_column(cursor, table):
+    """Return the SQL that index records are matched against a normalized path on.
+
+    The indexed normalized_path column is used once it exists; until
+    dbase_scripts/add_normalized_path_column.py has been run, file_path is
+    normalized in the query as before.
+    """
+    if table not in _tables_with_normalized_path:
+        cursor.execute("""
+            SELECT 1 FROM information_schema.columns
+            WHERE table_name = %s AND column_name = 'normalized_path'
+        """, (table,))
+        if not cursor.fetchone():
+            return "normalize_path(file_path)"
+        _tables_with_normalized_path.add(table)
+    return "normalized_path"
+
+
 # New Custom Form Preview Window
 class FormPreviewWindow(QMainWindow):
-    def __init__(self, pdf_path, record_data, form_type, connection=None, username=None, parent=None):
+    def __init__(self, pdf_path, record_data, form_type, username=None, parent=None):
         super().__init__(parent)
         self.setWindowTitle(f"Preview - {form_type} Form")
         self.setFixedSize(QSize(494, 700))  # Reduced from 850x1100 to 700x900
         self.pdf_path = pdf_path
         self.record_data = record_data
         self.form_type = form_type
-        self.connection = connection
         self.username = username
         self.user_full_name = self._get_user_full_name()
         self.remarks_field = None  # Will hold the QTextEdit for remarks
 
         # Log form preview window opened
-        if self.connection:
-            try:
-                AuditLogger.log_action(
-                    self.connection,
-                    self.username or "SYSTEM",  # Use username if available
-                    "FORM_PREVIEW_OPENED",
-                    {
-                        "form_type": form_type,
-                        "record_data": record_data
-                    }
-                )
-                self.connection.commit()
-            except Exception as e:
-                print(f"Error logging form preview: {str(e)}")
+        try:
+            AuditLogger.log_action(
+                None,
+                self.username or "SYSTEM",  # Use username if available
+                "FORM_PREVIEW_OPENED",
+                {
+                    "form_type": form_type,
+                    "record_data": record_data
+                }
+            )
+        except Exception as e:
+            print(f"Error logging form preview: {str(e)}")
 
         self.setStyleSheet("""
             QWidget {
@@ -130,7 +149,7 @@ class FormPreviewWindow(QMainWindow):
 
         # Load saved remarks from the database if available
         saved_remarks = ""
-        if self.connection and self.pdf_path:
+        if self.pdf_path:
             table_map = {
                 "Birth": "birth_index",
                 "Death": "death_index",
@@ -138,15 +157,19 @@ class FormPreviewWindow(QMainWindow):
             }
             table = table_map.get(self.form_type)
             if table:
+                conn = None
                 try:
-                    cursor = self.connection.cursor()
-                    cursor.execute(f"SELECT remarks FROM {table} WHERE normalize_path(file_path) = %s", (self.pdf_path.replace('\\\\', '/').replace('\\', '/'),))
+                    conn = get_connection()
+                    cursor = conn.cursor()
+                    cursor.execute(f"SELECT remarks FROM {table} WHERE {path_match_column(cursor, table)} = %s", (self.pdf_path.replace('\\\\', '/').replace('\\', '/'),))
                     result = cursor.fetchone()
                     if result and result[0]:
                         saved_remarks = result[0]
                     cursor.close()
                 except Exception as e:
                     print(f"Error loading saved remarks: {str(e)}")
+                finally:
+                    release_connection(conn)
 
         def adjust_text_edit_font(text_edit):
             text = text_edit.toPlainText()
@@ -451,20 +474,18 @@ class FormPreviewWindow(QMainWindow):
         if print_dialog.exec() == QPrintDialog.Accepted:
             try:
                 # Log print action
-                if self.connection:
-                    try:
-                        AuditLogger.log_action(
-                            self.connection,
-                            "SYSTEM",  # Default to SYSTEM if no user context
-                            "FORM_PRINTED",
-                            {
-                                "form_type": self.form_type,
-                                "record_data": self.record_data
-                            }
-                        )
-                        self.connection.commit()
-                    except Exception as e:
-                        print(f"Error logging form print: {str(e)}")
+                try:
+                    AuditLogger.log_action(
+                        None,
+                        "SYSTEM",  # Default to SYSTEM if no user context
+                        "FORM_PRINTED",
+                        {
+                            "form_type": self.form_type,
+                            "record_data": self.record_data
+                        }
+                    )
+                except Exception as e:
+                    print(f"Error logging form print: {str(e)}")
 
                 # Store original styles
                 original_form_style = self.form_area.styleSheet()
@@ -535,29 +556,29 @@ class FormPreviewWindow(QMainWindow):
 
     def closeEvent(self, event):
         """Handle window close event"""
-        if self.connection:
-            try:
-                AuditLogger.log_action(
-                    self.connection,
-                    "SYSTEM",  # Default to SYSTEM if no user context
-                    "FORM_PREVIEW_CLOSED",
-                    {
-                        "form_type": self.form_type,
-                        "record_data": self.record_data
-                    }
-                )
-                self.connection.commit()
-            except Exception as e:
-                print(f"Error logging form preview close: {str(e)}")
+        try:
+            AuditLogger.log_action(
+                None,
+                "SYSTEM",  # Default to SYSTEM if no user context
+                "FORM_PREVIEW_CLOSED",
+                {
+                    "form_type": self.form_type,
+                    "record_data": self.record_data
+                }
+            )
+        except Exception as e:
+            print(f"Error logging form preview close: {str(e)}")
         event.accept()
 
     def _get_user_full_name(self):
         """Get the user's full name from the database by concatenating firstname and lastname"""
-        if not self.connection or not self.username:
+        if not self.username:
             return ""
             
+        conn = None
         try:
-            cursor = self.connection.cursor()
+            conn = get_connection()
+            cursor = conn.cursor()
             cursor.execute("""
                 SELECT firstname, lastname 
                 FROM users_list 
@@ -572,23 +593,11 @@ class FormPreviewWindow(QMainWindow):
         except Exception as e:
             print(f"Error fetching user full name: {str(e)}")
             return ""
+        finally:
+            release_connection(conn)
 
     def save_remarks(self):
         """Save the remarks to the appropriate index table based on form type."""
-        if self.connection.closed:
-            # Reconnect using your db config
-            import psycopg2
-            self.connection = psycopg2.connect(**POSTGRES_CONFIG)
-        if not self.connection:
-            # QMessageBox.critical(self, "Database Error", "No database connection available.")
-            box = QMessageBox(self)
-            box.setIcon(QMessageBox.Critical)
-            box.setWindowTitle("Database Error")
-            box.setText("No database connection available.")
-            box.setStandardButtons(QMessageBox.Ok)
-            box.setStyleSheet(message_box_style)
-            box.exec()
-            return
         if not self.remarks_field:
             # QMessageBox.critical(self, "Error", "Remarks field not found.")
             box = QMessageBox(self)
@@ -616,10 +625,24 @@ class FormPreviewWindow(QMainWindow):
             box.setStyleSheet(message_box_style)
             box.exec()
             return
+        # Pooled connections are checked out per use, never kept by the window
+        try:
+            conn = get_connection()
+        except psycopg2.Error as e:
+            print(f"Error connecting to database: {str(e)}")
+            # QMessageBox.critical(self, "Database Error", "No database connection available.")
+            box = QMessageBox(self)
+            box.setIcon(QMessageBox.Critical)
+            box.setWindowTitle("Database Error")
+            box.setText("No database connection available.")
+            box.setStandardButtons(QMessageBox.Ok)
+            box.setStyleSheet(message_box_style)
+            box.exec()
+            return
         try:
-            cursor = self.connection.cursor()
+            cursor = conn.cursor()
             # Check if the row exists for the given file_path
-            cursor.execute(f"SELECT 1 FROM {table} WHERE normalize_path(file_path) = %s", (self.pdf_path.replace('\\\\', '/').replace('\\', '/'),))
+            cursor.execute(f"SELECT 1 FROM {table} WHERE {path_match_column(cursor, table)} = %s", (self.pdf_path.replace('\\\\', '/').replace('\\', '/'),))
             if not cursor.fetchone():
                 # QMessageBox.critical(self, "Error", f"No record found for file_path:\n{self.pdf_path}\nRemarks not saved.")
                 box = QMessageBox(self)
@@ -634,9 +657,9 @@ class FormPreviewWindow(QMainWindow):
             cursor.execute(f"""
                 UPDATE {table}
                 SET remarks = %s
-                WHERE normalize_path(file_path) = %s
+                WHERE {path_match_column(cursor, table)} = %s
             """, (remarks_text, self.pdf_path.replace('\\\\', '/').replace('\\', '/')))
-            self.connection.commit()
+            conn.commit()
             cursor.close()
             # QMessageBox.information(self, "Success", "Form saved successfully.")
             box = QMessageBox(self)
@@ -655,6 +678,8 @@ class FormPreviewWindow(QMainWindow):
             box.setStandardButtons(QMessageBox.Ok)
             box.setStyleSheet(message_box_style)
             box.exec()
+        finally:
+            release_connection(conn)
 
     def normalize_path(path):
         return path.replace('\\\\', '/').replace('\\', '/')
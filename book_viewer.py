@@ -14,14 +14,19 @@ from PySide6.QtGui import QPixmap, QImage, QIcon
 from PySide6.QtWebEngineWidgets import QWebEngineView
 from stylesheets import button_style, date_picker_style, combo_box_style, message_box_style
 from pdfviewer import PDFViewer
+from folder_model import FolderListingWorker, get_folder_listing
 from audit_logger import AuditLogger
 import psycopg2
 from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
 from db_config import POSTGRES_CONFIG
+from db_pool import get_connection, release_connection
 
 
 class BookViewerWindow(QMainWindow):
     """Book Viewer Window for browsing through PDF files in a folder."""
+
+    PREFETCH_AHEAD = 2  # Files after the current one read ahead in the background
+    PREFETCH_BEHIND = 1  # Files before it kept ready for stepping back
     
     def __init__(self, username, parent=None):
         super().__init__(parent)
@@ -39,6 +44,8 @@ class BookViewerWindow(QMainWindow):
         self.pdf_files = []
         self.current_index = 0
         self.default_directory = r"\\server\MCR"
+        self.listing_worker = None
+        self.pending_selected_file = None  # File chosen while its folder is being listed
         
         # Setup UI
         self.setup_ui()
@@ -134,20 +141,16 @@ class BookViewerWindow(QMainWindow):
         """Create and return a database connection for audit logging."""
         try:
             if self.connection is None:
-                self.connection = psycopg2.connect(**POSTGRES_CONFIG)
-                self.connection.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                self.connection = get_connection()
             return self.connection
         except psycopg2.Error as e:
             print(f"Error connecting to database: {str(e)}")
             return None
 
     def closeConnection(self):
-        """Close the database connection."""
+        """Return the database connection to the shared pool."""
         if self.connection:
-            try:
-                self.connection.close()
-            except:
-                pass  # Ignore close errors
+            release_connection(self.connection)
             self.connection = None
         
     def select_file(self):
@@ -178,67 +181,112 @@ class BookViewerWindow(QMainWindow):
                 self.closeConnection()
 
     def load_pdf_files(self, selected_file=None):
-        """Load all PDF files from the selected folder. If selected_file is given, set current index to it."""
-        try:
+        """Load all PDF files from the selected folder. If selected_file is given, set current index to it.
+
+        The selected file (or the folder's last known listing) is shown at once;
+        the folder is listed on a background thread and the navigation updated
+        when the listing arrives.
+        """
+        self.cancel_listing()
+        self.pending_selected_file = selected_file
+        cached_files = get_folder_listing().cached(self.current_folder) or []
+        if selected_file and not any(same_file(file_path, selected_file) for file_path in cached_files):
+            # No listing yet, or a stale one; show the chosen file alone until the folder is listed
+            cached_files = [selected_file]
+        if cached_files:
+            self.show_pdf_files(cached_files, selected_file)
+
+        self.statusBar().showMessage("Listing PDF files...")
+        self.listing_worker = FolderListingWorker(get_folder_listing(), self.current_folder, self)
+        self.listing_worker.progress.connect(self.update_listing_progress)
+        self.listing_worker.listed.connect(self.folder_listed)
+        self.listing_worker.failed.connect(self.folder_listing_failed)
+        self.listing_worker.finished.connect(self.listing_worker.deleteLater)
+        self.listing_worker.start()
+
+    def cancel_listing(self):
+        """Ignore the result of a folder listing that is still running."""
+        self.listing_worker = None
+        self.pending_selected_file = None
+
+    def show_pdf_files(self, pdf_files, selected_file=None):
+        """Replace the file list, keeping selected_file (or the file on screen) current."""
+        current_file = selected_file or self.pdf_viewer.current_file
+        self.pdf_files = pdf_files
+        self.current_index = 0
+        if current_file:
+            for index, file_path in enumerate(self.pdf_files):
+                if same_file(file_path, current_file):
+                    self.current_index = index
+                    break
+
+        if not self.pdf_files:
+            self.load_current_file()
+        elif self.pdf_viewer.current_file and same_file(self.pdf_files[self.current_index], self.pdf_viewer.current_file):
+            # Same file still on screen: only the position and neighbours changed
+            self.counter_label.setText(f"{self.current_index + 1} / {len(self.pdf_files)}")
+            self.prefetch_neighbours()
+        else:
+            self.load_current_file()
+        self.update_navigation_buttons()
+
+    def update_listing_progress(self, found):
+        if self.sender() is self.listing_worker:
+            self.statusBar().showMessage(f"Listing PDF files... {found} found")
+
+    def folder_listed(self, folder_path, pdf_files):
+        if self.sender() is not self.listing_worker:
+            return  # A newer folder was selected meanwhile
+        self.listing_worker = None
+        selected_file, self.pending_selected_file = self.pending_selected_file, None
+        if pdf_files:
+            self.show_pdf_files(pdf_files, selected_file)
+            self.statusBar().showMessage(f"Loaded {len(self.pdf_files)} PDF files")
+            # Log file loading
+            conn = self.create_connection()
+            try:
+                AuditLogger.log_action(
+                    conn,
+                    self.current_user,
+                    "BOOK_VIEWER_FILES_LOADED",
+                    f"Loaded {len(self.pdf_files)} PDF files from folder"
+                )
+                conn.commit()
+            except Exception as e:
+                print(f"Failed to log files loaded: {e}")
+            finally:
+                self.closeConnection()
+        else:
             self.pdf_files = []
-            # Get all PDF files from the folder
-            for file in os.listdir(self.current_folder):
-                if file.lower().endswith('.pdf'):
-                    file_path = os.path.join(self.current_folder, file)
-                    self.pdf_files.append(file_path)
-            # Sort files naturally (1, 2, 10 instead of 1, 10, 2)
-            self.pdf_files.sort(key=lambda x: self.natural_sort_key(x))
-            if self.pdf_files:
-                if selected_file and selected_file in self.pdf_files:
-                    self.current_index = self.pdf_files.index(selected_file)
-                else:
-                    self.current_index = 0
-                self.load_current_file()
-                self.update_navigation_buttons()
-                self.statusBar().showMessage(f"Loaded {len(self.pdf_files)} PDF files")
-                # Log file loading
-                conn = self.create_connection()
-                try:
-                    AuditLogger.log_action(
-                        conn,
-                        self.current_user,
-                        "BOOK_VIEWER_FILES_LOADED",
-                        f"Loaded {len(self.pdf_files)} PDF files from folder"
-                    )
-                    conn.commit()
-                except Exception as e:
-                    print(f"Failed to log files loaded: {e}")
-                finally:
-                    self.closeConnection()
-            else:
-                self.file_label.setText("No PDF files found in selected folder")
-                self.counter_label.setText("0 / 0")
-                self.pdf_viewer.clear_pdf()
-                self.statusBar().showMessage("No PDF files found in the selected folder")
-                # Log no files found
-                conn = self.create_connection()
-                try:
-                    AuditLogger.log_action(
-                        conn,
-                        self.current_user,
-                        "BOOK_VIEWER_NO_FILES",
-                        "No PDF files found in selected folder"
-                    )
-                    conn.commit()
-                except Exception as e:
-                    print(f"Failed to log no files found: {e}")
-                finally:
-                    self.closeConnection()
-        except Exception as e:
-            QMessageBox.warning(self, "Error", f"Error loading PDF files: {str(e)}")
-            self.statusBar().showMessage("Error loading PDF files")
+            self.current_index = 0
+            self.update_navigation_buttons()
+            self.file_label.setText("No PDF files found in selected folder")
+            self.counter_label.setText("0 / 0")
+            self.pdf_viewer.clear_pdf()
+            self.statusBar().showMessage("No PDF files found in the selected folder")
+            # Log no files found
+            conn = self.create_connection()
+            try:
+                AuditLogger.log_action(
+                    conn,
+                    self.current_user,
+                    "BOOK_VIEWER_NO_FILES",
+                    "No PDF files found in selected folder"
+                )
+                conn.commit()
+            except Exception as e:
+                print(f"Failed to log no files found: {e}")
+            finally:
+                self.closeConnection()
+
+    def folder_listing_failed(self, folder_path, error):
+        if self.sender() is not self.listing_worker:
+            return
+        self.listing_worker = None
+        self.pending_selected_file = None
+        QMessageBox.warning(self, "Error", f"Error loading PDF files: {error}")
+        self.statusBar().showMessage("Error loading PDF files")
             
-    def natural_sort_key(self, file_path):
-        """Generate a key for natural sorting of filenames."""
-        filename = os.path.basename(file_path)
-        return [int(text) if text.isdigit() else text.lower() 
-                for text in re.split('([0-9]+)', filename)]
-    
     def load_current_file(self):
         """Load the current PDF file into the viewer."""
         if 0 <= self.current_index < len(self.pdf_files):
@@ -251,11 +299,20 @@ class BookViewerWindow(QMainWindow):
             self.counter_label.setText(f"{self.current_index + 1} / {len(self.pdf_files)}")
             
             self.statusBar().showMessage(f"Loaded: {filename}")
+            self.prefetch_neighbours()
         else:
             self.file_label.setText("No file selected")
             self.counter_label.setText("0 / 0")
             self.pdf_viewer.clear_pdf()
             
+    def prefetch_neighbours(self):
+        """Read ahead the files around the current one so arrow-key paging is instant."""
+        offsets = list(range(1, self.PREFETCH_AHEAD + 1)) + [-offset for offset in range(1, self.PREFETCH_BEHIND + 1)]
+        self.pdf_viewer.prefetch([
+            self.pdf_files[self.current_index + offset] for offset in offsets
+            if 0 <= self.current_index + offset < len(self.pdf_files)
+        ])
+            
     def next_file(self):
         """Navigate to the next PDF file."""
         if self.current_index < len(self.pdf_files) - 1:
@@ -365,6 +422,11 @@ class BookViewerWindow(QMainWindow):
             super().keyPressEvent(event)
 
 
+def same_file(path, other_path):
+    # The file dialog and the folder listing may use different separators
+    return os.path.normcase(os.path.normpath(path)) == os.path.normcase(os.path.normpath(other_path))
+
+
 # if __name__ == "__main__":
 #     app = QApplication(sys.argv)
 #     window = BookViewerWindow()
@@ -0,0 +1,85 @@
+"""
+Process-wide PostgreSQL connection pool shared by all windows and the Flask server
+"""
+import threading
+import time
+
+import psycopg2
+from psycopg2 import pool
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT, TRANSACTION_STATUS_UNKNOWN
+
+from db_config import POSTGRES_CONFIG
+
+MIN_CONNECTIONS = 1
+MAX_CONNECTIONS = 10
+HEALTH_CHECK_INTERVAL = 30  # seconds a connection may sit idle before it is pinged on checkout
+
+_pool = None
+_pool_lock = threading.Lock()
+_last_used = {}
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.closed:
+            _pool = pool.ThreadedConnectionPool(MIN_CONNECTIONS, MAX_CONNECTIONS, **POSTGRES_CONFIG)
+        return _pool
+
+
+def _is_healthy(conn):
+    """Cheap local checks first; ping the server only if the connection has been idle a while"""
+    if conn.closed or conn.info.transaction_status == TRANSACTION_STATUS_UNKNOWN:
+        return False
+    last_used = _last_used.get(id(conn))
+    if last_used is None or time.monotonic() - last_used < HEALTH_CHECK_INTERVAL:
+        return True
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        return True
+    except psycopg2.Error:
+        return False
+
+
+def get_connection():
+    """Check out an autocommit connection, replacing any that died (e.g. after a server restart)"""
+    connection_pool = _get_pool()
+    for _ in range(MAX_CONNECTIONS + 1):
+        conn = connection_pool.getconn()
+        if _is_healthy(conn):
+            if conn.isolation_level != ISOLATION_LEVEL_AUTOCOMMIT:
+                conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+            return conn
+        print("Discarding broken pooled database connection")
+        _last_used.pop(id(conn), None)
+        connection_pool.putconn(conn, close=True)
+    raise psycopg2.OperationalError("Could not obtain a healthy database connection")
+
+
+def release_connection(conn):
+    """Return a connection to the pool; connections not owned by the pool are closed"""
+    if conn is None:
+        return
+    with _pool_lock:
+        connection_pool = _pool
+    try:
+        if connection_pool is None or connection_pool.closed:
+            conn.close()
+            return
+        _last_used[id(conn)] = time.monotonic()
+        connection_pool.putconn(conn, close=conn.closed)
+    except pool.PoolError:
+        pass  # Already returned, or checked out before the pool was recreated
+    except psycopg2.Error as e:
+        print(f"Error releasing database connection: {str(e)}")
+
+
+def close_pool():
+    """Close every pooled connection; called when the application exits"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None and not _pool.closed:
+            _pool.closeall()
+        _pool = None
+        _last_used.clear()
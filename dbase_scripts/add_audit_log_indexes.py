@@ -0,0 +1,48 @@
+import psycopg2
+from db_config import POSTGRES_CONFIG
+
+def add_audit_log_indexes():
+    """Add the (timestamp, id) indexes the Audit Logbook pages through.
+
+    audit_log_model.AuditLogQuery orders by timestamp DESC, id DESC and fetches
+    each page after a (timestamp, id) cursor; with these indexes every page is
+    a short index range scan, with or without the action filter.
+    """
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    sql_commands = [
+        """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_audit_timestamp_id
+        ON audit_log (timestamp, id);
+        """,
+        """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_audit_action_timestamp_id
+        ON audit_log (action, timestamp, id);
+        """,
+        "ANALYZE audit_log;",
+    ]
+
+    conn = None
+    try:
+        print("Connecting to database...")
+        conn = psycopg2.connect(**POSTGRES_CONFIG)
+        conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        cur = conn.cursor()
+
+        for sql in sql_commands:
+            print(f"\nExecuting: {sql.strip()}")
+            cur.execute(sql)
+            print("✅ Command executed successfully")
+
+        print("\n✅ Successfully added audit log indexes!")
+
+    except (Exception, psycopg2.DatabaseError) as error:
+        print(f"\n❌ Error creating indexes: {error}")
+    finally:
+        if conn is not None:
+            conn.close()
+            print("\nDatabase connection closed.")
+
+if __name__ == "__main__":
+    print("Starting migration to add audit log indexes...")
+    add_audit_log_indexes()
@@ -0,0 +1,57 @@
+import psycopg2
+from db_config import POSTGRES_CONFIG
+
+def add_date_search_indexes():
+    """Add B-tree and month/day expression indexes used by the Verify windows' date search."""
+
+    # (table, date column) pairs searched by verify.py
+    date_columns = [
+        ("birth_index", "date_of_birth"),
+        ("death_index", "date_of_death"),
+        ("marriage_index", "date_of_marriage"),
+    ]
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    sql_commands = []
+    for table, column in date_columns:
+        # Exact dates and BETWEEN ranges
+        sql_commands.append(f"""
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_{table}_{column}
+        ON {table} ({column});
+        """)
+        # Month/day in any year; the expressions must match record_search.build_date_search
+        sql_commands.append(f"""
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_{table}_{column}_month_day
+        ON {table} ((EXTRACT(MONTH FROM {column})), (EXTRACT(DAY FROM {column})));
+        """)
+        # Keyset paging order; the expression must match record_search.sort_date
+        sql_commands.append(f"""
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_{table}_{column}_sort
+        ON {table} ((COALESCE({column}, DATE '0001-01-01')), id);
+        """)
+        sql_commands.append(f"ANALYZE {table};")
+
+    conn = None
+    try:
+        print("Connecting to database...")
+        conn = psycopg2.connect(**POSTGRES_CONFIG)
+        conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        cur = conn.cursor()
+
+        for sql in sql_commands:
+            print(f"\nExecuting: {sql.strip()}")
+            cur.execute(sql)
+            print("✅ Command executed successfully")
+
+        print("\n✅ Successfully added date search indexes!")
+
+    except (Exception, psycopg2.DatabaseError) as error:
+        print(f"\n❌ Error creating indexes: {error}")
+    finally:
+        if conn is not None:
+            conn.close()
+            print("\nDatabase connection closed.")
+
+if __name__ == "__main__":
+    print("Starting migration to add date search indexes...")
+    add_date_search_indexes()
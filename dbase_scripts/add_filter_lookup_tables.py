@@ -0,0 +1,77 @@
+import psycopg2
+from db_config import POSTGRES_CONFIG
+
+def add_filter_lookup_tables():
+    """Add the lookup tables behind the log viewers' type dropdowns.
+
+    AuditLogViewer and ReleasingLogViewer listed their filter choices with
+    SELECT DISTINCT over the whole log every time they opened. They now read
+    audit_action_types and releasing_doc_types, a handful of rows each:
+    the audit writer adds actions it has not recorded before, and a trigger
+    adds the doc_type of every released document.
+    """
+
+    sql_commands = [
+        "CREATE TABLE IF NOT EXISTS audit_action_types (action VARCHAR(255) PRIMARY KEY);",
+        "CREATE TABLE IF NOT EXISTS releasing_doc_types (doc_type TEXT PRIMARY KEY);",
+        """
+        CREATE OR REPLACE FUNCTION record_releasing_doc_type() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO releasing_doc_types (doc_type) VALUES (NEW.doc_type)
+            ON CONFLICT DO NOTHING;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+        """,
+        """
+        DROP TRIGGER IF EXISTS trg_releasing_log_doc_type ON releasing_log;
+        CREATE TRIGGER trg_releasing_log_doc_type
+        AFTER INSERT OR UPDATE OF doc_type ON releasing_log
+        FOR EACH ROW EXECUTE PROCEDURE record_releasing_doc_type();
+        """,
+        # Backfill with a skip scan: one index probe per distinct action via
+        # idx_audit_action_timestamp_id, rather than reading the whole log
+        """
+        INSERT INTO audit_action_types (action)
+        WITH RECURSIVE actions AS (
+            (SELECT action FROM audit_log ORDER BY action LIMIT 1)
+            UNION ALL
+            SELECT (SELECT action FROM audit_log WHERE action > actions.action ORDER BY action LIMIT 1)
+            FROM actions WHERE actions.action IS NOT NULL
+        )
+        SELECT action FROM actions WHERE action IS NOT NULL
+        ON CONFLICT DO NOTHING;
+        """,
+        """
+        INSERT INTO releasing_doc_types (doc_type)
+        SELECT DISTINCT doc_type FROM releasing_log
+        ON CONFLICT DO NOTHING;
+        """,
+    ]
+
+    conn = None
+    try:
+        print("Connecting to database...")
+        conn = psycopg2.connect(**POSTGRES_CONFIG)
+        cur = conn.cursor()
+
+        for sql in sql_commands:
+            print(f"\nExecuting: {sql.strip()}")
+            cur.execute(sql)
+            print("✅ Command executed successfully")
+
+        conn.commit()
+        print("\n✅ Successfully added filter lookup tables!")
+
+    except (Exception, psycopg2.DatabaseError) as error:
+        if conn is not None:
+            conn.rollback()
+        print(f"\n❌ Error adding lookup tables: {error}")
+    finally:
+        if conn is not None:
+            conn.close()
+            print("\nDatabase connection closed.")
+
+if __name__ == "__main__":
+    print("Starting migration to add filter lookup tables...")
+    add_filter_lookup_tables()
@@ -0,0 +1,55 @@
+import psycopg2
+from db_config import POSTGRES_CONFIG
+
+def add_name_search_indexes():
+    """Add pg_trgm GIN indexes used by the Verify windows' name search."""
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block,
+    # so every command runs in autocommit mode and tagging can continue meanwhile
+    sql_commands = [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm;",
+        """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_birth_index_name_trgm
+        ON birth_index USING gin (lower(name) gin_trgm_ops);
+        """,
+        """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_death_index_name_trgm
+        ON death_index USING gin (lower(name) gin_trgm_ops);
+        """,
+        """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_marriage_index_husband_name_trgm
+        ON marriage_index USING gin (lower(husband_name) gin_trgm_ops);
+        """,
+        """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_marriage_index_wife_name_trgm
+        ON marriage_index USING gin (lower(wife_name) gin_trgm_ops);
+        """,
+        "ANALYZE birth_index;",
+        "ANALYZE death_index;",
+        "ANALYZE marriage_index;",
+    ]
+
+    conn = None
+    try:
+        print("Connecting to database...")
+        conn = psycopg2.connect(**POSTGRES_CONFIG)
+        conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        cur = conn.cursor()
+
+        for sql in sql_commands:
+            print(f"\nExecuting: {sql.strip()}")
+            cur.execute(sql)
+            print("✅ Command executed successfully")
+
+        print("\n✅ Successfully added name search indexes!")
+
+    except (Exception, psycopg2.DatabaseError) as error:
+        print(f"\n❌ Error creating indexes: {error}")
+    finally:
+        if conn is not None:
+            conn.close()
+            print("\nDatabase connection closed.")
+
+if __name__ == "__main__":
+    print("Starting migration to add name search indexes...")
+    add_name_search_indexes()
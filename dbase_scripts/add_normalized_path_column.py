@@ -0,0 +1,51 @@
+import psycopg2
+from db_config import POSTGRES_CONFIG
+
+def add_normalized_path_column():
+    """Add a stored, uniquely indexed normalized_path column to the index tables.
+
+    Record lookups used WHERE normalize_path(file_path) = %s, which cannot use
+    the unique index on file_path. The generated column keeps the forward-slash
+    form of file_path up to date on every insert/update, so the tagging windows
+    need no changes and lookups become an index probe.
+    """
+
+    tables = ["birth_index", "death_index", "marriage_index"]
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    sql_commands = []
+    for table in tables:
+        sql_commands.append(f"""
+        ALTER TABLE {table}
+        ADD COLUMN IF NOT EXISTS normalized_path TEXT
+        GENERATED ALWAYS AS (replace(file_path, '\\', '/')) STORED;
+        """)
+        sql_commands.append(f"""
+        CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS idx_{table}_normalized_path
+        ON {table} (normalized_path);
+        """)
+
+    conn = None
+    try:
+        print("Connecting to database...")
+        conn = psycopg2.connect(**POSTGRES_CONFIG)
+        conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        cur = conn.cursor()
+
+        for sql in sql_commands:
+            print(f"\nExecuting: {sql.strip()}")
+            cur.execute(sql)
+            print("✅ Command executed successfully")
+
+        print("\n✅ Successfully added normalized_path columns!")
+
+    except (Exception, psycopg2.DatabaseError) as error:
+        print(f"\n❌ Error modifying tables: {error}")
+    finally:
+        if conn is not None:
+            conn.close()
+            print("\nDatabase connection closed.")
+
+if __name__ == "__main__":
+    print("Starting migration to add normalized_path columns...")
+    add_normalized_path_column()
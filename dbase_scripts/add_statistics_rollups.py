@@ -0,0 +1,148 @@
+import psycopg2
+from db_config import POSTGRES_CONFIG
+
+# Columns the Statistics window can chart for each index table, with the date
+# column its ranges filter on. Keep in step with key_column_map in stats.py.
+ROLLUP_COLUMNS = {
+    "birth_index": ("date_of_birth", [
+        "name", "sex", "place_of_birth", "name_of_mother", "name_of_father",
+        "nationality_mother", "nationality_father", "attendant", "late_registration", "twin",
+    ]),
+    "death_index": ("date_of_death", [
+        "name", "sex", "age", "civil_status", "nationality", "place_of_death",
+        "cause_of_death", "corpse_disposal", "late_registration",
+    ]),
+    "marriage_index": ("date_of_marriage", [
+        "husband_name", "husband_age", "husb_civil_status", "husb_nationality",
+        "wife_name", "wife_age", "wife_civil_status", "wife_nationality",
+        "place_of_marriage", "ceremony_type", "late_registration",
+    ]),
+}
+
+
+def add_statistics_rollups():
+    """Create statistics_monthly: per-month record counts for every charted column.
+
+    The Statistics window used to group the raw index rows on every click. With
+    this table a date-range statistic sums a few hundred monthly rows instead.
+    Triggers on the index tables keep the counts current as the tagging windows
+    save and delete records, so there is nothing to refresh by hand.
+
+    Values are stored as text (is_null marks a NULL value, since NULLs cannot be
+    part of the primary key); stats.py casts them back to the column's type.
+    """
+
+    sql_commands = [
+        """
+        CREATE TABLE IF NOT EXISTS statistics_monthly (
+            index_table TEXT NOT NULL,
+            key_column TEXT NOT NULL,
+            month DATE NOT NULL,
+            is_null BOOLEAN NOT NULL,
+            value TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (index_table, key_column, month, is_null, value)
+        );
+        """,
+        """
+        CREATE OR REPLACE FUNCTION bump_statistics_monthly(
+            p_index_table TEXT, p_key_column TEXT, p_month DATE, p_value TEXT, p_delta INTEGER
+        ) RETURNS void AS $$
+        BEGIN
+            IF p_month IS NULL THEN
+                RETURN;  -- Undated records never fall in a date range
+            END IF;
+            INSERT INTO statistics_monthly AS s (index_table, key_column, month, is_null, value, count)
+            VALUES (p_index_table, p_key_column, p_month, p_value IS NULL, COALESCE(p_value, ''), p_delta)
+            ON CONFLICT (index_table, key_column, month, is_null, value)
+            DO UPDATE SET count = s.count + EXCLUDED.count;
+            IF p_delta < 0 THEN
+                DELETE FROM statistics_monthly
+                WHERE index_table = p_index_table AND key_column = p_key_column AND month = p_month
+                  AND is_null = (p_value IS NULL) AND value = COALESCE(p_value, '') AND count <= 0;
+            END IF;
+        END;
+        $$ LANGUAGE plpgsql;
+        """,
+        # Trigger arguments: the date column, then the columns to count
+        """
+        CREATE OR REPLACE FUNCTION refresh_statistics_monthly() RETURNS trigger AS $$
+        DECLARE
+            old_row JSONB;
+            new_row JSONB;
+            old_month DATE;
+            new_month DATE;
+            key_column TEXT;
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                old_row := to_jsonb(OLD);
+                old_month := date_trunc('month', (old_row ->> TG_ARGV[0])::date)::date;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                new_row := to_jsonb(NEW);
+                new_month := date_trunc('month', (new_row ->> TG_ARGV[0])::date)::date;
+            END IF;
+
+            FOREACH key_column IN ARRAY TG_ARGV[1:TG_NARGS - 1] LOOP
+                -- Saving a record rewrites every column; only move counts that changed
+                IF old_month IS NOT DISTINCT FROM new_month
+                   AND (old_row ->> key_column) IS NOT DISTINCT FROM (new_row ->> key_column) THEN
+                    CONTINUE;
+                END IF;
+                PERFORM bump_statistics_monthly(TG_TABLE_NAME, key_column, old_month, old_row ->> key_column, -1);
+                PERFORM bump_statistics_monthly(TG_TABLE_NAME, key_column, new_month, new_row ->> key_column, 1);
+            END LOOP;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+        """,
+    ]
+
+    for table, (date_column, columns) in ROLLUP_COLUMNS.items():
+        # Block writes while the table is counted so no save is missed or counted twice
+        sql_commands.append(f"LOCK TABLE {table} IN SHARE MODE;")
+        sql_commands.append(f"""
+        DROP TRIGGER IF EXISTS trg_{table}_statistics_monthly ON {table};
+        CREATE TRIGGER trg_{table}_statistics_monthly
+        AFTER INSERT OR UPDATE OR DELETE ON {table}
+        FOR EACH ROW EXECUTE PROCEDURE refresh_statistics_monthly('{date_column}', {', '.join(f"'{column}'" for column in columns)});
+        """)
+        sql_commands.append(f"DELETE FROM statistics_monthly WHERE index_table = '{table}';")
+        # ::text renders values exactly as the trigger's jsonb ->> does
+        values = ", ".join(f"('{column}', {column}::text)" for column in columns)
+        sql_commands.append(f"""
+        INSERT INTO statistics_monthly (index_table, key_column, month, is_null, value, count)
+        SELECT '{table}', v.key_column, date_trunc('month', {date_column})::date,
+               v.value IS NULL, COALESCE(v.value, ''), COUNT(*)
+        FROM {table}, LATERAL (VALUES {values}) AS v(key_column, value)
+        WHERE {date_column} IS NOT NULL
+        GROUP BY 1, 2, 3, 4, 5;
+        """)
+
+    conn = None
+    try:
+        print("Connecting to database...")
+        conn = psycopg2.connect(**POSTGRES_CONFIG)
+        cur = conn.cursor()
+
+        # One transaction: the triggers and the backfill take effect together
+        for sql in sql_commands:
+            print(f"\nExecuting: {sql.strip()}")
+            cur.execute(sql)
+            print("✅ Command executed successfully")
+
+        conn.commit()
+        print("\n✅ Successfully created statistics rollups!")
+
+    except (Exception, psycopg2.DatabaseError) as error:
+        if conn is not None:
+            conn.rollback()
+        print(f"\n❌ Error creating statistics rollups: {error}")
+    finally:
+        if conn is not None:
+            conn.close()
+            print("\nDatabase connection closed.")
+
+if __name__ == "__main__":
+    print("Starting migration to add statistics rollups...")
+    add_statistics_rollups()
@@ -0,0 +1,41 @@
+import argparse
+import psycopg2
+from db_config import POSTGRES_CONFIG
+from audit_archive import ARCHIVE_DIR, archive_old_months
+
+def archive_audit_log(keep_months, archive_dir):
+    """Archive audit_log months older than keep_months to gzipped CSV files.
+
+    Each archived partition is detached and dropped, and recorded in
+    audit_log_archive so the Audit Logbook can restore it on demand. Run
+    after dbase_scripts/partition_audit_log.py, e.g. monthly from a
+    scheduled task.
+    """
+    conn = None
+    try:
+        print("Connecting to database...")
+        conn = psycopg2.connect(**POSTGRES_CONFIG)
+
+        archived = archive_old_months(conn, keep_months, archive_dir)
+        for month, file_path, row_count in archived:
+            print(f"✅ Archived {month:%Y-%m} ({row_count} rows) to {file_path}")
+
+        print(f"\n✅ Archived {len(archived)} month(s)")
+
+    except (Exception, psycopg2.DatabaseError) as error:
+        print(f"\n❌ Error archiving audit log: {error}")
+    finally:
+        if conn is not None:
+            conn.close()
+            print("\nDatabase connection closed.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archive old audit_log partitions")
+    parser.add_argument("--keep-months", type=int, default=12,
+                        help="months before the current one to keep online (default: 12)")
+    parser.add_argument("--archive-dir", default=ARCHIVE_DIR,
+                        help="folder for the .csv.gz files; use a share every workstation can read")
+    args = parser.parse_args()
+
+    print("Starting audit log archival...")
+    archive_audit_log(args.keep_months, args.archive_dir)
@@ -0,0 +1,129 @@
+import ast
+import json
+import psycopg2
+from psycopg2.extras import execute_values
+from db_config import POSTGRES_CONFIG
+
+BATCH_SIZE = 5000
+
+def reject_constant(name):
+    raise ValueError(f"{name} is not valid in JSONB")
+
+def parse_details(text):
+    """Turn a stored details string into JSON text.
+
+    Older rows hold str(dict), a Python repr; newer ones are already JSON.
+    Anything neither can parse is kept verbatim under a "text" key.
+    """
+    try:
+        json.loads(text, parse_constant=reject_constant)
+        return text
+    except ValueError:
+        pass
+    try:
+        return json.dumps(ast.literal_eval(text), default=str, allow_nan=False)
+    except (ValueError, SyntaxError, MemoryError, RecursionError):
+        return json.dumps({"text": text})
+
+def convert_audit_details_to_jsonb():
+    """Convert audit_log.details from TEXT to JSONB and index it.
+
+    Rows are converted in batches into a new column while the app keeps
+    logging; the few rows written meanwhile are converted in the final,
+    briefly locked step that swaps the columns. The Audit Logbook's detail
+    filters use the GIN indexes created at the end.
+    """
+
+    conn = None
+    try:
+        print("Connecting to database...")
+        conn = psycopg2.connect(**POSTGRES_CONFIG)
+        cur = conn.cursor()
+
+        cur.execute("""
+            SELECT data_type FROM information_schema.columns
+            WHERE table_name = 'audit_log' AND column_name = 'details'
+        """)
+        row = cur.fetchone()
+        if row and row[0] == "jsonb":
+            print("\n✅ audit_log.details is already JSONB")
+            return
+
+        # Fallback for values the Python conversion never saw; also used when
+        # restoring months archived before this migration (audit_archive.py)
+        cur.execute("""
+            CREATE OR REPLACE FUNCTION audit_details_to_jsonb(details TEXT) RETURNS JSONB AS $$
+            BEGIN
+                RETURN details::jsonb;
+            EXCEPTION WHEN others THEN
+                RETURN jsonb_build_object('text', details);
+            END;
+            $$ LANGUAGE plpgsql IMMUTABLE;
+        """)
+        cur.execute("ALTER TABLE audit_log ADD COLUMN IF NOT EXISTS details_json JSONB;")
+        conn.commit()
+        print("✅ Added details_json column")
+
+        last_id = 0
+        converted = 0
+        while True:
+            cur.execute("""
+                SELECT id, timestamp, details FROM audit_log
+                WHERE id > %s ORDER BY id LIMIT %s
+            """, (last_id, BATCH_SIZE))
+            rows = cur.fetchall()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+
+            values = [(id, timestamp, parse_details(details)) for id, timestamp, details in rows if details is not None]
+            if values:
+                execute_values(cur, """
+                    UPDATE audit_log AS a SET details_json = v.details::jsonb
+                    FROM (VALUES %s) AS v(id, timestamp, details)
+                    WHERE a.id = v.id AND a.timestamp = v.timestamp
+                """, values, page_size=1000)
+            conn.commit()
+            converted += len(values)
+            print(f"Converted {converted} rows...")
+
+        print("\nSwapping columns...")
+        cur.execute("LOCK TABLE audit_log IN SHARE ROW EXCLUSIVE MODE;")
+        cur.execute("""
+            UPDATE audit_log SET details_json = audit_details_to_jsonb(details)
+            WHERE details IS NOT NULL AND details_json IS NULL;
+        """)
+        cur.execute("ALTER TABLE audit_log DROP COLUMN details;")
+        cur.execute("ALTER TABLE audit_log RENAME COLUMN details_json TO details;")
+        conn.commit()
+        print("✅ audit_log.details is now JSONB")
+
+        sql_commands = [
+            # Containment (details @> '{"form_type": ...}') on any key
+            "CREATE INDEX IF NOT EXISTS idx_audit_details ON audit_log USING gin (details jsonb_path_ops);",
+            # Substring filters on file names and search queries
+            "CREATE EXTENSION IF NOT EXISTS pg_trgm;",
+            "CREATE INDEX IF NOT EXISTS idx_audit_details_file_trgm ON audit_log USING gin ((details ->> 'file') gin_trgm_ops);",
+            "CREATE INDEX IF NOT EXISTS idx_audit_details_query_trgm ON audit_log USING gin ((details ->> 'query') gin_trgm_ops);",
+            "ANALYZE audit_log;",
+        ]
+        for sql in sql_commands:
+            print(f"\nExecuting: {sql.strip()}")
+            cur.execute(sql)
+            conn.commit()
+            print("✅ Command executed successfully")
+
+        print("\n✅ Successfully converted audit log details to JSONB!")
+
+    except (Exception, psycopg2.DatabaseError) as error:
+        if conn is not None:
+            conn.rollback()
+        print(f"\n❌ Error converting audit log details: {error}")
+    finally:
+        if conn is not None:
+            conn.close()
+            print("\nDatabase connection closed.")
+
+if __name__ == "__main__":
+    print("Starting migration to convert audit_log.details to JSONB...")
+    convert_audit_details_to_jsonb()
@@ -7,4 +7,22 @@ CREATE TABLE IF NOT EXISTS releasing_log (
     received_by TEXT NOT NULL,
     released_by TEXT NOT NULL,
     timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-); 
\ No newline at end of file
+); 
+
+-- Choices for the Releasing Logbook's type filter, kept current by a trigger
+CREATE TABLE IF NOT EXISTS releasing_doc_types (
+    doc_type TEXT PRIMARY KEY
+);
+
+CREATE OR REPLACE FUNCTION record_releasing_doc_type() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO releasing_doc_types (doc_type) VALUES (NEW.doc_type)
+    ON CONFLICT DO NOTHING;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_releasing_log_doc_type ON releasing_log;
+CREATE TRIGGER trg_releasing_log_doc_type
+AFTER INSERT OR UPDATE OF doc_type ON releasing_log
+FOR EACH ROW EXECUTE PROCEDURE record_releasing_doc_type();
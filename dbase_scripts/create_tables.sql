@@ -85,4 +85,94 @@ ALTER TABLE birth_index ADD COLUMN IF NOT EXISTS remarks TEXT NULL;
 ALTER TABLE death_index ADD COLUMN IF NOT EXISTS remarks TEXT NULL;
 
 -- Add remarks column to marriage_index
-ALTER TABLE marriage_index ADD COLUMN IF NOT EXISTS remarks TEXT NULL; 
\ No newline at end of file
+ALTER TABLE marriage_index ADD COLUMN IF NOT EXISTS remarks TEXT NULL; 
+
+-- Trigram indexes for the Verify windows' name search
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS idx_birth_index_name_trgm ON birth_index USING gin (lower(name) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_death_index_name_trgm ON death_index USING gin (lower(name) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_marriage_index_husband_name_trgm ON marriage_index USING gin (lower(husband_name) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_marriage_index_wife_name_trgm ON marriage_index USING gin (lower(wife_name) gin_trgm_ops);
+
+-- Date indexes for the Verify windows' date search (exact/range and month/day in any year)
+CREATE INDEX IF NOT EXISTS idx_birth_index_date_of_birth ON birth_index (date_of_birth);
+CREATE INDEX IF NOT EXISTS idx_birth_index_date_of_birth_month_day ON birth_index ((EXTRACT(MONTH FROM date_of_birth)), (EXTRACT(DAY FROM date_of_birth)));
+CREATE INDEX IF NOT EXISTS idx_death_index_date_of_death ON death_index (date_of_death);
+CREATE INDEX IF NOT EXISTS idx_death_index_date_of_death_month_day ON death_index ((EXTRACT(MONTH FROM date_of_death)), (EXTRACT(DAY FROM date_of_death)));
+CREATE INDEX IF NOT EXISTS idx_marriage_index_date_of_marriage ON marriage_index (date_of_marriage);
+CREATE INDEX IF NOT EXISTS idx_marriage_index_date_of_marriage_month_day ON marriage_index ((EXTRACT(MONTH FROM date_of_marriage)), (EXTRACT(DAY FROM date_of_marriage)));
+
+-- Stored forward-slash form of file_path so record lookups can use a unique index
+ALTER TABLE birth_index ADD COLUMN IF NOT EXISTS normalized_path TEXT GENERATED ALWAYS AS (replace(file_path, '\', '/')) STORED;
+ALTER TABLE death_index ADD COLUMN IF NOT EXISTS normalized_path TEXT GENERATED ALWAYS AS (replace(file_path, '\', '/')) STORED;
+ALTER TABLE marriage_index ADD COLUMN IF NOT EXISTS normalized_path TEXT GENERATED ALWAYS AS (replace(file_path, '\', '/')) STORED;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_birth_index_normalized_path ON birth_index (normalized_path);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_death_index_normalized_path ON death_index (normalized_path);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_marriage_index_normalized_path ON marriage_index (normalized_path);
+
+-- Monthly counts per charted column for the Statistics window, kept current by triggers
+CREATE TABLE IF NOT EXISTS statistics_monthly (
+    index_table TEXT NOT NULL,
+    key_column TEXT NOT NULL,
+    month DATE NOT NULL,
+    is_null BOOLEAN NOT NULL,
+    value TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (index_table, key_column, month, is_null, value)
+);
+CREATE OR REPLACE FUNCTION bump_statistics_monthly(
+    p_index_table TEXT, p_key_column TEXT, p_month DATE, p_value TEXT, p_delta INTEGER
+) RETURNS void AS $$
+BEGIN
+    IF p_month IS NULL THEN
+        RETURN;  -- Undated records never fall in a date range
+    END IF;
+    INSERT INTO statistics_monthly AS s (index_table, key_column, month, is_null, value, count)
+    VALUES (p_index_table, p_key_column, p_month, p_value IS NULL, COALESCE(p_value, ''), p_delta)
+    ON CONFLICT (index_table, key_column, month, is_null, value)
+    DO UPDATE SET count = s.count + EXCLUDED.count;
+    IF p_delta < 0 THEN
+        DELETE FROM statistics_monthly
+        WHERE index_table = p_index_table AND key_column = p_key_column AND month = p_month
+          AND is_null = (p_value IS NULL) AND value = COALESCE(p_value, '') AND count <= 0;
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+CREATE OR REPLACE FUNCTION refresh_statistics_monthly() RETURNS trigger AS $$
+DECLARE
+    old_row JSONB;
+    new_row JSONB;
+    old_month DATE;
+    new_month DATE;
+    key_column TEXT;
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        old_row := to_jsonb(OLD);
+        old_month := date_trunc('month', (old_row ->> TG_ARGV[0])::date)::date;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        new_row := to_jsonb(NEW);
+        new_month := date_trunc('month', (new_row ->> TG_ARGV[0])::date)::date;
+    END IF;
+
+    FOREACH key_column IN ARRAY TG_ARGV[1:TG_NARGS - 1] LOOP
+        -- Saving a record rewrites every column; only move counts that changed
+        IF old_month IS NOT DISTINCT FROM new_month
+           AND (old_row ->> key_column) IS NOT DISTINCT FROM (new_row ->> key_column) THEN
+            CONTINUE;
+        END IF;
+        PERFORM bump_statistics_monthly(TG_TABLE_NAME, key_column, old_month, old_row ->> key_column, -1);
+        PERFORM bump_statistics_monthly(TG_TABLE_NAME, key_column, new_month, new_row ->> key_column, 1);
+    END LOOP;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+DROP TRIGGER IF EXISTS trg_birth_index_statistics_monthly ON birth_index;
+CREATE TRIGGER trg_birth_index_statistics_monthly AFTER INSERT OR UPDATE OR DELETE ON birth_index
+FOR EACH ROW EXECUTE PROCEDURE refresh_statistics_monthly('date_of_birth', 'name', 'sex', 'place_of_birth', 'name_of_mother', 'name_of_father', 'nationality_mother', 'nationality_father', 'attendant', 'late_registration', 'twin');
+DROP TRIGGER IF EXISTS trg_death_index_statistics_monthly ON death_index;
+CREATE TRIGGER trg_death_index_statistics_monthly AFTER INSERT OR UPDATE OR DELETE ON death_index
+FOR EACH ROW EXECUTE PROCEDURE refresh_statistics_monthly('date_of_death', 'name', 'sex', 'age', 'civil_status', 'nationality', 'place_of_death', 'cause_of_death', 'corpse_disposal', 'late_registration');
+DROP TRIGGER IF EXISTS trg_marriage_index_statistics_monthly ON marriage_index;
+CREATE TRIGGER trg_marriage_index_statistics_monthly AFTER INSERT OR UPDATE OR DELETE ON marriage_index
+FOR EACH ROW EXECUTE PROCEDURE refresh_statistics_monthly('date_of_marriage', 'husband_name', 'husband_age', 'husb_civil_status', 'husb_nationality', 'wife_name', 'wife_age', 'wife_civil_status', 'wife_nationality', 'place_of_marriage', 'ceremony_type', 'late_registration');
@@ -26,14 +26,85 @@ def init_audit_db():
     conn = psycopg2.connect(**POSTGRES_CONFIG)
     cursor = conn.cursor()
 
-    # Create audit_log table
+    # Create audit_log table, range-partitioned by month (see partition_audit_log.py)
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS audit_log (
-            id SERIAL PRIMARY KEY,
+            id SERIAL,
             username VARCHAR(100) NOT NULL,
             action VARCHAR(255) NOT NULL,
-            details TEXT,
-            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            details JSONB,
+            timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (id, timestamp)
+        ) PARTITION BY RANGE (timestamp)
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS audit_log_default PARTITION OF audit_log DEFAULT
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS audit_log_archive (
+            month DATE PRIMARY KEY,
+            file_path TEXT NOT NULL,
+            row_count BIGINT NOT NULL,
+            archived_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            restored BOOLEAN NOT NULL DEFAULT FALSE
+        )
+    ''')
+
+    # Called monthly by the audit writer to add partitions ahead of time
+    cursor.execute('''
+        CREATE OR REPLACE FUNCTION create_audit_log_partitions(first_month DATE, last_month DATE)
+        RETURNS void AS $$
+        DECLARE
+            partition_month DATE := date_trunc('month', first_month)::date;
+        BEGIN
+            WHILE partition_month <= last_month LOOP
+                IF to_regclass('audit_log_' || to_char(partition_month, 'YYYY_MM')) IS NULL THEN
+                    BEGIN
+                        EXECUTE format(
+                            'CREATE TABLE %I PARTITION OF audit_log FOR VALUES FROM (%L) TO (%L)',
+                            'audit_log_' || to_char(partition_month, 'YYYY_MM'),
+                            partition_month, (partition_month + interval '1 month')::date
+                        );
+                    EXCEPTION
+                        WHEN duplicate_table THEN
+                            NULL;  -- Created concurrently by another client
+                        WHEN check_violation THEN
+                            -- audit_log_default already holds rows for this month: move them
+                            -- into the new partition. A failure only skips this month.
+                            BEGIN
+                                ALTER TABLE audit_log DETACH PARTITION audit_log_default;
+                                EXECUTE format(
+                                    'CREATE TABLE %I PARTITION OF audit_log FOR VALUES FROM (%L) TO (%L)',
+                                    'audit_log_' || to_char(partition_month, 'YYYY_MM'),
+                                    partition_month, (partition_month + interval '1 month')::date
+                                );
+                                EXECUTE format(
+                                    'WITH moved AS (
+                                        DELETE FROM audit_log_default WHERE timestamp >= %L AND timestamp < %L
+                                        RETURNING id, username, action, details, timestamp
+                                    )
+                                    INSERT INTO %I (id, username, action, details, timestamp) SELECT * FROM moved',
+                                    partition_month, (partition_month + interval '1 month')::date,
+                                    'audit_log_' || to_char(partition_month, 'YYYY_MM')
+                                );
+                                ALTER TABLE audit_log ATTACH PARTITION audit_log_default DEFAULT;
+                            EXCEPTION WHEN others THEN
+                                RAISE WARNING 'Could not create audit_log partition for %: %', partition_month, SQLERRM;
+                            END;
+                    END;
+                END IF;
+                partition_month := (partition_month + interval '1 month')::date;
+            END LOOP;
+        END;
+        $$ LANGUAGE plpgsql
+    ''')
+
+    cursor.execute('''
+        SELECT create_audit_log_partitions(
+            date_trunc('month', now())::date,
+            (date_trunc('month', now()) + interval '3 months')::date
         )
     ''')
 
@@ -42,10 +113,52 @@ def init_audit_db():
         CREATE INDEX IF NOT EXISTS idx_audit_username 
         ON audit_log(username)
     ''')
-    
+
+    # Keyset paging in the Audit Logbook, with and without the action filter
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_audit_timestamp_id
+        ON audit_log(timestamp, id)
+    ''')
+
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_audit_action_timestamp_id
+        ON audit_log(action, timestamp, id)
+    ''')
+
+    # Filters on keys inside details (see convert_audit_details_to_jsonb.py)
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_audit_details
+        ON audit_log USING gin (details jsonb_path_ops)
+    ''')
+
+    cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_audit_details_file_trgm
+        ON audit_log USING gin ((details ->> 'file') gin_trgm_ops)
+    ''')
+
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_audit_details_query_trgm
+        ON audit_log USING gin ((details ->> 'query') gin_trgm_ops)
+    ''')
+
+    # Choices for the Audit Logbook's action filter, added to by the audit writer
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS audit_action_types (
+            action VARCHAR(255) PRIMARY KEY
+        )
+    ''')
+
+    # Reads details archived as text; used when restoring old archive files
     cursor.execute('''
-        CREATE INDEX IF NOT EXISTS idx_audit_timestamp 
-        ON audit_log(timestamp)
+        CREATE OR REPLACE FUNCTION audit_details_to_jsonb(details TEXT) RETURNS JSONB AS $$
+        BEGIN
+            RETURN details::jsonb;
+        EXCEPTION WHEN others THEN
+            RETURN jsonb_build_object('text', details);
+        END;
+        $$ LANGUAGE plpgsql IMMUTABLE
     ''')
 
     conn.commit()
@@ -0,0 +1,154 @@
+import psycopg2
+from db_config import POSTGRES_CONFIG
+
+MONTHS_AHEAD = 3  # Future monthly partitions created up front
+
+# Also replaced on databases partitioned before it moved rows out of audit_log_default
+CREATE_PARTITIONS_FUNCTION = """
+    CREATE OR REPLACE FUNCTION create_audit_log_partitions(first_month DATE, last_month DATE)
+    RETURNS void AS $$
+    DECLARE
+        partition_month DATE := date_trunc('month', first_month)::date;
+    BEGIN
+        WHILE partition_month <= last_month LOOP
+            IF to_regclass('audit_log_' || to_char(partition_month, 'YYYY_MM')) IS NULL THEN
+                BEGIN
+                    EXECUTE format(
+                        'CREATE TABLE %I PARTITION OF audit_log FOR VALUES FROM (%L) TO (%L)',
+                        'audit_log_' || to_char(partition_month, 'YYYY_MM'),
+                        partition_month, (partition_month + interval '1 month')::date
+                    );
+                EXCEPTION
+                    WHEN duplicate_table THEN
+                        NULL;  -- Created concurrently by another client
+                    WHEN check_violation THEN
+                        -- audit_log_default already holds rows for this month: move them
+                        -- into the new partition. A failure only skips this month.
+                        BEGIN
+                            ALTER TABLE audit_log DETACH PARTITION audit_log_default;
+                            EXECUTE format(
+                                'CREATE TABLE %I PARTITION OF audit_log FOR VALUES FROM (%L) TO (%L)',
+                                'audit_log_' || to_char(partition_month, 'YYYY_MM'),
+                                partition_month, (partition_month + interval '1 month')::date
+                            );
+                            EXECUTE format(
+                                'WITH moved AS (
+                                    DELETE FROM audit_log_default WHERE timestamp >= %L AND timestamp < %L
+                                    RETURNING id, username, action, details, timestamp
+                                )
+                                INSERT INTO %I (id, username, action, details, timestamp) SELECT * FROM moved',
+                                partition_month, (partition_month + interval '1 month')::date,
+                                'audit_log_' || to_char(partition_month, 'YYYY_MM')
+                            );
+                            ALTER TABLE audit_log ATTACH PARTITION audit_log_default DEFAULT;
+                        EXCEPTION WHEN others THEN
+                            RAISE WARNING 'Could not create audit_log partition for %: %', partition_month, SQLERRM;
+                        END;
+                END;
+            END IF;
+            partition_month := (partition_month + interval '1 month')::date;
+        END LOOP;
+    END;
+    $$ LANGUAGE plpgsql;
+"""
+
+def partition_audit_log():
+    """Convert audit_log to a table range-partitioned by month on timestamp.
+
+    Inserts and the Audit Logbook's date-range queries then only touch the
+    months involved, and old months can be detached and archived with
+    dbase_scripts/archive_audit_log.py instead of deleted row by row.
+    create_audit_log_partitions() is called by the audit writer each month to
+    add partitions ahead of time; anything outside them lands in
+    audit_log_default rather than failing.
+
+    Runs in one transaction with audit_log locked, so audit events written
+    meanwhile wait instead of being lost.
+    """
+
+    sql_commands = [
+        "LOCK TABLE audit_log IN ACCESS EXCLUSIVE MODE;",
+        "ALTER TABLE audit_log RENAME TO audit_log_unpartitioned;",
+        "ALTER TABLE audit_log_unpartitioned RENAME CONSTRAINT audit_log_pkey TO audit_log_unpartitioned_pkey;",
+        """
+        DROP INDEX IF EXISTS idx_audit_username, idx_audit_timestamp,
+            idx_audit_timestamp_id, idx_audit_action_timestamp_id;
+        """,
+        # The primary key of a partitioned table must include the partition key
+        """
+        CREATE TABLE audit_log (
+            id INTEGER NOT NULL DEFAULT nextval('audit_log_id_seq'),
+            username VARCHAR(100) NOT NULL,
+            action VARCHAR(255) NOT NULL,
+            details TEXT,
+            timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (id, timestamp)
+        ) PARTITION BY RANGE (timestamp);
+        """,
+        "ALTER SEQUENCE audit_log_id_seq OWNED BY audit_log.id;",
+        "CREATE TABLE audit_log_default PARTITION OF audit_log DEFAULT;",
+        """
+        CREATE TABLE IF NOT EXISTS audit_log_archive (
+            month DATE PRIMARY KEY,
+            file_path TEXT NOT NULL,
+            row_count BIGINT NOT NULL,
+            archived_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            restored BOOLEAN NOT NULL DEFAULT FALSE
+        );
+        """,
+        CREATE_PARTITIONS_FUNCTION,
+        f"""
+        SELECT create_audit_log_partitions(
+            COALESCE((SELECT MIN(timestamp) FROM audit_log_unpartitioned), now())::date,
+            (date_trunc('month', now()) + interval '{MONTHS_AHEAD} months')::date
+        );
+        """,
+        # Entries without a timestamp have never matched a date filter; keep them in the default partition
+        """
+        INSERT INTO audit_log (id, username, action, details, timestamp)
+        SELECT id, username, action, details, COALESCE(timestamp, '-infinity')
+        FROM audit_log_unpartitioned;
+        """,
+        "DROP TABLE audit_log_unpartitioned;",
+        # Indexes on the parent are created on every partition, present and future
+        "CREATE INDEX idx_audit_username ON audit_log (username);",
+        "CREATE INDEX idx_audit_timestamp_id ON audit_log (timestamp, id);",
+        "CREATE INDEX idx_audit_action_timestamp_id ON audit_log (action, timestamp, id);",
+    ]
+
+    conn = None
+    try:
+        print("Connecting to database...")
+        conn = psycopg2.connect(**POSTGRES_CONFIG)
+        cur = conn.cursor()
+
+        cur.execute("SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'audit_log'::regclass")
+        if cur.fetchone():
+            print(f"\nExecuting: {CREATE_PARTITIONS_FUNCTION.strip()}")
+            cur.execute(CREATE_PARTITIONS_FUNCTION)
+            conn.commit()
+            print("\n✅ audit_log is already partitioned; updated create_audit_log_partitions()")
+            return
+
+        for sql in sql_commands:
+            print(f"\nExecuting: {sql.strip()}")
+            cur.execute(sql)
+            print("✅ Command executed successfully")
+
+        conn.commit()
+        cur.execute("ANALYZE audit_log;")
+        conn.commit()
+        print("\n✅ Successfully partitioned audit_log!")
+
+    except (Exception, psycopg2.DatabaseError) as error:
+        if conn is not None:
+            conn.rollback()
+        print(f"\n❌ Error partitioning audit_log: {error}")
+    finally:
+        if conn is not None:
+            conn.close()
+            print("\nDatabase connection closed.")
+
+if __name__ == "__main__":
+    print("Starting migration to partition audit_log by month...")
+    partition_audit_log()
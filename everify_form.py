@@ -15,6 +15,7 @@ import json
 import psycopg2
 from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
 from db_config import POSTGRES_CONFIG
+from db_pool import get_connection, release_connection
 from datetime import datetime, timedelta 
 from urllib.parse import urlparse
 from flask_server.app import get_access_token
@@ -198,16 +199,15 @@ class eVerifyForm(QWidget):
         self.birth_date_input.setDate(QDate.currentDate())
     
     def create_connection(self):
-        """Create a new PostgreSQL database connection"""
+        """Check out a PostgreSQL connection from the shared pool"""
         if self.connection is None:
-            self.connection = psycopg2.connect(**POSTGRES_CONFIG)
-            self.connection.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+            self.connection = get_connection()
         return self.connection
 
     def closeConnection(self):
-        """Safely close the PostgreSQL connection"""
+        """Return the PostgreSQL connection to the shared pool"""
         if self.connection:
-            self.connection.close()
+            release_connection(self.connection)
             self.connection = None
 
     def manual_check_if_already_verified(self):
@@ -310,7 +310,7 @@ class eVerifyForm(QWidget):
                     {"method": "manual_check", "error": str(e)}
                 )
             finally:
-                error_conn.close()
+                self.closeConnection()
             # QMessageBox.critical(self, "Database Error", f"Verification check failed: {str(e)}")
             box = QMessageBox(self)
             box.setIcon(QMessageBox.Critical)
@@ -337,7 +337,7 @@ class eVerifyForm(QWidget):
             )
             self.start_liveness_check()
         finally:
-            final_conn.close()
+            self.closeConnection()
 
     def qr_check_if_already_verified(self, qr_data):
         conn = self.create_connection()
@@ -441,7 +441,7 @@ class eVerifyForm(QWidget):
                     {"method": "qr_scan", "error": str(e)}
                 )
             finally:
-                error_conn.close()
+                self.closeConnection()
             # QMessageBox.critical(self, "Database Error", f"QR verification check failed: {str(e)}")
             box = QMessageBox(self)
             box.setIcon(QMessageBox.Critical)
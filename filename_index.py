@@ -0,0 +1,206 @@
+"""
+Local SQLite index of the PDF filenames under the MCR share, used by the
+Search by Filename windows instead of walking the share on every search
+"""
+import os
+import sqlite3
+import threading
+import time
+
+INDEX_DB_PATH = "filename_index.db"
+REFRESH_INTERVAL = 60  # seconds before a year folder is revalidated against the share
+
+
+class FilenameIndex:
+    """Filenames keyed by record type / year, refreshed by comparing directory mtimes"""
+
+    def __init__(self, db_path=INDEX_DB_PATH, refresh_interval=REFRESH_INTERVAL):
+        self.db_path = db_path
+        self.refresh_interval = refresh_interval
+        self.locks = {}
+        self.locks_guard = threading.Lock()
+        self.last_refresh = {}
+        self.init_db()
+
+    def connect(self):
+        # One short-lived connection per call so search workers on other threads can use the index
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    def init_db(self):
+        conn = self.connect()
+        try:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS indexed_dirs (
+                    record_type TEXT NOT NULL,
+                    year TEXT NOT NULL,
+                    dir_path TEXT NOT NULL,
+                    mtime REAL NOT NULL,
+                    PRIMARY KEY (record_type, year, dir_path)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS indexed_files (
+                    record_type TEXT NOT NULL,
+                    year TEXT NOT NULL,
+                    dir_path TEXT NOT NULL,
+                    filename TEXT NOT NULL,
+                    filename_lower TEXT NOT NULL,
+                    mtime REAL,
+                    PRIMARY KEY (record_type, year, dir_path, filename)
+                )
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_indexed_files_year
+                ON indexed_files(record_type, year)
+            """)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def refresh(self, search_path, year, force=False):
+        """Bring the index for one year folder up to date.
+
+        Only directories whose mtime changed since the last refresh are listed
+        again, so an unchanged year folder costs one stat per directory. The
+        share is scanned before any rows are written, so refreshes of different
+        year folders can run in parallel.
+        """
+        record_type = os.path.basename(search_path)
+        key = (record_type, year)
+        with self.key_lock(key):
+            if not force and time.monotonic() - self.last_refresh.get(key, 0) < self.refresh_interval:
+                return
+
+            conn = self.connect()
+            try:
+                known = dict(conn.execute(
+                    "SELECT dir_path, mtime FROM indexed_dirs WHERE record_type = ? AND year = ?",
+                    key
+                ).fetchall())
+                changed, seen = self.scan_changes(os.path.join(search_path, year), known)
+                removed = set(known) - seen
+
+                if changed or removed:
+                    with conn:
+                        for dir_path, (mtime, files) in changed.items():
+                            self.replace_directory(conn, record_type, year, dir_path, mtime, files)
+                        # Forget directories that disappeared from the share
+                        for dir_path in removed:
+                            conn.execute(
+                                "DELETE FROM indexed_dirs WHERE record_type = ? AND year = ? AND dir_path = ?",
+                                (record_type, year, dir_path)
+                            )
+                            conn.execute(
+                                "DELETE FROM indexed_files WHERE record_type = ? AND year = ? AND dir_path = ?",
+                                (record_type, year, dir_path)
+                            )
+            finally:
+                conn.close()
+            self.last_refresh[key] = time.monotonic()
+
+    def key_lock(self, key):
+        """Per record type/year lock so the same folder is never scanned twice at once"""
+        with self.locks_guard:
+            return self.locks.setdefault(key, threading.Lock())
+
+    def scan_changes(self, folder, known):
+        """Walk the folder, listing only directories whose mtime differs from known"""
+        changed = {}
+        seen = set()
+        pending = [folder]
+        while pending:
+            dir_path = pending.pop()
+            try:
+                mtime = os.stat(dir_path).st_mtime
+            except OSError:
+                continue
+            seen.add(dir_path)
+
+            if known.get(dir_path) == mtime:
+                # Unchanged: reuse the subdirectories recorded last time
+                pending.extend(self.known_subdirs(known, dir_path))
+                continue
+
+            files = []
+            subdirs = []
+            try:
+                with os.scandir(dir_path) as entries:
+                    for entry in entries:
+                        if entry.is_dir():
+                            subdirs.append(entry.path)
+                        elif entry.name.lower().endswith('.pdf'):
+                            try:
+                                file_mtime = entry.stat().st_mtime
+                            except OSError:
+                                file_mtime = None
+                            files.append((entry.name, file_mtime))
+            except OSError as e:
+                if not os.path.isdir(dir_path):
+                    # Deleted during the scan; its entries are dropped with the removed directories
+                    seen.discard(dir_path)
+                    continue
+                # Unreadable for now: keep what was indexed and list it again on the next refresh
+                print(f"Could not list {dir_path}: {str(e)}")
+                pending.extend(self.known_subdirs(known, dir_path))
+                continue
+            pending.extend(subdirs)
+            changed[dir_path] = (mtime, files)
+        return changed, seen
+
+    def known_subdirs(self, known, dir_path):
+        """Return the indexed directories directly inside dir_path"""
+        prefix = dir_path + os.sep
+        return [path for path in known if path.startswith(prefix) and os.sep not in path[len(prefix):]]
+
+    def replace_directory(self, conn, record_type, year, dir_path, mtime, files):
+        conn.execute(
+            "DELETE FROM indexed_files WHERE record_type = ? AND year = ? AND dir_path = ?",
+            (record_type, year, dir_path)
+        )
+        conn.executemany("""
+            INSERT INTO indexed_files (record_type, year, dir_path, filename, filename_lower, mtime)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, [(record_type, year, dir_path, name, name.lower(), file_mtime) for name, file_mtime in files])
+        conn.execute("""
+            INSERT OR REPLACE INTO indexed_dirs (record_type, year, dir_path, mtime)
+            VALUES (?, ?, ?, ?)
+        """, (record_type, year, dir_path, mtime))
+
+    def list_years(self, search_path):
+        """Return the registration year folders under a record type folder"""
+        with os.scandir(search_path) as entries:
+            return sorted(
+                (entry.name for entry in entries if entry.is_dir() and entry.name.isdigit()),
+                reverse=True
+            )
+
+    def search(self, search_path, year, terms):
+        """Return filenames in the year folder that contain every search term"""
+        self.refresh(search_path, year)
+
+        record_type = os.path.basename(search_path)
+        sql = "SELECT filename FROM indexed_files WHERE record_type = ? AND year = ?"
+        params = [record_type, year]
+        for term in terms:
+            sql += " AND instr(filename_lower, ?) > 0"
+            params.append(term.lower())
+        sql += " ORDER BY dir_path, filename"
+
+        conn = self.connect()
+        try:
+            return [row[0] for row in conn.execute(sql, params).fetchall()]
+        finally:
+            conn.close()
+
+
+_filename_index = None
+_filename_index_lock = threading.Lock()
+
+
+def get_filename_index():
+    """Return the process-wide filename index, creating it on first use"""
+    global _filename_index
+    with _filename_index_lock:
+        if _filename_index is None:
+            _filename_index = FilenameIndex()
+        return _filename_index
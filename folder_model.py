@@ -0,0 +1,303 @@
+"""
+Shared model of a folder of record PDFs: natural-sorted listings revalidated by
+directory mtime, and first-page thumbnails rendered off the UI thread with a
+disk cache and an in-memory LRU shared by every window in the process
+"""
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import pymupdf
+from PySide6.QtCore import QObject, QThread, Signal
+from PySide6.QtGui import QImage
+
+THUMBNAIL_CACHE_DIR = "thumbnail_cache"
+THUMBNAIL_SCALE = 0.5
+MEMORY_CACHE_BYTES = 128 * 1024 * 1024  # decoded thumbnails kept in memory across windows
+
+# PyMuPDF is not thread-safe: every render in the process, here and in PDFViewer,
+# holds this lock. Stats and cache reads run in parallel.
+render_lock = threading.Lock()
+
+
+def natural_sort_key(file_name):
+    """Sort filenames naturally, treating numbers correctly (1, 2, 10 instead of 1, 10, 2)."""
+    return [int(text) if text.isdigit() else text.lower()
+            for text in re.split('([0-9]+)', os.path.basename(file_name))]
+
+
+class FolderListingCache:
+    """Natural-sorted PDF listings, reused until the folder's mtime changes.
+
+    Adding, removing or renaming a file updates the directory mtime, so an
+    unchanged folder on the share costs a single stat instead of a listing.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    PROGRESS_INTERVAL = 200  # PDFs found between progress callbacks while listing
+
+    def list(self, folder_path, progress=None):
+        """Return the full paths of the PDFs in a folder, naturally sorted.
+
+        progress, if given, is called with the number of PDFs found so far
+        while a changed folder is being listed.
+        """
+        mtime = os.stat(folder_path).st_mtime_ns
+        with self.lock:
+            entry = self.entries.get(folder_path)
+        if entry is not None and entry[0] == mtime:
+            return list(entry[1])
+
+        files = []
+        with os.scandir(folder_path) as entries:
+            for entry in entries:
+                if entry.name.lower().endswith('.pdf') and entry.is_file():
+                    files.append(entry.path)
+                    if progress and len(files) % self.PROGRESS_INTERVAL == 0:
+                        progress(len(files))
+        files.sort(key=natural_sort_key)
+        with self.lock:
+            self.entries[folder_path] = (mtime, files)
+        return list(files)
+
+    def cached(self, folder_path):
+        """Return the last listing of a folder without checking the share, or None"""
+        with self.lock:
+            entry = self.entries.get(folder_path)
+        return list(entry[1]) if entry is not None else None
+
+    def is_stale(self, folder_path):
+        """True when the folder changed (or vanished) since it was last listed"""
+        with self.lock:
+            entry = self.entries.get(folder_path)
+        if entry is None:
+            return True
+        try:
+            return os.stat(folder_path).st_mtime_ns != entry[0]
+        except OSError:
+            return True
+
+
+class FolderListingWorker(QThread):
+    listed = Signal(str, list)  # folder path, naturally sorted file paths
+    failed = Signal(str, str)  # folder path, error message
+    progress = Signal(int)  # PDFs found so far
+
+    def __init__(self, folder_listing, folder_path, parent=None):
+        super().__init__(parent)
+        self.folder_listing = folder_listing
+        self.folder_path = folder_path
+
+    def run(self):
+        try:
+            files = self.folder_listing.list(self.folder_path, self.progress.emit)
+        except Exception as e:
+            self.failed.emit(self.folder_path, str(e))
+            return
+        self.listed.emit(self.folder_path, files)
+
+
+class ThumbnailCache:
+    """First-page thumbnails addressed by a hash of the PDF's path, mtime and size.
+
+    PNGs persist on disk across sessions; decoded images are also kept in an
+    LRU capped at max_memory bytes so switching between windows and folders
+    does not decode the same thumbnails again.
+    """
+
+    def __init__(self, cache_dir=THUMBNAIL_CACHE_DIR, scale=THUMBNAIL_SCALE, max_memory=MEMORY_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.scale = scale
+        self.max_memory = max_memory
+        self.images = OrderedDict()
+        self.memory_used = 0
+        self.lock = threading.Lock()
+
+    def cache_key(self, pdf_path):
+        stat = os.stat(pdf_path)
+        key = f"{os.path.normcase(os.path.abspath(pdf_path))}|{stat.st_mtime_ns}|{stat.st_size}|{self.scale}"
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def get_image(self, pdf_path):
+        """Return the thumbnail as a QImage, from memory, disk or a fresh render.
+
+        A changed PDF gets a new mtime/size and therefore a new cache key, so
+        stale thumbnails are never served.
+        """
+        key = self.cache_key(pdf_path)
+        with self.lock:
+            image = self.images.get(key)
+            if image is not None:
+                self.images.move_to_end(key)
+                return image
+
+        image = QImage.fromData(self.get_png(pdf_path, key), "PNG")
+        if image.isNull():
+            raise Exception("Could not decode thumbnail")
+        self.remember(key, image)
+        return image
+
+    def remember(self, key, image):
+        size = image.sizeInBytes()
+        with self.lock:
+            if key in self.images:
+                return
+            self.images[key] = image
+            self.memory_used += size
+            # Evict least recently used thumbnails until back under the cap
+            while self.memory_used > self.max_memory and len(self.images) > 1:
+                _, evicted = self.images.popitem(last=False)
+                self.memory_used -= evicted.sizeInBytes()
+
+    def get_png(self, pdf_path, key):
+        cache_path = os.path.join(self.cache_dir, key[:2], f"{key}.png")
+        try:
+            with open(cache_path, "rb") as f:
+                return f.read()
+        except OSError:
+            pass
+
+        data = self.render(pdf_path)
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            # Write then rename so a concurrent reader never sees a partial file
+            temp_path = f"{cache_path}.{threading.get_ident()}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, cache_path)
+        except OSError as e:
+            print(f"Could not cache thumbnail for {pdf_path}: {str(e)}")
+        return data
+
+    def render(self, pdf_path):
+        """Render the first page of a PDF to PNG bytes."""
+        with render_lock:
+            doc = pymupdf.open(pdf_path)
+            try:
+                if doc.page_count == 0:
+                    raise Exception("PDF has no pages")
+                pix = doc[0].get_pixmap(matrix=pymupdf.Matrix(self.scale, self.scale))  # Scale down image
+                return pix.tobytes("png")
+            finally:
+                doc.close()
+
+
+class ThumbnailWorker(QThread):
+    thumbnail_ready = Signal(str, QImage)  # file path, thumbnail
+    thumbnail_failed = Signal(str, str)  # file path, error message
+
+    MAX_WORKERS = 4
+
+    def __init__(self, thumbnail_cache, file_paths, parent=None):
+        super().__init__(parent)
+        self.thumbnail_cache = thumbnail_cache
+        self.file_paths = file_paths
+
+    def run(self):
+        if not self.file_paths:
+            return
+        executor = ThreadPoolExecutor(max_workers=min(self.MAX_WORKERS, len(self.file_paths)))
+        try:
+            # Results are emitted in list order so the top of the list fills in first
+            futures = [(file_path, executor.submit(self.load_thumbnail, file_path)) for file_path in self.file_paths]
+            for file_path, future in futures:
+                if self.isInterruptionRequested():
+                    break
+                try:
+                    image = future.result()
+                except Exception as e:
+                    self.thumbnail_failed.emit(file_path, f"Failed to generate thumbnail: {str(e)}")
+                    continue
+                if image is not None:
+                    self.thumbnail_ready.emit(file_path, image)
+        finally:
+            # Thumbnails not started yet are skipped when the folder is replaced
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def load_thumbnail(self, file_path):
+        if self.isInterruptionRequested():
+            return None
+        return self.thumbnail_cache.get_image(file_path)
+
+
+class PdfFolderModel(QObject):
+    """The PDFs of one folder as shown by a window, with thumbnails loaded in the background"""
+
+    thumbnail_ready = Signal(str, QImage)  # file path, thumbnail
+    thumbnails_finished = Signal(list)  # [(filename, error), ...] for thumbnails that failed
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.folder_path = None
+        self.files = []
+        self.worker = None
+        self.failed = []
+
+    def load(self, folder_path, thumbnails=True):
+        """List the folder and, if asked, start loading thumbnails; returns the file paths"""
+        self.cancel()
+        self.files = get_folder_listing().list(folder_path)
+        self.folder_path = folder_path
+        self.failed = []
+        if thumbnails:
+            self.worker = ThumbnailWorker(get_thumbnail_cache(), list(self.files), self)
+            self.worker.thumbnail_ready.connect(self.forward_thumbnail)
+            self.worker.thumbnail_failed.connect(self.record_failure)
+            self.worker.finished.connect(self.worker_finished)
+            self.worker.start()
+        return list(self.files)
+
+    def has_changed(self):
+        """True when files were added, removed or renamed since the folder was loaded"""
+        return self.folder_path is not None and get_folder_listing().is_stale(self.folder_path)
+
+    def cancel(self):
+        """Stop loading thumbnails for the current folder."""
+        if self.worker is not None:
+            self.worker.requestInterruption()
+            self.worker = None
+
+    def forward_thumbnail(self, file_path, image):
+        if self.sender() is self.worker:  # Ignore late results from a replaced folder
+            self.thumbnail_ready.emit(file_path, image)
+
+    def record_failure(self, file_path, error):
+        if self.sender() is self.worker:
+            self.failed.append((os.path.basename(file_path), error))
+
+    def worker_finished(self):
+        worker = self.sender()
+        worker.deleteLater()
+        if worker is not self.worker:
+            return
+        self.worker = None
+        self.thumbnails_finished.emit(self.failed)
+
+
+_folder_listing = None
+_thumbnail_cache = None
+_shared_lock = threading.Lock()
+
+
+def get_folder_listing():
+    """Return the process-wide folder listing cache, creating it on first use"""
+    global _folder_listing
+    with _shared_lock:
+        if _folder_listing is None:
+            _folder_listing = FolderListingCache()
+        return _folder_listing
+
+
+def get_thumbnail_cache():
+    """Return the process-wide thumbnail cache, creating it on first use"""
+    global _thumbnail_cache
+    with _shared_lock:
+        if _thumbnail_cache is None:
+            _thumbnail_cache = ThumbnailCache()
+        return _thumbnail_cache
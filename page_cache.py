@@ -0,0 +1,168 @@
+"""
+Local disk cache of rendered PDF pages, so registers that are viewed often open
+without reading the MCR share or rasterizing with PyMuPDF
+"""
+import hashlib
+import json
+import os
+import threading
+
+PAGE_CACHE_DIR = "page_cache"
+MAX_CACHE_BYTES = 2 * 1024 * 1024 * 1024
+EVICT_TO = 0.9  # Fraction of MAX_CACHE_BYTES kept after an eviction pass
+
+# Pages are cached at these zoom levels only and scaled to the exact zoom on
+# display, so fit-to-width zooms that vary with the window size still hit
+ZOOM_LEVELS = (0.5, 0.75, 1.0, 1.25, 1.5, 2.0, 3.0)
+
+
+def standard_zoom(zoom):
+    """Return the smallest cached zoom level at least as sharp as zoom"""
+    for level in ZOOM_LEVELS:
+        if level >= zoom:
+            return level
+    return ZOOM_LEVELS[-1]
+
+
+class PageCache:
+    """PNG page images keyed by a hash of the PDF's path, mtime and size, page and zoom level.
+
+    Each file also gets a manifest of its page sizes so a viewer can lay the
+    document out before (or without) opening it. Reads refresh a file's mtime,
+    and once the cache grows past max_bytes a background thread deletes the
+    least recently used files, so writers (the GUI thread among them) never
+    walk the cache themselves.
+    """
+
+    def __init__(self, cache_dir=PAGE_CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.total_bytes = None  # Measured by the evictor thread when it starts
+        self.lock = threading.Lock()
+        self.evict_requested = threading.Event()
+        self.evictor = threading.Thread(target=self.run_evictor, name="PageCacheEvictor", daemon=True)
+        self.evictor.start()
+
+    def file_key(self, file_path):
+        """Identify a PDF by path, mtime and size; a changed file gets a new key."""
+        stat = os.stat(file_path)
+        key = f"{os.path.normcase(os.path.abspath(file_path))}|{stat.st_mtime_ns}|{stat.st_size}"
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def file_dir(self, key):
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def page_path(self, key, page_number, level):
+        return os.path.join(self.file_dir(key), f"{page_number}@{level}.png")
+
+    def get_manifest(self, key):
+        """Return the cached [(width, height), ...] page sizes, or None"""
+        path = os.path.join(self.file_dir(key), "manifest.json")
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                page_sizes = [tuple(size) for size in json.load(f)["page_sizes"]]
+            os.utime(path)  # Mark as recently used for eviction
+            return page_sizes
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def put_manifest(self, key, page_sizes):
+        self.write(os.path.join(self.file_dir(key), "manifest.json"),
+                   json.dumps({"page_sizes": page_sizes}).encode("utf-8"))
+
+    def has_page(self, key, page_number, level):
+        return os.path.exists(self.page_path(key, page_number, level))
+
+    def get_page(self, key, page_number, level):
+        """Return the cached PNG bytes of a page, or None on a miss"""
+        path = self.page_path(key, page_number, level)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)  # Mark as recently used for eviction
+            return data
+        except OSError:
+            return None
+
+    def put_page(self, key, page_number, level, data):
+        self.write(self.page_path(key, page_number, level), data)
+
+    def write(self, path, data):
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write then rename so a concurrent reader never sees a partial file
+            temp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"Could not write page cache entry {path}: {str(e)}")
+            return
+
+        with self.lock:
+            if self.total_bytes is not None:
+                self.total_bytes += len(data)
+                if self.total_bytes > self.max_bytes:
+                    self.evict_requested.set()
+
+    def run_evictor(self):
+        """Measure the cache once, then evict whenever a write takes it past its cap"""
+        measured = sum(size for _, size, _ in self.entries())
+        with self.lock:
+            self.total_bytes = measured
+            over = measured > self.max_bytes
+        while True:
+            if over:
+                self.evict()
+            self.evict_requested.wait()
+            self.evict_requested.clear()
+            over = True
+
+    def entries(self):
+        """Yield (mtime, size, path) for every file in the cache"""
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                yield stat.st_mtime, stat.st_size, path
+
+    def evict(self):
+        """Delete the least recently used files until the cache is under EVICT_TO of its cap"""
+        entries = sorted(self.entries())
+        remaining = sum(size for _, size, _ in entries)
+        with self.lock:
+            self.total_bytes = remaining
+        target = self.max_bytes * EVICT_TO
+        for _, size, path in entries:
+            if remaining <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            remaining -= size
+            with self.lock:
+                self.total_bytes -= size
+            # Drop directories of files whose pages are all gone
+            directory = os.path.dirname(path)
+            try:
+                if not os.listdir(directory):
+                    os.rmdir(directory)
+            except OSError:
+                pass
+
+
+_page_cache = None
+_page_cache_lock = threading.Lock()
+
+
+def get_page_cache():
+    """Return the process-wide page cache, creating it on first use"""
+    global _page_cache
+    with _page_cache_lock:
+        if _page_cache is None:
+            _page_cache = PageCache()
+        return _page_cache
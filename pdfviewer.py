@@ -1,23 +1,138 @@
 import sqlite3
 import os
-import pymupdf  
+import queue
+from collections import OrderedDict
+import pymupdf
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.backends.backend_pdf import PdfPages
 from reportlab.lib.pagesizes import letter
 from reportlab.pdfgen import canvas
 from PySide6.QtWidgets import *
-from PySide6.QtCore import Qt, QDate, QSize, QTimer
+from PySide6.QtCore import Qt, QDate, QSize, QTimer, QRect, QThread, Signal
 from PySide6.QtGui import QPixmap, QImage, QIcon
 from stylesheets import button_style
+from folder_model import render_lock
+from page_cache import get_page_cache, standard_zoom
+
+
+class PageRenderWorker(QThread):
+    """Renders pages on a background thread; requests from an older generation are skipped"""
+    page_rendered = Signal(int, str, int, float, QImage)  # generation, file path, page number, zoom, image
+
+    def __init__(self, page_cache, parent=None):
+        super().__init__(parent)
+        self.page_cache = page_cache
+        self.requests = queue.Queue()
+        self.generation = 0
+
+    def render(self, generation, file_path, file_key, document, page_number, zoom, size):
+        self.requests.put((generation, file_path, file_key, document, page_number, zoom, size))
+
+    def run(self):
+        while not self.isInterruptionRequested():
+            request = self.requests.get()
+            if request is None:
+                break
+            generation, file_path, file_key, document, page_number, zoom, size = request
+            if generation != self.generation:
+                continue  # Superseded by a later zoom, resize or load
+            try:
+                image = load_page_image(self.page_cache, file_key, document, page_number, zoom, size)
+            except Exception as e:
+                print(f"Error rendering page {page_number + 1}: {e}")
+                continue
+            if image is not None:
+                self.page_rendered.emit(generation, file_path, page_number, zoom, image)
+
+    def stop(self):
+        self.requestInterruption()
+        self.requests.put(None)
+        self.wait()
+
+
+class PrefetchWorker(QThread):
+    """Reads and opens files the user is likely to view next and renders their first screen"""
+    prefetched = Signal(str, object, object, list)  # file path, document or None, (mtime, size), [(page number, zoom, image)]
+
+    def __init__(self, page_cache, parent=None):
+        super().__init__(parent)
+        self.page_cache = page_cache
+        self.requests = queue.Queue()
+        self.generation = 0
+
+    def prefetch(self, generation, file_path, target_width, screen_height):
+        self.requests.put((generation, file_path, target_width, screen_height))
+
+    def run(self):
+        while not self.isInterruptionRequested():
+            request = self.requests.get()
+            if request is None:
+                break
+            generation, file_path, target_width, screen_height = request
+            if generation != self.generation:
+                continue  # The user has moved on to another file
+            try:
+                # Files whose first screen is in the page cache are not read from the share at all
+                file_key = self.page_cache.file_key(file_path)
+                doc = signature = None
+                page_sizes = self.page_cache.get_manifest(file_key)
+                if page_sizes is None:
+                    doc, signature = open_document(file_path)
+                    with render_lock:
+                        page_sizes = [(page.rect.width, page.rect.height) for page in doc]
+                    self.page_cache.put_manifest(file_key, page_sizes)
+
+                # Render what load_pdf will show first: the top of the file at fit-width zoom
+                images = []
+                if page_sizes:
+                    zoom = round(fit_zoom(page_sizes[0], target_width), 4)
+                    y = PDFViewer.PAGE_SPACING
+                    for page_number, (width, height) in enumerate(page_sizes):
+                        if y > screen_height or generation != self.generation:
+                            break
+                        if doc is None and not self.page_cache.has_page(file_key, page_number, standard_zoom(zoom)):
+                            doc, signature = open_document(file_path)
+                        size = (int(width * zoom), int(height * zoom))
+                        image = load_page_image(self.page_cache, file_key, doc, page_number, zoom, size)
+                        if image is not None:
+                            images.append((page_number, zoom, image))
+                        y += size[1] + PDFViewer.PAGE_SPACING
+            except Exception as e:
+                print(f"Error prefetching {file_path}: {e}")
+                continue
+            self.prefetched.emit(file_path, doc, signature, images)
+
+    def stop(self):
+        self.requestInterruption()
+        self.requests.put(None)
+        self.wait()
+
 
 class PDFViewer(QScrollArea):
-    """PDF Viewer with zoom support optimized for landscape files."""
+    """PDF Viewer with zoom support optimized for landscape files.
+
+    Pages are laid out from their sizes alone; only the pages intersecting the
+    viewport (plus a margin) are rasterized, into labels that are recycled as
+    the view scrolls. Rendered pages are kept in an LRU keyed by page and zoom.
+
+    Rasterizing happens on a background thread. Until a page arrives at the
+    current zoom, it shows whichever zoom of it is cached, scaled to size, so
+    zooming responds at once and sharpens a moment later.
+
+    Rendered pages and page sizes are also kept in the local page cache, and
+    the document is only opened for pages that are not there yet.
+    """
+    PAGE_SPACING = 10
+    RENDER_MARGIN = 0.5  # Fraction of the viewport height pre-rendered above and below it
+    MAX_CACHED_PIXMAP_BYTES = 256 * 1024 * 1024
+    MAX_OPEN_DOCUMENTS = 5  # The file on screen plus the ones prefetched around it
+
     def __init__(self, parent=None):
-        super().__init__(parent)      
-        self.setWidgetResizable(True)
+        super().__init__(parent)
+        # Pages are positioned by hand, so the content widget is sized explicitly
+        self.setWidgetResizable(False)
         self.pdf_widget = QWidget()
-        self.pdf_layout = QVBoxLayout(self.pdf_widget)
         self.setWidget(self.pdf_widget)
 
         self.pdf_widget.setStyleSheet("""
@@ -26,6 +141,10 @@ class PDFViewer(QScrollArea):
             }
         """)
 
+        self.message_label = QLabel(self.pdf_widget)
+        self.message_label.setAlignment(Qt.AlignCenter)
+        self.message_label.hide()
+
         self.zoom_factor = 1.0
         self.current_file = None
         self.target_width = 1000  # Target width for landscape pages
@@ -35,89 +154,406 @@ class PDFViewer(QScrollArea):
         self.last_width = self.width()
         self.manual_zoom = False  # Flag to track if zoom was set manually
 
+        self.page_cache = get_page_cache()
+        self.file_key = None  # Page cache key of current_file
+        self.file_key_path = None
+        self.document = None
+        self.documents = OrderedDict()  # File path -> (document, (mtime, size)) of recently viewed files
+        self.page_sizes = []  # Unscaled (width, height) of every page
+        self.page_rects = []  # Position of every page in pdf_widget at the current zoom
+        self.page_labels = {}  # Page number -> label currently showing it
+        self.spare_labels = []
+        self.pixmap_cache = OrderedDict()  # (file, page, zoom) -> QPixmap
+        self.pixmap_cache_bytes = 0
+        self.pending_renders = set()
+        self.render_generation = 0
+        self.prefetch_generation = 0
+
+        self.render_worker = PageRenderWorker(self.page_cache)
+        self.render_worker.page_rendered.connect(self.page_rendered)
+        self.render_worker.start()
+        self.prefetch_worker = PrefetchWorker(self.page_cache)
+        self.prefetch_worker.prefetched.connect(self.prefetch_ready)
+        self.prefetch_worker.start()
+        # Windows are hidden rather than deleted, so also stop the threads when the app quits
+        QApplication.instance().aboutToQuit.connect(self.render_worker.stop)
+        QApplication.instance().aboutToQuit.connect(self.prefetch_worker.stop)
+
+        self.verticalScrollBar().valueChanged.connect(self.update_visible_pages)
+        # Stop the worker threads and close cached documents with the widget;
+        # the lambda must not hold a reference to self
+        self.destroyed.connect(
+            lambda _=None, workers=(self.render_worker, self.prefetch_worker), documents=self.documents:
+                shutdown_viewer(workers, documents)
+        )
+
     def load_pdf(self, file_path):
         """Loads and displays the PDF with optimized scaling for landscape."""
         self.current_file = file_path
         self.manual_zoom = False  # Reset manual zoom flag
-        self.render_pdf()
+        self.render_pdf(revalidate=True)
 
-    def render_pdf(self):
-        """Renders the PDF with optimized scaling for landscape orientation."""
+    def render_pdf(self, revalidate=False):
+        """Lays out the PDF with optimized scaling for landscape orientation."""
         try:
             if not self.current_file:
                 return
 
-            # Open the PDF file
-            doc = pymupdf.open(self.current_file)
+            # Zoom and resize reuse the open document and cache key; only a new load checks the file again
+            if revalidate or self.file_key_path != self.current_file:
+                self.file_key = self.page_cache.file_key(self.current_file)
+                self.file_key_path = self.current_file
+
+            # Lay out from the cached page sizes when there are some; the document is
+            # then opened only if a visible page is missing from the page cache
+            page_sizes = self.page_cache.get_manifest(self.file_key)
+            doc = None
+            if page_sizes is None or self.current_file in self.documents:
+                doc = self.get_document(self.current_file, revalidate)
+            if page_sizes is None:
+                with render_lock:
+                    page_sizes = [(page.rect.width, page.rect.height) for page in doc]
+                self.page_cache.put_manifest(self.file_key, page_sizes)
             self.clear_pdf()
-            
+            self.document = doc
+            self.page_sizes = page_sizes
+
             # Calculate optimal zoom factor for landscape pages (only if not manual zoom)
-            if not self.manual_zoom and len(doc) > 0:
-                first_page = doc[0]
-                page_width = first_page.rect.width
-                page_height = first_page.rect.height
-                
-                # Calculate zoom factor to fit width
-                if page_width > page_height:  # Landscape
-                    # Scale to fit width with some padding
-                    available_width = self.target_width - 40  # 20px padding on each side
-                    self.zoom_factor = available_width / page_width
-                else:  # Portrait
-                    # Scale to fit width but maintain aspect ratio
-                    available_width = self.target_width - 40
-                    self.zoom_factor = available_width / page_width
-
-            dpi = 72 * self.zoom_factor
-
-            for page_number in range(len(doc)):
-                page = doc[page_number]
-                matrix = pymupdf.Matrix(dpi / 72, dpi / 72)
-                pix = page.get_pixmap(matrix=matrix)
-                image = QImage(pix.samples, pix.width, pix.height, pix.stride, QImage.Format_RGB888)
-                pixmap = QPixmap.fromImage(image)
-
-                label = QLabel()
-                label.setPixmap(pixmap)
-                label.setAlignment(Qt.AlignCenter)
-                label.setMinimumWidth(pixmap.width())
-                label.setMinimumHeight(pixmap.height())
-                self.pdf_layout.addWidget(label)
-                
+            if not self.manual_zoom and self.page_sizes:
+                self.zoom_factor = fit_zoom(self.page_sizes[0], self.target_width)
+
+            self.layout_pages()
+            self.update_visible_pages()
+
         except Exception as e:
             print(f"Error rendering PDF: {e}")
-            label = QLabel("Unable to load PDF.")
-            label.setAlignment(Qt.AlignCenter)
-            self.pdf_layout.addWidget(label)
+            self.show_message("Unable to load PDF.")
+
+    def layout_pages(self):
+        """Position every page at the current zoom without rendering any of them."""
+        scroll_bar = self.verticalScrollBar()
+        old_height = self.pdf_widget.height()
+        position = scroll_bar.value() / old_height if old_height else 0
+
+        rects = []
+        y = self.PAGE_SPACING
+        for width, height in self.page_sizes:
+            page_width = int(width * self.zoom_factor)
+            page_height = int(height * self.zoom_factor)
+            rects.append(QRect(0, y, page_width, page_height))
+            y += page_height + self.PAGE_SPACING
+
+        # Center the pages horizontally, as the old layout did
+        content_width = max([self.viewport().width()] + [rect.width() for rect in rects])
+        for rect in rects:
+            rect.moveLeft((content_width - rect.width()) // 2)
+
+        # Page geometry changed: renders still queued for the old layout are dropped
+        # and every visible page is placed again
+        self.start_render_generation()
+        for page_number in list(self.page_labels):
+            self.recycle_label(page_number)
+        self.page_rects = rects
+        self.pdf_widget.resize(content_width, y)
+        # Keep the same part of the document in view after zooming
+        scroll_bar.setValue(int(position * y))
+
+    def update_visible_pages(self):
+        """Show the pages near the viewport and recycle the labels of the rest."""
+        if not self.page_rects:
+            return
+
+        viewport_height = self.viewport().height()
+        margin = int(viewport_height * self.RENDER_MARGIN)
+        top = self.verticalScrollBar().value() - margin
+        bottom = self.verticalScrollBar().value() + viewport_height + margin
+        visible = [
+            page_number for page_number, rect in enumerate(self.page_rects)
+            if rect.bottom() >= top and rect.top() <= bottom
+        ]
+
+        for page_number in list(self.page_labels):
+            if page_number not in visible:
+                self.recycle_label(page_number)
+
+        for page_number in visible:
+            if page_number in self.page_labels:
+                continue
+            label = self.take_label()
+            label.setGeometry(self.page_rects[page_number])
+            self.show_page(page_number, label)
+            label.show()
+            self.page_labels[page_number] = label
+
+    def take_label(self):
+        if self.spare_labels:
+            return self.spare_labels.pop()
+        label = QLabel(self.pdf_widget)
+        label.setAlignment(Qt.AlignCenter)
+        label.setStyleSheet("QLabel { background-color: #F0F0F0; }")  # Shown until the page is rendered
+        return label
+
+    def recycle_label(self, page_number):
+        label = self.page_labels.pop(page_number)
+        label.hide()
+        label.clear()
+        self.spare_labels.append(label)
+
+    def pixmap_key(self, page_number):
+        return (self.current_file, page_number, round(self.zoom_factor, 4))
+
+    def show_page(self, page_number, label):
+        """Show the page at the current zoom if it is cached, else a stand-in while it renders."""
+        key = self.pixmap_key(page_number)
+        pixmap = self.pixmap_cache.get(key)
+        if pixmap is not None:
+            self.pixmap_cache.move_to_end(key)
+            label.setPixmap(pixmap)
+            return
+
+        # Scale the sharpest cached zoom of this page until the new render arrives
+        previews = [
+            (cached_key[2], cached) for cached_key, cached in self.pixmap_cache.items()
+            if cached_key[0] == self.current_file and cached_key[1] == page_number
+        ]
+        if previews:
+            _, preview = max(previews, key=lambda preview: preview[0])
+            label.setPixmap(preview.scaled(self.page_rects[page_number].size(), Qt.IgnoreAspectRatio, Qt.FastTransformation))
+        self.request_render(page_number)
+
+    def request_render(self, page_number):
+        key = self.pixmap_key(page_number)
+        if key in self.pending_renders:
+            return
+        if self.document is None and not self.page_cache.has_page(self.file_key, page_number, standard_zoom(key[2])):
+            # The first page of this file that is not on disk: open the file from the share
+            try:
+                self.document = self.get_document(self.current_file)
+            except Exception as e:
+                print(f"Error opening {self.current_file}: {e}")
+                return
+        self.pending_renders.add(key)
+        rect = self.page_rects[page_number]
+        self.render_worker.render(
+            self.render_generation, self.current_file, self.file_key, self.document,
+            page_number, key[2], (rect.width(), rect.height())
+        )
+
+    def start_render_generation(self):
+        self.render_generation += 1
+        self.render_worker.generation = self.render_generation
+        self.pending_renders.clear()
+
+    def page_rendered(self, generation, file_path, page_number, zoom, image):
+        key = (file_path, page_number, zoom)
+        self.pending_renders.discard(key)
+        pixmap = QPixmap.fromImage(image)
+        self.cache_pixmap(key, pixmap)
+        # A render from before the latest zoom is still cached, but not shown
+        label = self.page_labels.get(page_number)
+        if label is not None and key == self.pixmap_key(page_number):
+            label.setPixmap(pixmap)
+
+    def cache_pixmap(self, key, pixmap):
+        if key in self.pixmap_cache:
+            self.pixmap_cache.move_to_end(key)
+            return
+        self.pixmap_cache[key] = pixmap
+        self.pixmap_cache_bytes += pixmap.width() * pixmap.height() * pixmap.depth() // 8
+        # Evict least recently shown pages, whatever their zoom, until back under the cap
+        while self.pixmap_cache_bytes > self.MAX_CACHED_PIXMAP_BYTES and len(self.pixmap_cache) > 1:
+            _, evicted = self.pixmap_cache.popitem(last=False)
+            self.pixmap_cache_bytes -= evicted.width() * evicted.height() * evicted.depth() // 8
+
+    def show_message(self, text):
+        self.clear_pdf()
+        self.pdf_widget.resize(self.viewport().size())
+        self.message_label.setText(text)
+        self.message_label.setGeometry(self.pdf_widget.rect())
+        self.message_label.show()
 
     def clear_pdf(self):
         """Clears the current PDF view."""
-        while self.pdf_layout.count():
-            widget = self.pdf_layout.takeAt(0).widget()
-            if widget:
-                widget.deleteLater()
+        for page_number in list(self.page_labels):
+            self.recycle_label(page_number)
+        self.message_label.hide()
+        self.page_sizes = []
+        self.page_rects = []
+        self.pdf_widget.resize(0, 0)
+        self.document = None
+        self.start_render_generation()
+
+    def get_document(self, file_path, revalidate=False):
+        """Return an open document for file_path, reusing a cached handle.
+
+        The file is read from the share once and opened from memory, so zooming
+        and resizing only re-rasterize. With revalidate, a single stat checks
+        whether the file changed on disk since it was read.
+        """
+        entry = self.documents.get(file_path)
+        if entry is not None and revalidate:
+            stat = os.stat(file_path)
+            if (stat.st_mtime_ns, stat.st_size) != entry[1]:
+                self.close_document(file_path)
+                self.forget_pixmaps(file_path)
+                entry = None
+        if entry is not None:
+            self.documents.move_to_end(file_path)
+            return entry[0]
+
+        doc, signature = open_document(file_path)
+        self.add_document(file_path, doc, signature)
+        return doc
+
+    def add_document(self, file_path, doc, signature):
+        self.documents[file_path] = (doc, signature)
+        # Close the least recently viewed documents, never the one on screen
+        for cached_path in list(self.documents):
+            if len(self.documents) <= self.MAX_OPEN_DOCUMENTS:
+                break
+            if cached_path != file_path and self.documents[cached_path][0] is not self.document:
+                self.close_document(cached_path)
+
+    def prefetch(self, file_paths):
+        """Read, open and render the first screen of these files in the background.
+
+        Files are given most important first. Prefetches still queued for an
+        earlier call are dropped, and files already open are only marked as
+        recently used so they survive eviction.
+        """
+        self.prefetch_generation += 1
+        self.prefetch_worker.generation = self.prefetch_generation
+        screen_height = int(self.viewport().height() * (1 + self.RENDER_MARGIN))
+        for file_path in file_paths:
+            if file_path in self.documents:
+                self.documents.move_to_end(file_path)
+                continue
+            self.prefetch_worker.prefetch(self.prefetch_generation, file_path, self.target_width, screen_height)
+
+    def prefetch_ready(self, file_path, doc, signature, images):
+        if doc is None:
+            pass  # Served entirely from the page cache
+        elif file_path in self.documents:
+            # Opened on demand while the prefetch was running
+            with render_lock:
+                doc.close()
+        else:
+            self.add_document(file_path, doc, signature)
+        for page_number, zoom, image in images:
+            self.cache_pixmap((file_path, page_number, zoom), QPixmap.fromImage(image))
+
+    def close_document(self, file_path):
+        doc, _ = self.documents.pop(file_path)
+        if doc is self.document:
+            self.clear_pdf()
+        # Wait for any render of this document on the worker thread to finish
+        with render_lock:
+            doc.close()
+
+    def forget_pixmaps(self, file_path):
+        """Drop rendered pages of a file that changed on disk."""
+        for key in [key for key in self.pixmap_cache if key[0] == file_path]:
+            evicted = self.pixmap_cache.pop(key)
+            self.pixmap_cache_bytes -= evicted.width() * evicted.height() * evicted.depth() // 8
+
+    def close_documents(self):
+        """Close every cached document, e.g. before the widget is discarded."""
+        self.clear_pdf()
+        close_documents(self.documents)
 
     def set_zoom(self, zoom_factor):
-        """Updates the zoom factor and re-renders the PDF."""
+        """Updates the zoom factor and re-renders the visible pages."""
         self.zoom_factor = zoom_factor
         self.manual_zoom = True  # Mark as manual zoom
-        self.render_pdf()  # Re-render the PDF with the updated zoom factor
-        
+        if not self.page_rects:
+            self.render_pdf()
+            return
+        self.layout_pages()
+        self.update_visible_pages()
+
     def resizeEvent(self, event):
         """Handle window resize to recalculate zoom factor with debouncing."""
         super().resizeEvent(event)
-        
+        # A taller viewport may uncover pages that have not been rendered yet
+        self.update_visible_pages()
+
         # Only trigger resize if width actually changed significantly
         current_width = self.width()
         if abs(current_width - self.last_width) > 10:  # Only if width changed by more than 10px
             self.last_width = current_width
             self.target_width = current_width - 40  # Account for scrollbar and padding
-            
+
             # Stop any existing timer and start a new one
             self.resize_timer.stop()
             self.resize_timer.start(200)  # 200ms delay to prevent rapid re-renders
-            
+
     def delayed_resize_render(self):
         """Delayed render after resize to prevent shaking."""
         if self.current_file:
             self.manual_zoom = False  # Reset to auto-zoom on resize
-            self.render_pdf()
\ No newline at end of file
+            self.render_pdf()
+
+
+def close_documents(documents):
+    with render_lock:
+        for doc, _ in documents.values():
+            try:
+                doc.close()
+            except Exception:
+                pass  # Ignore documents that are already closed
+    documents.clear()
+
+
+def shutdown_viewer(workers, documents):
+    for worker in workers:
+        worker.stop()
+    close_documents(documents)
+
+
+def open_document(file_path):
+    """Read a PDF from disk in one go and open it from memory; returns (document, (mtime, size))"""
+    with open(file_path, "rb") as f:
+        data = f.read()
+        stat = os.fstat(f.fileno())
+    with render_lock:
+        doc = pymupdf.open(stream=data, filetype="pdf")
+    return doc, (stat.st_mtime_ns, stat.st_size)
+
+
+def load_page_image(page_cache, file_key, document, page_number, zoom, size):
+    """Return a page as a QImage of the given size, from the page cache or rendered from document.
+
+    Pages are rendered at the standard zoom level at or above zoom, stored in
+    the page cache and scaled to size. Returns None if the page is not cached
+    and the document is not open.
+    """
+    level = standard_zoom(zoom)
+    data = page_cache.get_page(file_key, page_number, level)
+    if data is None:
+        with render_lock:
+            if document is None or document.is_closed:
+                return None
+            data = document[page_number].get_pixmap(matrix=pymupdf.Matrix(level, level)).tobytes("png")
+        page_cache.put_page(file_key, page_number, level, data)
+
+    image = QImage.fromData(data, "PNG")
+    if image.isNull():
+        raise Exception("Could not decode page image")
+    width, height = size
+    if image.width() != width or image.height() != height:
+        image = image.scaled(width, height, Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+    return image
+
+
+def fit_zoom(page_size, target_width):
+    """Zoom factor that fits a page of the given size to the target width."""
+    page_width, page_height = page_size
+
+    # Calculate zoom factor to fit width
+    if page_width > page_height:  # Landscape
+        # Scale to fit width with some padding
+        available_width = target_width - 40  # 20px padding on each side
+    else:  # Portrait
+        # Scale to fit width but maintain aspect ratio
+        available_width = target_width - 40
+    return available_width / page_width
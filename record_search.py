@@ -0,0 +1,207 @@
+"""
+Query builders for the Verify windows' searches on birth_index, death_index
+and marriage_index
+"""
+import re
+from datetime import date, datetime, timedelta
+
+
+def escape_like(text):
+    """Escape LIKE wildcards so user input only matches literally"""
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def normalize_name(text):
+    """Lower-case and collapse whitespace the same way the trigram indexes see names"""
+    return re.sub(r'\s+', ' ', text).strip().lower()
+
+
+class RecordSearch:
+    """A Verify search over one index table, fetched a page at a time.
+
+    Rows are ordered by sort_keys (all descending) followed by id, so the last
+    row of a page is a keyset cursor: the next page is simply the rows that
+    sort after it. Every sort key must be non-NULL for the row comparison to
+    hold, which is why the builders wrap nullable expressions in COALESCE, and
+    must survive the round trip through psycopg2 unchanged, which rules out
+    floats and infinite dates.
+    """
+
+    def __init__(self, index_table, where, params, sort_keys):
+        self.index_table = index_table
+        self.where = where
+        self.params = params
+        self.sort_keys = sort_keys + ["id"]
+
+    def page_query(self, after=None, limit=200):
+        """Return (sql, params) for the page after the cursor; rows are (file_path, *cursor)"""
+        params = dict(self.params, limit=limit)
+        where = f"({self.where})"
+        if after is not None:
+            placeholders = []
+            for i, value in enumerate(after):
+                params[f"after_{i}"] = value
+                placeholders.append(f"%(after_{i})s")
+            where += f" AND ({', '.join(self.sort_keys)}) < ({', '.join(placeholders)})"
+
+        return f"""
+            SELECT file_path, {', '.join(self.sort_keys)} FROM {self.index_table}
+            WHERE {where}
+            ORDER BY {', '.join(f'{key} DESC' for key in self.sort_keys)}
+            LIMIT %(limit)s
+        """, params
+
+    def count_estimate_query(self):
+        """Return (sql, params) for the planner's row estimate; far cheaper than COUNT(*)"""
+        return f"""
+            EXPLAIN (FORMAT JSON) SELECT 1 FROM {self.index_table}
+            WHERE {self.where}
+        """, self.params
+
+
+def sort_date(date_column):
+    # A NULL would make the keyset row comparison unknown; treat undated records as oldest.
+    # Not '-infinity': psycopg2 reads it back as date.min and sends that as 0001-01-01,
+    # so the cursor would no longer match the value the rows sorted on
+    return f"COALESCE({date_column}, DATE '0001-01-01')"
+
+
+def build_name_search(index_table, name_columns, date_column, query, use_trigram=True):
+    """Build a ranked name search over one or more name columns.
+
+    With pg_trgm available, a row matches when a name contains the query or is
+    similar to it (the % operator); both predicates are served by the GIN
+    trigram indexes on lower(name). Substring matches rank first, then the
+    closest names, then the most recent records.
+    """
+    name = normalize_name(query)
+    params = {"pattern": f"%{escape_like(name)}%", "name": name}
+
+    substring = [f"lower({column}) LIKE %(pattern)s" for column in name_columns]
+    matches = list(substring)
+    sort_keys = [f"COALESCE({' OR '.join(substring)}, false)"]
+    if use_trigram:
+        matches += [f"lower({column}) %% %(name)s" for column in name_columns]
+        similarity = [f"similarity(lower({column}), %(name)s)" for column in name_columns]
+        # similarity() is a float4; psycopg2 would send it back as a float8 literal that
+        # no longer equals the sorted value, so page on an exact numeric instead
+        sort_keys.append(f"COALESCE(round(GREATEST({', '.join(similarity)})::numeric, 4), 0)")
+    sort_keys.append(sort_date(date_column))
+
+    return RecordSearch(index_table, ' OR '.join(matches), params, sort_keys)
+
+
+MONTHS = {
+    'january': 1, 'february': 2, 'march': 3, 'april': 4,
+    'may': 5, 'june': 6, 'july': 7, 'august': 8,
+    'september': 9, 'october': 10, 'november': 11, 'december': 12,
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4,
+    'jun': 6, 'jul': 7, 'aug': 8, 'sep': 9,
+    'sept': 9, 'oct': 10, 'nov': 11, 'dec': 12
+}
+
+# Numeric formats tried in order; ambiguous input such as 03/04/2020 matches several
+NUMERIC_DATE_FORMATS = ['%Y-%m-%d', '%d-%m-%Y', '%m/%d/%Y', '%d/%m/%Y']
+
+
+def parse_date_query(text):
+    """Parse a user-entered date into a typed criterion, or None if it is not a date.
+
+    Returns one of:
+        {"kind": "dates", "dates": [date, ...]}          exact date(s)
+        {"kind": "range", "start": date, "end": date}    a month, a year or a year range
+        {"kind": "month_day", "month": m, "day": d}      that day in any year
+        {"kind": "month", "month": m}                    that month in any year
+    """
+    date_str = re.sub(r'[\s,]+', ' ', text.lower()).strip()
+
+    # Written format: "December 17 2024", "Dec 17", "December 2024", "December"
+    written_match = re.fullmatch(r'([a-z]+)\.?(?: (\d{1,2}))?(?: (\d{4}))?', date_str)
+    if written_match:
+        month_name, day, year = written_match.groups()
+        month = MONTHS.get(month_name)
+        if month is None:
+            return None
+        try:
+            if day and year:
+                return {"kind": "dates", "dates": [date(int(year), month, int(day))]}
+            if day:
+                date(2000, month, int(day))  # Validate against a leap year
+                return {"kind": "month_day", "month": month, "day": int(day)}
+            if year:
+                return month_range(int(year), month)
+        except ValueError:
+            return None
+        return {"kind": "month", "month": month}
+
+    # A year or a range of years: "2024", "1990-1995"
+    year_match = re.fullmatch(r'(\d{4})(?: ?- ?(\d{4}))?', date_str)
+    if year_match:
+        start_year = int(year_match.group(1))
+        end_year = int(year_match.group(2) or start_year)
+        if start_year > end_year:
+            start_year, end_year = end_year, start_year
+        return {"kind": "range", "start": date(start_year, 1, 1), "end": date(end_year, 12, 31)}
+
+    # Month and day without a year: "12-17"
+    month_day_match = re.fullmatch(r'(\d{1,2})[-/](\d{1,2})', date_str)
+    if month_day_match:
+        month, day = int(month_day_match.group(1)), int(month_day_match.group(2))
+        try:
+            date(2000, month, day)
+        except ValueError:
+            return None
+        return {"kind": "month_day", "month": month, "day": day}
+
+    dates = []
+    for date_format in NUMERIC_DATE_FORMATS:
+        try:
+            parsed = datetime.strptime(date_str, date_format).date()
+        except ValueError:
+            continue
+        if parsed not in dates:
+            dates.append(parsed)
+    if dates:
+        return {"kind": "dates", "dates": dates}
+    return None
+
+
+def month_range(year, month):
+    start = date(year, month, 1)
+    end = date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+    return {"kind": "range", "start": start, "end": end}
+
+
+def build_date_search(index_table, date_column, query):
+    """Build a date search whose predicates can use the B-tree and month/day
+    expression indexes from dbase_scripts/add_date_search_indexes.py"""
+    sort_keys = [sort_date(date_column)]
+    criterion = parse_date_query(query)
+    if criterion is None:
+        # Not a recognisable date; keep the old text match as a last resort
+        return RecordSearch(
+            index_table, f"{date_column}::text LIKE %(pattern)s",
+            {"pattern": f"%{escape_like(query)}%"}, sort_keys
+        )
+
+    if criterion["kind"] == "dates":
+        where = f"{date_column} = ANY(%(dates)s)"
+        params = {"dates": criterion["dates"]}
+    elif criterion["kind"] == "range":
+        where = f"{date_column} BETWEEN %(start)s AND %(end)s"
+        params = {"start": criterion["start"], "end": criterion["end"]}
+    elif criterion["kind"] == "month_day":
+        where = f"EXTRACT(MONTH FROM {date_column}) = %(month)s AND EXTRACT(DAY FROM {date_column}) = %(day)s"
+        params = {"month": criterion["month"], "day": criterion["day"]}
+    else:
+        where = f"EXTRACT(MONTH FROM {date_column}) = %(month)s"
+        params = {"month": criterion["month"]}
+
+    return RecordSearch(index_table, where, params, sort_keys)
+
+
+def build_reg_no_search(index_table, date_column, query):
+    return RecordSearch(
+        index_table, "reg_no LIKE %(pattern)s",
+        {"pattern": f"%{query}%"}, [sort_date(date_column)]
+    )
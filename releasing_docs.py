@@ -4,6 +4,7 @@ from PySide6.QtGui import *
 from PySide6.QtCore import *
 import psycopg2
 from db_config import POSTGRES_CONFIG
+from db_pool import get_connection, release_connection
 from datetime import datetime
 from everify_form import eVerifyForm
 from audit_logger import AuditLogger
@@ -128,9 +129,14 @@ class ReleaseDocumentWindow(QMainWindow):
         layout.addStretch()
         
     def create_connection(self):
-        """Create a database connection"""
+        """Check out a database connection from the shared pool.
+
+        Pooled connections come out in autocommit mode; releases are written
+        in an explicit transaction, as before pooling, so it is switched off.
+        """
         try:
-            conn = psycopg2.connect(**POSTGRES_CONFIG)
+            conn = get_connection()
+            conn.autocommit = False
             return conn
         except psycopg2.Error as e:
             QMessageBox.critical(self, "Database Error", 
@@ -138,12 +144,8 @@ class ReleaseDocumentWindow(QMainWindow):
             return None
 
     def closeConnection(self, conn=None):
-        """Safely close the database connection"""
-        if conn:
-            try:
-                conn.close()
-            except Exception as e:
-                print(f"Error closing connection: {str(e)}")
+        """Return the database connection to the shared pool"""
+        release_connection(conn)
             
     def release_document(self):
         """Handle document release"""
@@ -229,6 +231,7 @@ class ReleaseDocumentWindow(QMainWindow):
             
         except psycopg2.Error as e:
             if conn:
+                conn.rollback()
                 AuditLogger.log_action(
                     conn,
                     self.current_user,
@@ -274,7 +277,7 @@ class ReleaseDocumentWindow(QMainWindow):
                 )
                 conn.commit()
         finally:
-            self.closeConnection()
+            self.closeConnection(conn)
     
     
     def populate_received_by_field(self, full_name):
@@ -9,6 +9,7 @@ from reportlab.lib.pagesizes import landscape
 from reportlab.lib.units import inch
 from reportlab.pdfbase import pdfmetrics
 from db_config import POSTGRES_CONFIG
+from db_pool import get_connection, release_connection
 from datetime import datetime, timedelta
 from audit_logger import AuditLogger
 from stylesheets import message_box_style, table_style, date_picker_style, combo_box_style
@@ -203,29 +204,28 @@ class ReleasingLogViewer(QMainWindow):
         self.load_data()
         
     def create_connection(self):
-        """Create a new PostgreSQL database connection"""
+        """Check out a PostgreSQL connection from the shared pool"""
         try:
-            conn = psycopg2.connect(**POSTGRES_CONFIG)
-            conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
-            return conn
+            return get_connection()
         except psycopg2.Error as e:
             print(f"Error creating connection: {str(e)}")
             return None
 
     def closeConnection(self, conn=None):
-        """Safely close the database connection"""
-        if conn:
-            try:
-                conn.close()
-            except Exception as e:
-                print(f"Error closing connection: {str(e)}")
+        """Return the database connection to the shared pool"""
+        release_connection(conn)
         
     def load_document_types(self):
         """Load unique document types for the type filter dropdown"""
         conn = self.create_connection()
         try:
             cursor = conn.cursor()
-            cursor.execute("SELECT DISTINCT doc_type FROM releasing_log ORDER BY doc_type")
+            try:
+                # Kept current by a trigger on releasing_log
+                cursor.execute("SELECT doc_type FROM releasing_doc_types ORDER BY doc_type")
+            except psycopg2.errors.UndefinedTable:
+                # dbase_scripts/add_filter_lookup_tables.py has not been run yet
+                cursor.execute("SELECT DISTINCT doc_type FROM releasing_log ORDER BY doc_type")
             types = [row[0] for row in cursor.fetchall()]
             self.type_filter.addItems(types)
             
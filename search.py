@@ -19,9 +19,58 @@ from Search_Death_Window import Ui_SearchDeathWindow
 from Search_Marriage_Window import Ui_SearchMarriageWindow
 from audit_logger import AuditLogger
 from db_config import POSTGRES_CONFIG
+from db_pool import get_connection, release_connection
+from filename_index import get_filename_index
 
 from stylesheets import search_button_style, everify_button_style, button_style, message_box_style
 
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+
+# Worker that runs filename searches off the GUI thread, scanning year folders concurrently
+class FilenameSearchWorker(QThread):
+    results_found = Signal(str, list)  # year, batch of matching filenames
+    year_failed = Signal(str, str)  # year, error message
+    progress = Signal(int, int)  # year folders searched, total
+
+    MAX_WORKERS = 8
+    BATCH_SIZE = 200
+
+    def __init__(self, filename_index, search_path, years, terms, parent=None):
+        super().__init__(parent)
+        self.filename_index = filename_index
+        self.search_path = search_path
+        self.years = years
+        self.terms = terms
+
+    def run(self):
+        executor = ThreadPoolExecutor(max_workers=min(self.MAX_WORKERS, len(self.years)))
+        try:
+            futures = {executor.submit(self.search_year, year): year for year in self.years}
+            for done, future in enumerate(as_completed(futures), 1):
+                if self.isInterruptionRequested():
+                    break
+                year = futures[future]
+                try:
+                    files = future.result()
+                except Exception as e:
+                    self.year_failed.emit(year, str(e))
+                    files = []
+                for i in range(0, len(files), self.BATCH_SIZE):
+                    if self.isInterruptionRequested():
+                        return
+                    self.results_found.emit(year, files[i:i + self.BATCH_SIZE])
+                self.progress.emit(done, len(self.years))
+        finally:
+            # Folders not started yet are skipped when the search is cancelled
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def search_year(self, year):
+        if self.isInterruptionRequested():
+            return []
+        return self.filename_index.search(self.search_path, year, self.terms)
+
+
 # Base class for searching PDF records
 class SearchWindowBase(QMainWindow):
     def __init__(self, ui_class, search_path, form_file, no_record_file, destroyed_file, username, parent=None, main_window=None):
@@ -42,6 +91,10 @@ class SearchWindowBase(QMainWindow):
         self.no_record_file = no_record_file
         self.destroyed_file = destroyed_file
 
+        # Local filename index of the share, refreshed incrementally on search
+        self.filename_index = get_filename_index()
+        self.search_worker = None
+
         # Set styles
         for button in [
             self.ui.search_button, self.ui.create_form,
@@ -169,14 +222,28 @@ class SearchWindowBase(QMainWindow):
 
         self.ui.horizontalLayout.insertWidget(3, self.ui.everify_button)
 
+        # Search every registration year instead of the one typed in the year field
+        self.all_years_checkbox = QCheckBox("All years", self.ui.centralwidget)
+        self.all_years_checkbox.setToolTip("Search all registration years (or enter a range like 1990-1995)")
+        self.all_years_checkbox.toggled.connect(self.ui.regyear_textEdit.setDisabled)
+        self.ui.horizontalLayout.insertWidget(3, self.all_years_checkbox)
+
+        # Searches run on a background worker; Cancel stops the running one
+
+        self.cancel_search_button = QPushButton("Cancel", self.ui.centralwidget)
+        self.cancel_search_button.setStyleSheet(search_button_style)
+        self.cancel_search_button.setToolTip("Cancel the running search")
+        self.cancel_search_button.clicked.connect(self.cancel_search)
+        self.cancel_search_button.hide()
+        self.ui.horizontalLayout.insertWidget(3, self.cancel_search_button)
+
         self.ui.horizontalLayout.update()
         self.updateGeometry()
 
     def create_connection(self):
         try:
             if self.connection is None:
-                self.connection = psycopg2.connect(**POSTGRES_CONFIG)
-                self.connection.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                self.connection = get_connection()
             return self.connection
         except psycopg2.Error as e:
             print(f"Error connecting to database: {str(e)}")
@@ -184,10 +251,7 @@ class SearchWindowBase(QMainWindow):
 
     def closeConnection(self):
         if self.connection:
-            try:
-                self.connection.close()
-            except:
-                pass  # Ignore close errors
+            release_connection(self.connection)
             self.connection = None
     
     def open_form_file(self):
@@ -281,6 +345,12 @@ class SearchWindowBase(QMainWindow):
             self.closeConnection()
     
     def open_selected_file(self, item):
+        # Multi-year results carry their full path since the year field may be empty
+        file_path = item.data(Qt.UserRole)
+        if file_path:
+            self.start_selected_file(file_path, os.path.basename(file_path))
+            return
+
         regyear = self.ui.regyear_textEdit.text().strip()
         if not regyear:
             # QMessageBox.warning(self, "Error", "Please enter a registration year before opening a file.")
@@ -293,6 +363,9 @@ class SearchWindowBase(QMainWindow):
             box.exec()
             return
         file_path = os.path.join(self.search_path, regyear, item.text())
+        self.start_selected_file(file_path, item.text())
+
+    def start_selected_file(self, file_path, file_name):
         conn = self.create_connection()
         try:
             os.startfile(file_path)
@@ -300,7 +373,7 @@ class SearchWindowBase(QMainWindow):
                 conn,
                 self.current_user,
                 "FILE_OPENED",
-                {"file": item.text(), "path": file_path}
+                {"file": file_name, "path": file_path}
             )
             conn.commit()
         except FileNotFoundError:
@@ -325,7 +398,7 @@ class SearchWindowBase(QMainWindow):
                 conn,
                 self.current_user,
                 "FILE_OPEN_ERROR",
-                {"error": str(e), "file": item.text()}
+                {"error": str(e), "file": file_name}
             )
             conn.commit()
         finally:
@@ -362,16 +435,24 @@ class SearchWindowBase(QMainWindow):
             self.closeConnection()
     def search_pdfs(self):
         print(f"DEBUG - Current user during search: {self.current_user}")
+        # A new search always supersedes one that is still running
+        if self.search_worker is not None:
+            self.search_worker.requestInterruption()
+            self.search_worker = None
         self.ui.results_list.clear()
-        query = self.ui.search_textEdit.text().strip()
-        folder = os.path.join(self.search_path, self.ui.regyear_textEdit.text().strip())
         self.found_pdfs.clear()
+        query = self.ui.search_textEdit.text().strip()
+        search_type = self.ui.search_by_comboBox.currentText()
+        search_year = "ALL" if self.all_years_checkbox.isChecked() else self.ui.regyear_textEdit.text().strip()
+
+        years = self.selected_years()
+        multi_year = years is not None
+        if not multi_year:
+            folder = os.path.join(self.search_path, search_year)
+            years = [search_year] if search_year and os.path.exists(folder) else []
 
         conn = self.create_connection()
         try:
-            search_type = self.ui.search_by_comboBox.currentText()
-            search_year = self.ui.regyear_textEdit.text().strip()
-            
             AuditLogger.log_action(
                 conn,
                 self.current_user,
@@ -380,12 +461,12 @@ class SearchWindowBase(QMainWindow):
                     "type": search_type,
                     "query": query,
                     "year": search_year,
-                    "path": folder
+                    "path": os.path.join(self.search_path, search_year) if not multi_year else self.search_path
                 }
             )
             conn.commit()
 
-            if not folder or not os.path.exists(folder):
+            if not years:
                 AuditLogger.log_action(
                     conn,
                     self.current_user,
@@ -419,24 +500,134 @@ class SearchWindowBase(QMainWindow):
                 box.setStyleSheet(message_box_style)
                 box.exec()
                 return
-            search_method = self.find_pdfs_name if search_type in ["Name", "Reg No."] else self.find_pdfs_date
-            pdf_files = search_method(folder, query)
+        finally:
+            self.closeConnection()
+
+        if search_type in ["Name", "Reg No."]:
+            terms = [term.strip().lower() for term in query.split(" ")]
+        else:
+            terms = [query.lower()]
+
+        worker = FilenameSearchWorker(self.filename_index, self.search_path, years, terms, parent=self)
+        worker.search_info = {"type": search_type, "query": query, "year": search_year, "multi_year": multi_year}
+        worker.results_found.connect(self.add_search_results)
+        worker.year_failed.connect(self.report_search_error)
+        worker.progress.connect(self.update_search_progress)
+        worker.finished.connect(self.search_finished)
+        self.search_worker = worker
+
+        self.ui.status_label.setText(f"Searching {len(years)} year folders..." if multi_year else "Searching...")
+        self.cancel_search_button.show()
+        worker.start()
+
+    def selected_years(self):
+        """Return the year folders to search, or None for the single year in regyear_textEdit"""
+        if self.all_years_checkbox.isChecked():
+            try:
+                return self.filename_index.list_years(self.search_path)
+            except OSError as e:
+                print(f"Error listing year folders: {str(e)}")
+                return []
 
-            if pdf_files:
-                self.ui.results_list.addItems(pdf_files)
-                self.found_pdfs.extend(pdf_files)
+        regyear = self.ui.regyear_textEdit.text().strip()
+        if "-" in regyear or "," in regyear:
+            years = []
+            for part in regyear.split(","):
+                bounds = [bound.strip() for bound in part.split("-")]
+                if len(bounds) == 2 and bounds[0].isdigit() and bounds[1].isdigit():
+                    start, end = sorted((int(bounds[0]), int(bounds[1])))
+                    years.extend(str(year) for year in range(start, end + 1))
+                elif len(bounds) == 1 and bounds[0].isdigit():
+                    years.append(bounds[0])
+            return sorted(set(years), reverse=True)
+        return None
+
+    def add_search_results(self, year, files):
+        worker = self.sender()
+        if worker is not self.search_worker:
+            return  # Late batch from a superseded or cancelled search
+        multi_year = worker.search_info["multi_year"]
+        for file in files:
+            item = QListWidgetItem(f"[{year}] {file}" if multi_year else file)
+            item.setData(Qt.UserRole, os.path.join(self.search_path, year, file))
+            self.ui.results_list.addItem(item)
+            self.found_pdfs.append(file)
+
+    def update_search_progress(self, done, total):
+        if self.sender() is not self.search_worker:
+            return
+        if total > 1:
+            self.ui.status_label.setText(f"Searched {done}/{total} years, found {len(self.found_pdfs)} files...")
+        else:
+            self.ui.status_label.setText(f"Found {len(self.found_pdfs)} files...")
+
+    def report_search_error(self, year, error):
+        print(f"Error searching year {year}: {error}")
+        worker = self.sender()
+        conn = self.create_connection()
+        try:
+            AuditLogger.log_action(
+                conn,
+                self.current_user,
+                "SEARCH_ERROR",
+                {
+                    "method": "filename_search",
+                    "error": error,
+                    "folder": os.path.join(self.search_path, year),
+                    "query": worker.search_info["query"]
+                }
+            )
+            conn.commit()
+        finally:
+            self.closeConnection()
+        if worker is self.search_worker and not worker.search_info["multi_year"]:
+            # QMessageBox.critical(self, "Error", f"An error occurred while searching: {error}")
+            box = QMessageBox(self)
+            box.setIcon(QMessageBox.Critical)
+            box.setWindowTitle("Error")
+            box.setText(f"An error occurred while searching: {error}")
+            box.setStandardButtons(QMessageBox.Ok)
+            box.setStyleSheet(message_box_style)
+            box.exec()
+
+    def search_finished(self):
+        worker = self.sender()
+        worker.deleteLater()
+        if worker is not self.search_worker:
+            return  # A newer search has already taken over the list
+        self.search_worker = None
+        self.cancel_search_button.hide()
+        info = worker.search_info
+
+        conn = self.create_connection()
+        try:
+            if worker.isInterruptionRequested():
+                self.ui.status_label.setText(f"Search cancelled. Found {len(self.found_pdfs)} files.")
+                AuditLogger.log_action(
+                    conn,
+                    self.current_user,
+                    "SEARCH_CANCELLED",
+                    {
+                        "result_count": len(self.found_pdfs),
+                        "type": info["type"],
+                        "query": info["query"],
+                        "year": info["year"]
+                    }
+                )
+            elif self.found_pdfs:
                 self.ui.status_label.setText(f"Found {len(self.found_pdfs)} files.")
                 AuditLogger.log_action(
                     conn,
                     self.current_user,
                     "SEARCH_COMPLETED",
                     {
-                        "result_count": len(pdf_files),
-                        "type": search_type,
-                        "year": search_year
+                        "result_count": len(self.found_pdfs),
+                        "type": info["type"],
+                        "year": info["year"]
                     }
                 )
             else:
+                self.ui.status_label.clear()
                 # QMessageBox.information(self, "No Results", "No PDF files found.")
                 box = QMessageBox(self)
                 box.setIcon(QMessageBox.Information)
@@ -450,104 +641,20 @@ class SearchWindowBase(QMainWindow):
                     self.current_user,
                     "SEARCH_NO_RESULTS",
                     {
-                        "type": search_type,
-                        "query": query,
-                        "year": search_year
+                        "type": info["type"],
+                        "query": info["query"],
+                        "year": info["year"]
                     }
                 )
             conn.commit()
-        except Exception as e:
-            AuditLogger.log_action(
-                conn,
-                self.current_user,
-                "SEARCH_ERROR",
-                {
-                    "error": str(e),
-                    "type": self.ui.search_by_comboBox.currentText(),
-                    "query": query,
-                    "year": self.ui.regyear_textEdit.text().strip()
-                }
-            )
-            conn.commit()
-            # QMessageBox.critical(self, "Error", f"An error occurred during search: {str(e)}")
-            box = QMessageBox(self)
-            box.setIcon(QMessageBox.Critical)
-            box.setWindowTitle("Error")
-            box.setText(f"An error occurred during search: {str(e)}")
-            box.setStandardButtons(QMessageBox.Ok)
-            box.setStyleSheet(message_box_style)
-            box.exec()
         finally:
             self.closeConnection()
-    
-    def find_pdfs_name(self, folder, query):
-        pdf_files = []
-        search_terms = [term.strip().lower() for term in query.split(" ")]
-        try:
-            for root, _, files in os.walk(folder):
-                for file in files:
-                    if file.lower().endswith('.pdf') and all(term in file.lower() for term in search_terms):
-                        pdf_files.append(file)
-        except Exception as e:
-            conn = self.create_connection()
-            try:
-                AuditLogger.log_action(
-                    conn,
-                    self.current_user,
-                    "SEARCH_ERROR",
-                    {
-                        "method": "name_search",
-                        "error": str(e),
-                        "folder": folder,
-                        "query": query
-                    }
-                )
-                conn.commit()
-            finally:
-                self.closeConnection()
-            # QMessageBox.critical(self, "Error", f"An error occurred while searching: {str(e)}")
-            box = QMessageBox(self)
-            box.setIcon(QMessageBox.Critical)
-            box.setWindowTitle("Error")
-            box.setText(f"An error occurred while searching: {str(e)}")
-            box.setStandardButtons(QMessageBox.Ok)
-            box.setStyleSheet(message_box_style)
-            box.exec()
-        return pdf_files
 
-    def find_pdfs_date(self, folder, query):
-        pdf_files = []
-        try:
-            for root, _, files in os.walk(folder):
-                for file in files:
-                    if file.lower().endswith('.pdf') and query.lower() in file.lower():
-                        pdf_files.append(file)
-        except Exception as e:
-            conn = self.create_connection()
-            try:
-                AuditLogger.log_action(
-                    conn,
-                    self.current_user,
-                    "SEARCH_ERROR",
-                    {
-                        "method": "date_search",
-                        "error": str(e),
-                        "folder": folder,
-                        "query": query
-                    }
-                )
-                conn.commit()
-            finally:
-                self.closeConnection()
-            # QMessageBox.critical(self, "Error", f"An error occurred while searching: {str(e)}")
-            box = QMessageBox(self)
-            box.setIcon(QMessageBox.Critical)
-            box.setWindowTitle("Error")
-            box.setText(f"An error occurred while searching: {str(e)}")
-            box.setStandardButtons(QMessageBox.Ok)
-            box.setStyleSheet(message_box_style)
-            box.exec()
-        return pdf_files
+    def cancel_search(self):
+        """Ask the running background search to stop; search_finished reports the outcome"""
+        if self.search_worker is not None and self.search_worker.isRunning():
+            self.search_worker.requestInterruption()
+            self.ui.status_label.setText("Cancelling search...")
     
     
     def start_everify_flow(self):
@@ -633,6 +740,7 @@ class SearchWindowBase(QMainWindow):
             self.closeConnection()
 
     def closeEvent(self, event):
+        self.cancel_search()
         conn = self.create_connection()
         try:
             AuditLogger.log_action(
@@ -647,6 +755,7 @@ class SearchWindowBase(QMainWindow):
             self.ui.regyear_textEdit.clear()
             self.ui.search_textEdit.clear()
             self.ui.search_by_comboBox.setCurrentText("Name")
+            self.all_years_checkbox.setChecked(False)
             self.ui.results_list.clear()
             self.ui.status_label.clear()
 
@@ -1,5 +1,6 @@
 import psycopg2
 import os
+from datetime import date, datetime, timedelta
 import pymupdf  
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
@@ -12,10 +13,36 @@ from PySide6.QtGui import QPixmap, QImage, QIcon
 from stylesheets import button_style, date_picker_style
 from audit_logger import AuditLogger
 from db_config import POSTGRES_CONFIG
+from db_pool import get_connection, release_connection
 
 
 
 
+# statistics_monthly stores values as text; columns that are not text are cast back
+ROLLUP_VALUE_TYPES = {
+    "age": "integer",
+    "husband_age": "integer",
+    "wife_age": "integer",
+    "late_registration": "boolean",
+    "twin": "boolean",
+}
+
+
+def rollup_months(start_date, end_date):
+    """Return [start, end) covering the whole months between two yyyy-MM-dd dates"""
+    start = datetime.strptime(start_date, "%Y-%m-%d").date()
+    end = datetime.strptime(end_date, "%Y-%m-%d").date() + timedelta(days=1)
+    rollup_start = start if start.day == 1 else first_of_next_month(start)
+    rollup_end = end.replace(day=1)
+    if rollup_end < rollup_start:
+        rollup_end = rollup_start  # No whole month in the range
+    return rollup_start, rollup_end
+
+
+def first_of_next_month(day):
+    return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+
+
 class StatisticsWindow(QWidget):
     def __init__(self, username, parent=None):
         super().__init__(parent)
@@ -37,16 +64,12 @@ class StatisticsWindow(QWidget):
 
     def create_connection(self):
         if self.connection is None:
-            self.connection = psycopg2.connect(**POSTGRES_CONFIG)
-            self.connection.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            self.connection = get_connection()
         return self.connection
 
     def closeConnection(self):
         if self.connection:
-            try:
-                self.connection.close()
-            except Exception:
-                pass
+            release_connection(self.connection)
             self.connection = None
 
     def init_ui(self):
@@ -260,9 +283,7 @@ class StatisticsWindow(QWidget):
                 return
 
             try:
-                cursor.execute(f"SELECT {column} FROM {table} WHERE {date_field} BETWEEN %s AND %s", (start_date, end_date))
-                all_tags = cursor.fetchall()
-                value_counts = self.process_statistics_data(all_tags, selected_key)
+                value_counts = self.fetch_value_counts(cursor, table, date_field, column, selected_key, start_date, end_date)
 
                 if not value_counts:
                     AuditLogger.log_action(
@@ -286,7 +307,7 @@ class StatisticsWindow(QWidget):
                         {
                             "record_type": record_type,
                             "key": selected_key,
-                            "record_count": len(all_tags),
+                            "record_count": sum(value_counts.values()),
                             "unique_values": len(value_counts)
                         }
                     )
@@ -310,33 +331,67 @@ class StatisticsWindow(QWidget):
         finally:
             self.closeConnection()
 
-    def process_statistics_data(self, all_tags, selected_key):
-        value_counts = {}
-        for row in all_tags:
-            if selected_key.lower() == "twin":
-                value = "Twin" if row[0] == 1 else "Not Twin"
-            elif selected_key.lower() == "legitimate":
-                value = "Legitimate" if row[0] == 1 else "Illegitimate"
-            elif selected_key.lower() == "religious":
-                value = "Religious" if row[0] == 1 else "Not Religious"
-            elif selected_key.lower() in ["age of mother", "age of husband", "age of wife"]:
-                value = self.get_age_range(row[0])
-            else:
-                value = row[0]
-            value_counts[value] = value_counts.get(value, 0) + 1
-        return value_counts
-
-    def get_age_range(self, age):
-        if age < 18:
-            return "Under 18"
-        elif 18 <= age <= 25:
-            return "18-25"
-        elif 26 <= age <= 35:
-            return "26-35"
-        elif 36 <= age <= 45:
-            return "36-45"
-        else:
-            return "Above 45"
+    def fetch_value_counts(self, cursor, table, date_field, column, selected_key, start_date, end_date):
+        """Count records per value of a column in the date range.
+
+        Whole months are summed from statistics_monthly, the rollup kept by
+        triggers on the index tables (dbase_scripts/add_statistics_rollups.py);
+        only the partial months at either end of the range are counted from
+        the index table itself. Grouping happens in the database either way,
+        so one row per distinct value comes back. Until that migration has
+        been run, the whole range is counted from the index table.
+        """
+        rollup_start, rollup_end = rollup_months(start_date, end_date)
+        value = self.statistics_value(column, selected_key)
+        rollup_value = f"(CASE WHEN is_null THEN NULL ELSE value END)::{ROLLUP_VALUE_TYPES.get(column, 'text')}"
+        try:
+            cursor.execute(f"""
+                SELECT {value} AS value, SUM(count)::bigint FROM (
+                    SELECT {column}, COUNT(*) AS count FROM {table}
+                    WHERE {date_field} BETWEEN %(start)s AND %(end)s
+                      AND NOT ({date_field} >= %(rollup_start)s AND {date_field} < %(rollup_end)s)
+                    GROUP BY 1
+                    UNION ALL
+                    SELECT {rollup_value} AS {column}, count FROM statistics_monthly
+                    WHERE index_table = %(table)s AND key_column = %(column)s
+                      AND month >= %(rollup_start)s AND month < %(rollup_end)s
+                ) AS counts
+                GROUP BY 1
+            """, {
+                "start": start_date,
+                "end": end_date,
+                "rollup_start": rollup_start,
+                "rollup_end": rollup_end,
+                "table": table,
+                "column": column,
+            })
+        except psycopg2.errors.UndefinedTable:
+            cursor.connection.rollback()  # No-op on the pooled autocommit connection
+            cursor.execute(f"""
+                SELECT {value} AS value, COUNT(*) FROM {table}
+                WHERE {date_field} BETWEEN %s AND %s
+                GROUP BY 1
+            """, (start_date, end_date))
+        return dict(cursor.fetchall())
+
+    def statistics_value(self, column, selected_key):
+        """Return the SQL expression a key's records are grouped by"""
+        key = selected_key.lower()
+        if key == "twin":
+            return f"CASE WHEN {column} IS TRUE THEN 'Twin' ELSE 'Not Twin' END"
+        elif key == "legitimate":
+            return f"CASE WHEN {column} IS TRUE THEN 'Legitimate' ELSE 'Illegitimate' END"
+        elif key == "religious":
+            return f"CASE WHEN {column} IS TRUE THEN 'Religious' ELSE 'Not Religious' END"
+        elif key in ["age of mother", "age of husband", "age of wife"]:
+            return f"""CASE
+                WHEN {column} < 18 THEN 'Under 18'
+                WHEN {column} <= 25 THEN '18-25'
+                WHEN {column} <= 35 THEN '26-35'
+                WHEN {column} <= 45 THEN '36-45'
+                WHEN {column} IS NOT NULL THEN 'Above 45'
+            END"""
+        return column
 
     def plot_statistics(self, key, value_counts):
         self.ax.clear()
@@ -425,9 +480,7 @@ class StatisticsWindow(QWidget):
 
             try:
                 cursor = conn.cursor()
-                cursor.execute(f"SELECT {column} FROM {table} WHERE {date_field} BETWEEN %s AND %s", (start_date, end_date))
-                all_tags = cursor.fetchall()
-                value_counts = self.process_statistics_data(all_tags, selected_key)
+                value_counts = self.fetch_value_counts(cursor, table, date_field, column, selected_key, start_date, end_date)
 
                 # Generate PDF with statistics
                 with PdfPages(file_path) as pdf:
@@ -86,26 +86,26 @@ message_box_style = """
         """
 
 table_style = """
-            QTableWidget {
+            QTableView {
                 border: 1px solid #D1D0D0;
                 border-radius: 4px;
                 background-color: #FFFFFF;
                 alternate-background-color: #F5F5F5;
                 gridline-color: #D1D0D0;
             }
-            QTableWidget::item {
+            QTableView::item {
                 padding: 5px;
                 color: #212121;
             }
-            QTableWidget::item:hover {
+            QTableView::item:hover {
                 background-color: #e0446a;
                 color: #FFFFFF;
             }
-            QTableWidget::item:selected {
+            QTableView::item:selected {
                 background-color: #ce305e;
                 color: #FFFFFF;
             }
-            QTableWidget::item:selected:hover {
+            QTableView::item:selected:hover {
                 background-color: #e0446a;
                 color: #FFFFFF;
             }
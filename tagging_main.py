@@ -10,6 +10,7 @@ from audit_logger import AuditLogger
 import psycopg2
 from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
 from db_config import POSTGRES_CONFIG
+from db_pool import get_connection, release_connection
 
 class TaggingMainWindow(QMainWindow):
     def __init__(self, username, parent=None):
@@ -53,15 +54,15 @@ class TaggingMainWindow(QMainWindow):
 
 
     def create_connection(self):
-        """Create a new database connection"""
-        conn = psycopg2.connect(**POSTGRES_CONFIG)
-        conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
-        return conn
+        """Check out a database connection from the shared pool"""
+        if getattr(self, 'connection', None) is None:
+            self.connection = get_connection()
+        return self.connection
 
     def closeConnection(self):
-        """Close the database connection"""
-        if hasattr(self, 'connection') and self.connection:
-            self.connection.close()
+        """Return the database connection to the shared pool"""
+        if getattr(self, 'connection', None):
+            release_connection(self.connection)
             self.connection = None
 
     # Slot methods
@@ -10,14 +10,16 @@ from reportlab.lib.pagesizes import letter
 from reportlab.pdfgen import canvas
 from PySide6.QtWidgets import *
 from PySide6.QtCore import Qt, QDate, QSize, QUrl
-from PySide6.QtGui import QPixmap, QImage, QIcon
+from PySide6.QtGui import QPixmap, QImage, QIcon, QColor
 from PySide6.QtWebEngineWidgets import QWebEngineView
 from stylesheets import button_style, date_picker_style, combo_box_style, message_box_style
 from pdfviewer import PDFViewer
+from folder_model import PdfFolderModel
 from audit_logger import AuditLogger
 import psycopg2
 from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
 from db_config import POSTGRES_CONFIG
+from db_pool import get_connection, release_connection
 
 
 class MarriageTaggingWindow(QWidget):
@@ -61,18 +63,21 @@ class MarriageTaggingWindow(QWidget):
 
         self.default_directory = r"\\server\MCR\MARRIAGE"
         self.selected_pdf = None
+        self.pdf_items = {}
+        self.folder_model = PdfFolderModel(self)
+        self.folder_model.thumbnail_ready.connect(self.set_thumbnail)
+        self.folder_model.thumbnails_finished.connect(self.thumbnails_finished)
 
         self.init_ui()
     
     def create_connection(self):
         if self.connection is None:
-            self.connection = psycopg2.connect(**POSTGRES_CONFIG)
-            self.connection.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+            self.connection = get_connection()
         return self.connection
 
     def closeConnection(self):
         if self.connection:
-            self.connection.close()
+            release_connection(self.connection)
             self.connection = None
 
     def init_ui(self):
@@ -464,11 +469,12 @@ class MarriageTaggingWindow(QWidget):
             self.closeConnection()
 
     def load_pdfs(self, folder_path):
-        """Loads PDFs from a folder and generates thumbnails."""
+        """Lists the PDFs in a folder and fills in their thumbnails in the background."""
         conn = self.create_connection()
-        progress = None
         try:
+            self.folder_model.cancel()
             self.pdf_list.clear()
+            self.pdf_items = {}
             if not os.path.exists(folder_path):
                 AuditLogger.log_action(
                     conn,
@@ -480,43 +486,13 @@ class MarriageTaggingWindow(QWidget):
                 QMessageBox.warning(self, "Error", f"Folder not found: {folder_path}")
                 return
             
-            # Show loading progress
-            progress = QProgressDialog("Loading PDFs...", None, 0, 0, self)
-            progress.setWindowModality(Qt.WindowModal)
-            progress.setWindowTitle("Loading")
-            progress.setCancelButton(None)  # Remove cancel button
-            progress.show()
-            QApplication.processEvents()
-            
-            pdf_files = [f for f in os.listdir(folder_path) if f.lower().endswith(".pdf")]
-            pdf_files.sort(key=self.natural_sort_key)
-            
-            failed_files = []
-            for filename in pdf_files:
-                try:
-                    file_path = os.path.join(folder_path, filename)
-                    thumbnail = self.generate_thumbnail(file_path)
-                    
-                    item = QListWidgetItem(QIcon(thumbnail), filename)
-                    item.setData(Qt.UserRole, file_path)
-                    self.pdf_list.addItem(item)
-                except Exception as e:
-                    failed_files.append((filename, str(e)))
-                    continue
-            
-            if failed_files:
-                error_msg = "Failed to load some PDFs:\n\n"
-                for filename, error in failed_files:
-                    error_msg += f"{filename}: {error}\n"
-                QMessageBox.warning(self, "Warning", error_msg)
-            
-            AuditLogger.log_action(
-                conn,
-                self.current_user,
-                "PDFS_LOADED",
-                {"folder": folder_path, "count": len(pdf_files), "failed": len(failed_files)}
-            )
-            conn.commit()
+            # Show every file straight away; thumbnails replace the placeholder as they arrive
+            placeholder = self.placeholder_icon()
+            for file_path in self.folder_model.load(folder_path):
+                item = QListWidgetItem(placeholder, os.path.basename(file_path))
+                item.setData(Qt.UserRole, file_path)
+                self.pdf_list.addItem(item)
+                self.pdf_items[file_path] = item
             
         except Exception as e:
             AuditLogger.log_action(
@@ -528,39 +504,36 @@ class MarriageTaggingWindow(QWidget):
             conn.commit()
             QMessageBox.critical(self, "Error", f"Failed to load PDFs: {str(e)}")
         finally:
-            if progress:
-                progress.close()
-                progress.deleteLater()  # Ensure the dialog is properly destroyed
             self.closeConnection()
 
-    def natural_sort_key(self, text):
-        """Sort filenames naturally, treating numbers correctly."""
-        def convert(text):
-            return int(text) if text.isdigit() else text.lower()
-        
-        alphanum_key = [convert(c) for c in re.split('([0-9]+)', text)]
-        return alphanum_key
+    def placeholder_icon(self):
+        pixmap = QPixmap(self.pdf_list.iconSize())
+        pixmap.fill(QColor("#E0E0E0"))
+        return QIcon(pixmap)
 
-    
-    def generate_thumbnail(self, pdf_path):
-        """Extracts the first page of a PDF and converts it to a QPixmap."""
+    def set_thumbnail(self, file_path, image):
+        item = self.pdf_items.get(file_path)
+        if item is not None:
+            item.setIcon(QIcon(QPixmap.fromImage(image)))
+
+    def thumbnails_finished(self, failed_files):
+        if failed_files:
+            error_msg = "Failed to load some PDFs:\n\n"
+            for filename, error in failed_files:
+                error_msg += f"{filename}: {error}\n"
+            QMessageBox.warning(self, "Warning", error_msg)
+
+        conn = self.create_connection()
         try:
-            doc = pymupdf.open(pdf_path)
-            if doc.page_count == 0:
-                raise Exception("PDF has no pages")
-            
-            page = doc[0]
-            pix = page.get_pixmap(matrix=pymupdf.Matrix(0.5, 0.5))  # Scale down image
-            
-            # Convert raw image data to QImage
-            img = QImage(pix.samples, pix.width, pix.height, pix.stride, QImage.Format_RGBA8888)
-            
-            # Clean up resources
-            doc.close()
-            
-            return QPixmap.fromImage(img)
-        except Exception as e:
-            raise Exception(f"Failed to generate thumbnail: {str(e)}")
+            AuditLogger.log_action(
+                conn,
+                self.current_user,
+                "PDFS_LOADED",
+                {"folder": self.folder_model.folder_path, "count": len(self.pdf_items), "failed": len(failed_files)}
+            )
+            conn.commit()
+        finally:
+            self.closeConnection()
 
     def show_preview(self, item):
         """Loads the selected PDF and stores its file path."""
@@ -919,6 +892,8 @@ class MarriageTaggingWindow(QWidget):
 
     def showEvent(self, event):
         super().showEvent(event)
+        if self.folder_model.has_changed():
+            self.load_pdfs(self.folder_model.folder_path)
         conn = self.create_connection()
         try:
             AuditLogger.log_action(
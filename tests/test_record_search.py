@@ -0,0 +1,64 @@
+"""
+Keyset paging of record_search against a live database; skipped when
+PostgreSQL (with pg_trgm) is not reachable from db_config.POSTGRES_CONFIG
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+psycopg2 = pytest.importorskip("psycopg2")
+
+from db_config import POSTGRES_CONFIG  # noqa: E402
+from record_search import build_name_search  # noqa: E402
+
+
+@pytest.fixture
+def cursor():
+    try:
+        conn = psycopg2.connect(connect_timeout=3, **POSTGRES_CONFIG)
+    except psycopg2.Error as e:
+        pytest.skip(f"PostgreSQL not available: {e}")
+    conn.autocommit = True
+    cursor = conn.cursor()
+    cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+    if cursor.fetchone() is None:
+        conn.close()
+        pytest.skip("pg_trgm is not installed")
+    yield cursor
+    conn.close()
+
+
+def test_cursor_round_trips_through_tied_page_boundary(cursor):
+    # Every row has the same name, so all rows tie on the substring and
+    # similarity keys; undated rows also tie on the date key
+    cursor.execute("""
+        CREATE TEMP TABLE birth_index_test (
+            id SERIAL PRIMARY KEY,
+            file_path TEXT NOT NULL,
+            name TEXT,
+            date_of_birth DATE
+        )
+    """)
+    cursor.execute("""
+        INSERT INTO birth_index_test (file_path, name, date_of_birth)
+        SELECT 'file_' || n || '.pdf', 'DELA CRUZ, JUAN',
+               CASE WHEN n % 3 = 0 THEN NULL ELSE DATE '2000-01-01' + n % 5 END
+        FROM generate_series(1, 25) AS n
+    """)
+
+    search = build_name_search("birth_index_test", ["name"], "date_of_birth", "dela cruz juan")
+    seen = []
+    after = None
+    for _ in range(10):
+        sql, params = search.page_query(after, limit=4)
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+        seen.extend(row[0] for row in rows)
+        if len(rows) < 4:
+            break
+        after = tuple(rows[-1][1:])
+
+    assert sorted(seen) == sorted(f"file_{n}.pdf" for n in range(1, 26))
@@ -1,5 +1,6 @@
 import sys
 import os
+import json
 import psycopg2
 from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
 import requests
@@ -22,11 +23,18 @@ from Search_Marriage_Window import Ui_SearchMarriageWindow
 from auto_form import *
 from audit_logger import AuditLogger
 from db_config import POSTGRES_CONFIG
+from db_pool import get_connection, release_connection
+from record_search import build_name_search, build_date_search, build_reg_no_search
 
 from stylesheets import search_button_style, everify_button_style, button_style, message_box_style
 
 # Base class for searching PDF records - MODIFY open_form_file method
 class VerifyWindowBase(QMainWindow):
+    # Set to False once a name search finds pg_trgm missing on the server
+    trigram_available = True
+    PAGE_SIZE = 200  # results fetched per page; more are loaded as the list is scrolled
+    LOAD_MORE_MARGIN = 20  # rows from the bottom at which the next page is requested
+
     def __init__(self, ui_class, search_path, form_file, no_record_file, destroyed_file, username, parent=None, main_window=None):
         super().__init__(parent)
         self.ui = ui_class()
@@ -157,9 +165,18 @@ class VerifyWindowBase(QMainWindow):
         
         # List for found PDFs
         self.found_pdfs = []
+
+        # Keyset paging state for the current search
+        self.active_search = None
+        self.search_cursor = None
+        self.search_exhausted = True
+        self.search_estimate = None
+        self.loading_page = False
         
         # Open file on double-click
         self.ui.results_list.itemDoubleClicked.connect(self.open_selected_file)
+        # Load the next page when the list is scrolled near its end
+        self.ui.results_list.verticalScrollBar().valueChanged.connect(self.results_scrolled)
 
         # Add eVerify button
         self.ui.everify_button.setIcon(QIcon("icons/everify-icon.png"))
@@ -227,8 +244,7 @@ class VerifyWindowBase(QMainWindow):
     def create_connection(self):
         try:
             if self.connection is None:
-                self.connection = psycopg2.connect(**POSTGRES_CONFIG)
-                self.connection.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                self.connection = get_connection()
             return self.connection
         except psycopg2.Error as e:
             print(f"Error connecting to database: {str(e)}")
@@ -236,10 +252,7 @@ class VerifyWindowBase(QMainWindow):
 
     def closeConnection(self):
         if self.connection:
-            try:
-                self.connection.close()
-            except:
-                pass  # Ignore close errors
+            release_connection(self.connection)
             self.connection = None
     
     def normalize_path(self, path):
@@ -289,13 +302,13 @@ class VerifyWindowBase(QMainWindow):
             if isinstance(self, VerifyBirthWindow):
                 table = "birth_index"
                 form_type = "Birth"
-                cursor.execute("""
+                cursor.execute(f"""
                     SELECT name, date_of_birth, sex, page_no, book_no, reg_no, 
                            date_of_reg, place_of_birth, name_of_mother, nationality_mother,
                            name_of_father, nationality_father, parents_marriage_date,
                            parents_marriage_place, attendant
                     FROM birth_index 
-                    WHERE normalize_path(file_path) = %s
+                    WHERE {path_match_column(cursor, table)} = %s
                 """, (normalized_path,))
                 record = cursor.fetchone()
                 if record:
@@ -321,12 +334,12 @@ class VerifyWindowBase(QMainWindow):
             elif isinstance(self, VerifyDeathWindow):
                 table = "death_index"
                 form_type = "Death"
-                cursor.execute("""
+                cursor.execute(f"""
                     SELECT name, date_of_death, sex, page_no, book_no, reg_no,
                            date_of_reg, age, civil_status, nationality, place_of_death,
                            cause_of_death
                     FROM death_index 
-                    WHERE normalize_path(file_path) = %s
+                    WHERE {path_match_column(cursor, table)} = %s
                 """, (normalized_path,))
                 record = cursor.fetchone()
                 if record:
@@ -348,13 +361,13 @@ class VerifyWindowBase(QMainWindow):
             elif isinstance(self, VerifyMarriageWindow):
                 table = "marriage_index"
                 form_type = "Marriage"
-                cursor.execute("""
+                cursor.execute(f"""
                     SELECT husband_name, wife_name, date_of_marriage, page_no, book_no, reg_no,
                            husband_age, wife_age, husb_nationality, wife_nationality,
                            husb_civil_status, wife_civil_status, husb_mother, wife_mother,
                            husb_father, wife_father, date_of_reg, place_of_marriage
                     FROM marriage_index 
-                    WHERE normalize_path(file_path) = %s
+                    WHERE {path_match_column(cursor, table)} = %s
                 """, (normalized_path,))
                 record = cursor.fetchone()
                 if record:
@@ -394,7 +407,7 @@ class VerifyWindowBase(QMainWindow):
                 return
             
             # Instead of opening the PDF directly, open the custom preview window
-            self.form_preview_window = FormPreviewWindow(normalized_path, record_dict, form_type, connection=conn, username=self.current_user, parent=self)
+            self.form_preview_window = FormPreviewWindow(normalized_path, record_dict, form_type, username=self.current_user, parent=self)
             self.form_preview_window.show()
             self.form_preview_window.raise_()
             self.form_preview_window.activateWindow()
@@ -595,11 +608,18 @@ class VerifyWindowBase(QMainWindow):
             self.closeConnection()
     def search_pdfs(self):
         print(f"DEBUG - Current user during search: {self.current_user}")
+        # Drop the previous search before clearing the list: clear() moves the
+        # scroll bar, and results_scrolled would otherwise page the old search in
+        self.active_search = None
+        self.search_cursor = None
+        self.search_exhausted = True
+        self.search_estimate = None
+        self.found_pdfs.clear()
         self.ui.results_list.clear()
         query = self.ui.search_textEdit.text().strip()
-        self.found_pdfs.clear()
 
         conn = self.create_connection()
+        cursor = None
         try:
             search_type = self.ui.search_by_comboBox.currentText()
             
@@ -654,201 +674,42 @@ class VerifyWindowBase(QMainWindow):
             cursor = conn.cursor()
             
             try:
-                # # First, verify if there are any records in the table
-                # cursor.execute(f"SELECT COUNT(*) FROM {index_table}")
-                # total_records = cursor.fetchone()[0]
-                # print(f"DEBUG - Total records in {index_table}: {total_records}")
-
-                # # Get a sample of existing records to help debug
-                # cursor.execute(f"""
-                #     SELECT name, date_of_birth, reg_no 
-                #     FROM {index_table} 
-                #     LIMIT 5
-                # """)
-                # sample_records = cursor.fetchall()
-                # print("DEBUG - Sample records in database:")
-                # for record in sample_records:
-                #     print(f"  - Name: {record[0]}, Date: {record[1]}, Reg No: {record[2]}")
-
                 if search_type == "Name":
-                    if isinstance(self, VerifyMarriageWindow):
-                        # For marriage records, search both husband and wife names
-                        search_query = f"""
-                            SELECT file_path FROM {index_table}
-                            WHERE (
-                                LOWER({name_column}) LIKE LOWER(%s) 
-                                OR LOWER(wife_name) LIKE LOWER(%s)
-                                OR LOWER({name_column}) LIKE LOWER(%s)
-                                OR LOWER(wife_name) LIKE LOWER(%s)
-                            )
-                            ORDER BY {date_column} DESC
-                        """
-                        # Add variations of the name for more flexible matching
-                        name_variations = [
-                            f'%{query}%',
-                            f'%{query.lower()}%',
-                            f'%{query.upper()}%',
-                            f'%{query.title()}%'
-                        ]
-                        search_params = name_variations
-                    else:
-                        search_query = f"""
-                            SELECT file_path FROM {index_table}
-                            WHERE (
-                                LOWER({name_column}) LIKE LOWER(%s)
-                                OR LOWER({name_column}) LIKE LOWER(%s)
-                                OR LOWER({name_column}) LIKE LOWER(%s)
-                                OR LOWER({name_column}) LIKE LOWER(%s)
-                            )
-                            ORDER BY {date_column} DESC
-                        """
-                        # Add variations of the name for more flexible matching
-                        name_variations = [
-                            f'%{query}%',
-                            f'%{query.lower()}%',
-                            f'%{query.upper()}%',
-                            f'%{query.title()}%'
-                        ]
-                        search_params = name_variations
+                    # Marriage records are searched on both husband and wife names
+                    name_columns = [name_column, "wife_name"] if isinstance(self, VerifyMarriageWindow) else [name_column]
+                    self.active_search = build_name_search(
+                        index_table, name_columns, date_column, query,
+                        use_trigram=VerifyWindowBase.trigram_available
+                    )
                 elif search_type == "Date":
-                    # Convert written date format to standard format
-                    try:
-                        from datetime import datetime
-                        import re
-
-                        # Common month mappings
-                        month_map = {
-                            'january': '01', 'february': '02', 'march': '03', 'april': '04',
-                            'may': '05', 'june': '06', 'july': '07', 'august': '08',
-                            'september': '09', 'october': '10', 'november': '11', 'december': '12',
-                            'jan': '01', 'feb': '02', 'mar': '03', 'apr': '04',
-                            'jun': '06', 'jul': '07', 'aug': '08', 'sep': '09',
-                            'sept': '09', 'oct': '10', 'nov': '11', 'dec': '12'
-                        }
-
-                        # Try to parse the date in various formats
-                        date_str = query.lower().strip()
-                        
-                        # Handle written format with or without year (e.g., "December 17 2024" or "December 17")
-                        written_pattern = r'([a-z]+)\s+(\d{1,2})(?:\s+(\d{4}))?'
-                        written_match = re.match(written_pattern, date_str)
-                        
-                        if written_match:
-                            month, day, year = written_match.groups()
-                            if month in month_map:
-                                # If year is provided, use it; otherwise, search for any year
-                                if year:
-                                    formatted_date = f"{year}-{month_map[month]}-{day.zfill(2)}"
-                                    search_query = f"""
-                                        SELECT file_path FROM {index_table}
-                                        WHERE {date_column}::text LIKE %s
-                                        OR {date_column}::text LIKE %s
-                                        OR {date_column}::text LIKE %s
-                                        ORDER BY {date_column} DESC
-                                    """
-                                    search_params = (
-                                        f'%{formatted_date}%',
-                                        f'%{query}%',
-                                        f'%{month_map[month]}-{day.zfill(2)}%'
-                                    )
-                                else:
-                                    # Search for month and day in any year
-                                    search_query = f"""
-                                        SELECT file_path FROM {index_table}
-                                        WHERE {date_column}::text LIKE %s
-                                        OR {date_column}::text LIKE %s
-                                        OR {date_column}::text LIKE %s
-                                        ORDER BY {date_column} DESC
-                                    """
-                                    search_params = (
-                                        f'%{month_map[month]}-{day.zfill(2)}%',
-                                        f'%{query}%',
-                                        f'%{month} {day}%'
-                                    )
-                            else:
-                                search_query = f"""
-                                    SELECT file_path FROM {index_table}
-                                    WHERE {date_column}::text LIKE %s
-                                    ORDER BY {date_column} DESC
-                                """
-                                search_params = (f'%{query}%',)
-                        else:
-                            # Try to parse as standard date format
-                            try:
-                                # Try different date formats
-                                date_formats = ['%Y-%m-%d', '%m-%d', '%d-%m-%Y', '%m/%d/%Y', '%d/%m/%Y']
-                                formatted_dates = []
-                                
-                                for date_format in date_formats:
-                                    try:
-                                        parsed_date = datetime.strptime(query, date_format)
-                                        formatted_dates.append(parsed_date.strftime('%Y-%m-%d'))
-                                    except ValueError:
-                                        continue
-                                
-                                if formatted_dates:
-                                    # Build a query that matches any of the formatted dates
-                                    placeholders = ', '.join(['%s'] * len(formatted_dates))
-                                    search_query = f"""
-                                        SELECT file_path FROM {index_table}
-                                        WHERE {date_column}::text LIKE ANY(ARRAY[{placeholders}])
-                                        OR {date_column}::text LIKE %s
-                                        ORDER BY {date_column} DESC
-                                    """
-                                    search_params = tuple(f'%{date}%' for date in formatted_dates) + (f'%{query}%',)
-                                else:
-                                    # If all parsing fails, do a simple text search
-                                    search_query = f"""
-                                        SELECT file_path FROM {index_table}
-                                        WHERE {date_column}::text LIKE %s
-                                        ORDER BY {date_column} DESC
-                                    """
-                                    search_params = (f'%{query}%',)
-                            except Exception as e:
-                                print(f"DEBUG - Date parsing error: {str(e)}")
-                                # Fallback to simple text search
-                                search_query = f"""
-                                    SELECT file_path FROM {index_table}
-                                    WHERE {date_column}::text LIKE %s
-                                    ORDER BY {date_column} DESC
-                                """
-                                search_params = (f'%{query}%',)
-                    except Exception as e:
-                        print(f"DEBUG - Date parsing error: {str(e)}")
-                        # Fallback to simple text search if date parsing fails
-                        search_query = f"""
-                            SELECT file_path FROM {index_table}
-                            WHERE {date_column}::text LIKE %s
-                            ORDER BY {date_column} DESC
-                        """
-                        search_params = (f'%{query}%',)
+                    self.active_search = build_date_search(index_table, date_column, query)
                 elif search_type == "Reg No.":
-                    search_query = f"""
-                        SELECT file_path FROM {index_table}
-                        WHERE reg_no LIKE %s
-                        ORDER BY {date_column} DESC
-                    """
-                    search_params = (f'%{query}%',)
-
-                print(f"DEBUG - Executing query: {search_query}")
-                print(f"DEBUG - With parameters: {search_params}")
-                
-                cursor.execute(search_query, search_params)
-                results = cursor.fetchall()
-                
-                print(f"DEBUG - Query returned {len(results)} results")
-
-                if results:
-                    pdf_files = [os.path.basename(result[0]) for result in results]
-                    self.ui.results_list.addItems(pdf_files)
-                    self.found_pdfs.extend(pdf_files)
-                    self.ui.status_label.setText(f"Found {len(self.found_pdfs)} files.")
+                    self.active_search = build_reg_no_search(index_table, date_column, query)
+
+                try:
+                    result_count = self.fetch_results_page(cursor)
+                except (psycopg2.errors.UndefinedFunction, psycopg2.errors.UndefinedObject) as e:
+                    if search_type != "Name" or not VerifyWindowBase.trigram_available:
+                        raise
+                    # pg_trgm is not installed yet (see dbase_scripts/add_name_search_indexes.py)
+                    print(f"Trigram search unavailable, falling back to LIKE: {str(e)}")
+                    VerifyWindowBase.trigram_available = False
+                    self.active_search = build_name_search(
+                        index_table, name_columns, date_column, query, use_trigram=False
+                    )
+                    result_count = self.fetch_results_page(cursor)
+
+                if result_count:
+                    if not self.search_exhausted:
+                        self.search_estimate = self.estimate_result_count(cursor)
+                    self.update_results_status()
                     AuditLogger.log_action(
                         conn,
                         self.current_user,
                         "SEARCH_COMPLETED",
                         {
-                            "result_count": len(pdf_files),
+                            "result_count": result_count,
+                            "estimated_total": self.search_estimate,
                             "type": search_type
                         }
                     )
@@ -875,6 +736,8 @@ class VerifyWindowBase(QMainWindow):
                 raise e
         except Exception as e:
             print(f"DEBUG - General error: {str(e)}")
+            self.active_search = None
+            self.search_exhausted = True
             AuditLogger.log_action(
                 conn,
                 self.current_user,
@@ -901,6 +764,78 @@ class VerifyWindowBase(QMainWindow):
             # Re-enable layout updates
             self.setUpdatesEnabled(True)
             self.update()
+
+    def fetch_results_page(self, cursor):
+        """Append the next page of the active search to the results list and return its size"""
+        page_query, page_params = self.active_search.page_query(self.search_cursor, self.PAGE_SIZE)
+        cursor.execute(page_query, page_params)
+        rows = cursor.fetchall()
+
+        if rows:
+            # The sort key values of the last row are where the next page starts
+            self.search_cursor = tuple(rows[-1][1:])
+            pdf_files = [os.path.basename(row[0]) for row in rows]
+            self.ui.results_list.addItems(pdf_files)
+            self.found_pdfs.extend(pdf_files)
+        self.search_exhausted = len(rows) < self.PAGE_SIZE
+        return len(rows)
+
+    def estimate_result_count(self, cursor):
+        """Planner estimate of the total matches, shown until every page has been loaded"""
+        try:
+            estimate_query, estimate_params = self.active_search.count_estimate_query()
+            cursor.execute(estimate_query, estimate_params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return int(plan[0]["Plan"]["Plan Rows"])
+        except (psycopg2.Error, LookupError, ValueError) as e:
+            print(f"Could not estimate result count: {str(e)}")
+            return None
+
+    def update_results_status(self):
+        loaded = len(self.found_pdfs)
+        if self.search_exhausted:
+            self.ui.status_label.setText(f"Found {loaded} files.")
+        elif self.search_estimate:
+            self.ui.status_label.setText(f"Showing {loaded} of about {max(self.search_estimate, loaded + 1)} files.")
+        else:
+            self.ui.status_label.setText(f"Showing first {loaded} files.")
+
+    def results_scrolled(self, value):
+        scroll_bar = self.ui.results_list.verticalScrollBar()
+        # The list scrolls per item, so the margin is measured in rows
+        if value >= scroll_bar.maximum() - self.LOAD_MORE_MARGIN:
+            self.load_more_results()
+
+    def load_more_results(self):
+        """Fetch the page after the last loaded result, if the search has more"""
+        if self.active_search is None or self.search_exhausted or self.loading_page:
+            return
+
+        self.loading_page = True
+        conn = self.create_connection()
+        cursor = None
+        try:
+            cursor = conn.cursor()
+            self.fetch_results_page(cursor)
+            self.update_results_status()
+        except Exception as e:
+            print(f"Error loading more results: {str(e)}")
+            # Stop paging so a broken search is not retried on every scroll
+            self.search_exhausted = True
+            self.ui.status_label.setText(f"Showing {len(self.found_pdfs)} files (failed to load more).")
+            AuditLogger.log_action(
+                conn,
+                self.current_user,
+                "SEARCH_ERROR",
+                {"error": str(e), "type": self.ui.search_by_comboBox.currentText(), "loaded": len(self.found_pdfs)}
+            )
+        finally:
+            if cursor:
+                cursor.close()
+            self.closeConnection()
+            self.loading_page = False
     
     def start_everify_flow(self):
         conn = self.create_connection()
@@ -978,6 +913,9 @@ class VerifyWindowBase(QMainWindow):
             self.ui.regyear_textEdit.clear()
             self.ui.search_textEdit.clear()
             self.ui.search_by_comboBox.setCurrentText("Name")
+            # Stop paging before clear() moves the scroll bar
+            self.active_search = None
+            self.search_exhausted = True
             self.ui.results_list.clear()
             self.ui.status_label.clear()
 